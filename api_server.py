@@ -0,0 +1,334 @@
+"""
+HTTP Chat API
+=============
+Streamlit arayüzü ve terminal router'ıyla aynı classify → route → chain
+akışını (pipeline.py) HTTP üzerinden sunan, bağımlılıksız bir ASGI uygulaması.
+Durumsuzdur: konuşmalar oturum deposunda (session_store) tutulduğu için
+yük dengeleyici arkasında birden çok worker çalıştırılabilir
+(SESSION_STORE=redis veya ortak SQLite dosyası).
+
+Çalıştırma:
+    uvicorn api_server:app --host 0.0.0.0 --port 8000 --workers 4
+
+Uç noktalar:
+    GET  /health        → {"status": "ok"}
+    POST /chat          → {"session_id"?, "message"} ⇒ tek seferde JSON yanıt
+    POST /chat/stream   → aynı gövde ⇒ Server-Sent Events:
+                          meta (session_id), delta (metin parçası),
+                          done (nihai yanıt + intent + süreler), error
+
+Ayarlar: API_MAX_CONCURRENCY (worker başına eşzamanlı tur, 32),
+API_QUEUE_TIMEOUT (boş yer bekleme süresi sn, 5), API_REQUEST_TIMEOUT
+(bir turun üst süresi sn, 30), API_MAX_MESSAGE_CHARS (1000).
+"""
+from dataclasses import asdict
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import json
+import os
+import uuid
+
+from pipeline import new_session, aprocess_message, stream_message
+from session_store import get_session_store
+
+logger = logging.getLogger("hotel_chatbot.api_server")
+
+MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "32"))
+QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "5"))
+REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "30"))
+MAX_MESSAGE_CHARS = int(os.getenv("API_MAX_MESSAGE_CHARS", "1000"))
+MAX_BODY_BYTES = 64 * 1024
+# Yol → izin verilen yöntemler (bilinen yola yanlış yöntemle gelinirse 405)
+ROUTES = {
+    "/health": ("GET",),
+    "/chat": ("POST",),
+    "/chat/stream": ("POST",),
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class ChatAPI:
+    """ASGI uygulaması; classifier ve istemciler ilk istekte bir kez kurulur"""
+
+    def __init__(self, classifier=None, qdrant_client=None, store=None):
+        self.classifier = classifier
+        self.qdrant_client = qdrant_client      # AsyncQdrantClient (None → paylaşılan)
+        self.store = store
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._setup_task: Optional[asyncio.Future] = None
+        self._session_locks: Dict[str, list] = {}   # session_id → [kilit, kullanan sayısı]
+
+    # ------------------------------------------------------------------
+    # Kurulum
+    # ------------------------------------------------------------------
+    def _setup(self) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(MAX_CONCURRENCY)
+        if self.store is None:
+            self.store = get_session_store()
+        if self.classifier is None:
+            from chains.intent_classifier_qdrant import IntentClassifier
+            self.classifier = IntentClassifier()
+
+    async def _ensure_setup(self) -> None:
+        """
+        Lifespan desteklenmiyorsa kurulum ilk istekte yapılır. _setup disk ve
+        ağ kullandığı için thread'de çalışır; eşzamanlı ilk istekler aynı
+        kurulumu bekler, başarısız olursa sonraki istek yeniden dener.
+        """
+        if self._slots is not None and self.store is not None and self.classifier is not None:
+            return
+        if self._setup_task is None or self._setup_task.done():
+            self._setup_task = asyncio.ensure_future(asyncio.to_thread(self._setup))
+        task = self._setup_task
+        try:
+            await asyncio.shield(task)
+        finally:
+            if task.done() and (task.cancelled() or task.exception() is not None):
+                self._setup_task = None
+
+    # ------------------------------------------------------------------
+    # ASGI girişi
+    # ------------------------------------------------------------------
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        try:
+            if path not in ROUTES:
+                raise HTTPError(404, "Bulunamadı")
+            if method not in ROUTES[path]:
+                raise HTTPError(405, "Bu yöntem desteklenmiyor",
+                                {"allow": ", ".join(ROUTES[path])})
+            if path == "/health":
+                await _send_json(send, 200, {"status": "ok"})
+            elif path == "/chat":
+                await self._chat(await _read_json(receive), send)
+            else:
+                await self._chat_stream(await _read_json(receive), send)
+        except HTTPError as e:
+            await _send_json(send, e.status, {"error": e.message}, e.headers)
+        except Exception as e:
+            logger.error(f"API hatası: {e}", exc_info=True)
+            await _send_json(send, 500, {"error": "Sunucu hatası"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await asyncio.to_thread(self._setup)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ------------------------------------------------------------------
+    # Oturum ve kaynak yönetimi
+    # ------------------------------------------------------------------
+    def _parse_request(self, body: Dict[str, Any]):
+        message = body.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, "'message' alanı zorunlu")
+        if len(message) > MAX_MESSAGE_CHARS:
+            raise HTTPError(413, f"Mesaj en fazla {MAX_MESSAGE_CHARS} karakter olabilir")
+        session_id = body.get("session_id") or uuid.uuid4().hex
+        if not isinstance(session_id, str) or len(session_id) > 128:
+            raise HTTPError(400, "Geçersiz 'session_id'")
+        return session_id, message.strip()
+
+    async def _acquire_slot(self) -> None:
+        await self._ensure_setup()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPError(503, "Sunucu meşgul, lütfen tekrar deneyin")
+
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        # Aynı oturuma gelen istekler bu worker içinde sırayla işlenir
+        entry = self._session_locks.get(session_id)
+        if entry is None:
+            entry = self._session_locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _release_session_lock(self, session_id: str) -> None:
+        entry = self._session_locks[session_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._session_locks[session_id]
+
+    async def _load(self, session_id: str) -> Dict[str, Any]:
+        session = await asyncio.to_thread(self.store.load, session_id)
+        return session or new_session()
+
+    async def _save(self, session_id: str, session: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.store.save, session_id, session)
+
+    # ------------------------------------------------------------------
+    # Uç noktalar
+    # ------------------------------------------------------------------
+    async def _chat(self, body: Dict[str, Any], send) -> None:
+        session_id, message = self._parse_request(body)
+        await self._acquire_slot()
+        lock = self._session_lock(session_id)
+        try:
+            async with lock:
+                session = await self._load(session_id)
+                try:
+                    result = await asyncio.wait_for(
+                        aprocess_message(session, message, self.classifier, self.qdrant_client),
+                        REQUEST_TIMEOUT,
+                    )
+                except asyncio.TimeoutError:
+                    raise HTTPError(504, "Yanıt süresi aşıldı")
+                await self._save(session_id, session)
+        finally:
+            self._slots.release()
+            self._release_session_lock(session_id)
+
+        await _send_json(send, 200, dict(asdict(result), session_id=session_id))
+
+    async def _chat_stream(self, body: Dict[str, Any], send) -> None:
+        session_id, message = self._parse_request(body)
+        await self._acquire_slot()
+        lock = self._session_lock(session_id)
+        try:
+            async with lock:
+                session = await self._load(session_id)
+                await send({
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream; charset=utf-8"),
+                        (b"cache-control", b"no-cache"),
+                        (b"x-accel-buffering", b"no"),
+                    ],
+                })
+                # Başlık gönderildi: bundan sonraki her hata JSON yanıtı yerine
+                # error olayı olarak bildirilir (__call__'a hata sızmamalı)
+                try:
+                    await _send_event(send, "meta", {"session_id": session_id})
+                    result = await asyncio.wait_for(
+                        self._relay_stream(session, message, send), REQUEST_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    await _try_send_event(send, "error", {"error": "Yanıt süresi aşıldı"})
+                    return
+                except Exception as e:
+                    logger.error(f"Akış hatası: {e}", exc_info=True)
+                    await _try_send_event(send, "error", {"error": "Sunucu hatası"})
+                    return
+                try:
+                    await self._save(session_id, session)
+                except Exception as e:
+                    logger.error(f"Oturum kaydedilemedi ({session_id}): {e}", exc_info=True)
+                    await _try_send_event(send, "error", {"error": "Konuşma kaydedilemedi"})
+                    return
+                await _try_send_event(send, "done", dict(asdict(result), session_id=session_id))
+        finally:
+            self._slots.release()
+            self._release_session_lock(session_id)
+
+    async def _relay_stream(self, session, message, send):
+        """
+        stream_message senkron bir generator'dır (senkron OpenAI akışları);
+        her adım ayrı bir thread'de ilerletilir, event loop bloklanmaz.
+        Zaman aşımında generator, süren adım bitince kapatılır; böylece
+        thread oturumu kilit bırakıldıktan sonra değiştirmeye devam etmez.
+        """
+        gen = stream_message(session, message, self.classifier)
+        step = None
+        try:
+            while True:
+                # shield: iptal thread'deki adımı kesemez; adım izlenmeye devam eder
+                step = asyncio.ensure_future(asyncio.to_thread(_advance, gen))
+                kind, value = await asyncio.shield(step)
+                if kind == "done":
+                    return value
+                await _send_event(send, "delta", {"text": value})
+        finally:
+            if step is None or step.done():
+                gen.close()
+            else:
+                step.add_done_callback(lambda _: _close_after_step(step, gen))
+
+
+def _close_after_step(step, gen) -> None:
+    if not step.cancelled() and step.exception() is not None:
+        logger.debug(f"Zaman aşımına uğrayan akış adımı başarısız: {step.exception()}")
+    gen.close()
+
+
+def _advance(gen):
+    try:
+        return "delta", next(gen)
+    except StopIteration as stop:
+        return "done", stop.value
+
+
+# ----------------------------------------------------------------------
+# ASGI yardımcıları
+# ----------------------------------------------------------------------
+async def _read_json(receive) -> Dict[str, Any]:
+    body, more = b"", True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPError(413, "İstek gövdesi çok büyük")
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "Geçersiz JSON")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "JSON nesnesi bekleniyor")
+    return data
+
+
+async def _send_json(send, status: int, payload: Dict[str, Any],
+                     headers: Optional[Dict[str, str]] = None) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            *((name.encode(), value.encode()) for name, value in (headers or {}).items()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_event(send, event: str, data: Dict[str, Any], more: bool = True) -> None:
+    payload = json.dumps(data, ensure_ascii=False)
+    chunk = f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+    await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+
+async def _try_send_event(send, event: str, data: Dict[str, Any]) -> None:
+    """Akışın son olayı; istemci bağlantıyı kapattıysa hata yutulur"""
+    try:
+        await _send_event(send, event, data, more=False)
+    except Exception as e:
+        logger.warning(f"Akış olayı gönderilemedi ({event}): {e}")
+
+
+app = ChatAPI()
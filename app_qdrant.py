@@ -8,6 +8,7 @@ import openai
 import time
 import os
 import logging
+import uuid
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any
@@ -26,6 +27,20 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("openai").setLevel(logging.WARNING)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 
+# Oturum deposunda saklanan alanlar
+PERSISTED_KEYS = ("messages", "total_messages", "booking_state", "in_booking", "current_intent")
+
+def save_session():
+    """Konuşma durumunu oturum deposuna yazar"""
+    from session_store import get_session_store
+    try:
+        get_session_store().save(
+            st.session_state.session_id,
+            {key: st.session_state[key] for key in PERSISTED_KEYS}
+        )
+    except Exception as e:
+        logging.error(f"Oturum kaydedilemedi: {e}")
+
 # Session state kontrolleri - en başta
 if 'initialized' not in st.session_state:
     st.session_state.initialized = False
@@ -35,6 +50,24 @@ if 'initialized' not in st.session_state:
     st.session_state.in_booking = False
     st.session_state.current_intent = "unknown"
 
+    # Oturum kimliği URL'de (?sid=...) tutulur; sayfa yenilense veya sunucu
+    # yeniden başlasa da konuşma depodan geri yüklenir
+    sid = st.query_params.get("sid")
+    if not sid:
+        sid = uuid.uuid4().hex
+        st.query_params["sid"] = sid
+    st.session_state.session_id = sid
+    try:
+        from session_store import get_session_store
+        stored = get_session_store().load(sid)
+    except Exception as e:
+        logging.error(f"Oturum yüklenemedi: {e}")
+        stored = None
+    if stored:
+        for key in PERSISTED_KEYS:
+            if key in stored:
+                st.session_state[key] = stored[key]
+
 @st.cache_resource
 def setup_environment():
     """Ortam değişkenlerini bir kez ayarla"""
@@ -81,10 +114,11 @@ def initialize_components():
     try:
         # Import'ları burada yap
         from chains.intent_classifier_qdrant import IntentClassifier
-        from chains.rag_hotel_qdrant import answer_hotel_qdrant
-        from chains.booking_dialog import handle_booking
-        from chains.small_talk import respond_small_talk
+        from chains.rag_hotel_qdrant import answer_hotel_qdrant, stream_answer_hotel_qdrant
+        from chains.booking_dialog import handle_booking, handle_booking_stream, extraction_stats
+        from chains.small_talk import respond_small_talk, stream_small_talk
         from chains.link_redirect import redirect
+        from chains.prompt_cache_stats import prompt_cache_stats
         from qdrant_config import get_qdrant_client
         
         # OpenAI setup
@@ -100,9 +134,14 @@ def initialize_components():
             'qdrant_client': qdrant_client,
             'classifier': classifier,
             'answer_hotel_qdrant': answer_hotel_qdrant,
+            'stream_answer_hotel_qdrant': stream_answer_hotel_qdrant,
             'handle_booking': handle_booking,
+            'handle_booking_stream': handle_booking_stream,
             'respond_small_talk': respond_small_talk,
-            'redirect': redirect
+            'stream_small_talk': stream_small_talk,
+            'redirect': redirect,
+            'prompt_cache_stats': prompt_cache_stats,
+            'extraction_stats': extraction_stats
         }
         
     except Exception as e:
@@ -178,24 +217,26 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Niyet kümeleri
+SMALL_TALK = {"selamla", "veda", "teşekkür", "yardım"}
+HOTEL_INFO = {"otel_bilgi", "hizmetler", "genel"}
+BOOKING = {"rezervasyon", "booking"}
+REDIRECT = {"link", "yönlendirme"}
+
+BOOKING_START_REPLY = "🏨 Rezervasyon yapmak istediğinizi anlıyorum! Size yardımcı olmak için birkaç soru soracağım."
+
 def get_bot_response(intent: str, question: str) -> str:
     """Bot yanıtını al (Qdrant destekli)"""
     try:
         components = initialize_components()
         
-        # Niyet kümeleri
-        SMALL_TALK = {"selamla", "veda", "teşekkür", "yardım"}
-        HOTEL_INFO = {"otel_bilgi", "hizmetler", "genel"}
-        BOOKING = {"rezervasyon", "booking"}
-        REDIRECT = {"link", "yönlendirme"}
-        
         if intent in SMALL_TALK:
             return components['respond_small_talk'](question)
         elif intent in HOTEL_INFO:
             return components['answer_hotel_qdrant'](question)
         elif intent in BOOKING:
             st.session_state.in_booking = True
-            return "🏨 Rezervasyon yapmak istediğinizi anlıyorum! Size yardımcı olmak için birkaç soru soracağım."
+            return BOOKING_START_REPLY
         elif intent in REDIRECT:
             return components['redirect'](question)
         else:
@@ -205,6 +246,45 @@ def get_bot_response(intent: str, question: str) -> str:
     except Exception as e:
         return f"Üzgünüm, bir hata oluştu: {str(e)}"
 
+def _single(text: str):
+    """Akışı olmayan yanıtları tek parçalık bir generator'a çevirir"""
+    yield text
+    return text
+
+def stream_bot_response(intent: str, question: str):
+    """get_bot_response'un akış sürümü; yanıt parçalarını yield eden generator döndürür"""
+    components = initialize_components()
+    
+    if intent in SMALL_TALK:
+        return components['stream_small_talk'](question)
+    elif intent in BOOKING:
+        st.session_state.in_booking = True
+        return _single(BOOKING_START_REPLY)
+    elif intent in REDIRECT:
+        return _single(components['redirect'](question))
+    else:
+        # HOTEL_INFO ve varsayılan: hotel bilgisi
+        return components['stream_answer_hotel_qdrant'](question)
+
+def render_stream(stream):
+    """
+    Generator'dan gelen parçaları mesaj balonunda anlık gösterir.
+    Generator'ın dönüş değerini (yoksa birleştirilmiş metni) döndürür.
+    """
+    placeholder = st.empty()
+    text = ""
+    try:
+        while True:
+            text += next(stream)
+            placeholder.markdown(text + "▌")
+    except StopIteration as stop:
+        result = stop.value if stop.value is not None else text
+    
+    # Booking akışı (state, cevap, tamam) döndürür; nihai cevap farklı olabilir
+    final_text = result[1] if isinstance(result, tuple) else result
+    placeholder.markdown(final_text)
+    return result
+
 def main():
     """Ana uygulama"""
     # Başlangıç kontrolleri
@@ -294,6 +374,7 @@ def main():
             st.session_state.booking_state = {}
             st.session_state.in_booking = False
             st.session_state.current_intent = "unknown"
+            save_session()
             st.success("🧹 Sohbet temizlendi!")
             time.sleep(1)
             st.rerun()
@@ -344,8 +425,11 @@ def main():
                     "in_booking": st.session_state.in_booking,
                     "api_key_set": bool(os.environ.get("OPENAI_API_KEY")),
                     "qdrant_url_set": bool(os.environ.get("QDRANT_URL")),
-                    "booking_state": st.session_state.booking_state,
-                    "message_count": len(st.session_state.messages)
+                    "booking_state": dict(st.session_state.booking_state.items()),
+                    "message_count": len(st.session_state.messages),
+                    "intent_fast_path": components['classifier'].fast_path_stats(),
+                    "prompt_cache": components['prompt_cache_stats'](),
+                    "booking_extraction": components['extraction_stats']()
                 }
                 st.json(debug_info)
 
@@ -370,44 +454,53 @@ def main():
         })
         st.session_state.total_messages += 1
         
-        # Typing indicator göster
-        with st.spinner("🤖 Yanıt hazırlanıyor..."):
-            try:
-                if st.session_state.in_booking:
-                    # Booking flow devam ediyor
-                    booking_state, response, done = components['handle_booking'](
-                        st.session_state.booking_state, prompt
-                    )
-                    st.session_state.booking_state = booking_state
-                    if done:
-                        st.session_state.in_booking = False
-                        response += "\n\n✅ Rezervasyon süreci tamamlandı!"
-                else:
-                    # Yeni intent classification
-                    intent, confidence = components['classifier'].classify(prompt)
-                    response = get_bot_response(intent, prompt)
-                    st.session_state.current_intent = intent
+        # Yeni mesajları akış halinde sohbet penceresinde göster
+        with chat_container:
+            with st.chat_message("user", avatar="👤"):
+                st.write(prompt)
+            
+            with st.chat_message("assistant", avatar="🤖"):
+                try:
+                    if st.session_state.in_booking:
+                        # Booking flow devam ediyor
+                        booking_state, response, done = render_stream(
+                            components['handle_booking_stream'](
+                                st.session_state.booking_state, prompt
+                            )
+                        )
+                        st.session_state.booking_state = booking_state
+                        if done:
+                            st.session_state.in_booking = False
+                            response += "\n\n✅ Rezervasyon süreci tamamlandı!"
+                    else:
+                        # Yeni intent classification - ilk token'a kadar typing indicator
+                        with st.spinner("🤖 Yanıt hazırlanıyor..."):
+                            intent, confidence = components['classifier'].classify(prompt)
+                        response = render_stream(stream_bot_response(intent, prompt))
+                        st.session_state.current_intent = intent
+                        
+                        # Booking başlatılacaksa işaretle
+                        if intent == "rezervasyon":
+                            st.session_state.in_booking = True
                     
-                    # Booking başlatılacaksa işaretle
-                    if intent == "rezervasyon":
-                        st.session_state.in_booking = True
-                
-                # Bot yanıtını timestamp ile ekle
-                response_time = datetime.now().strftime("%H:%M")
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": response,
-                    "timestamp": response_time
-                })
-                
-            except Exception as e:
-                error_msg = f"⚠️ Üzgünüm, bir hata oluştu. Lütfen tekrar deneyin.\n\nHata detayı: {str(e)}"
-                error_time = datetime.now().strftime("%H:%M")
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": error_msg,
-                    "timestamp": error_time
-                })
+                    # Bot yanıtını timestamp ile ekle
+                    response_time = datetime.now().strftime("%H:%M")
+                    st.session_state.messages.append({
+                        "role": "assistant", 
+                        "content": response,
+                        "timestamp": response_time
+                    })
+                    
+                except Exception as e:
+                    error_msg = f"⚠️ Üzgünüm, bir hata oluştu. Lütfen tekrar deneyin.\n\nHata detayı: {str(e)}"
+                    error_time = datetime.now().strftime("%H:%M")
+                    st.session_state.messages.append({
+                        "role": "assistant", 
+                        "content": error_msg,
+                        "timestamp": error_time
+                    })
+        
+        save_session()
         
         # Sayfayı yenile - en son mesaj görünsün
         st.rerun()
@@ -0,0 +1,241 @@
+"""
+Uçtan Uca Gecikme Benchmark'ı
+=============================
+Sabit bir Türkçe soru seti üzerinde tüm pipeline'ı (classify → route → chain)
+çalıştırır ve her rota (small_talk, booking, redirect, rag) için aşama
+bazında p50/p95/p99 raporlar.
+
+Aşamalar:
+    classify, small_talk / booking / redirect / rag, total  → pipeline
+    embed, search, context, completion                      → zincirler (latency_stats.stage)
+    first_token                                             → yalnızca --stream
+
+Hem çevrimdışı yedeklerle (offline_backends) hem gerçek OpenAI + Qdrant Cloud
+ile çalışır. Tam soğuk ölçüm için EMBED_CACHE_ENABLED=0 kullanın; süreç içi
+embedding ve yanıt cache'leri her konuşmadan önce zaten temizlenir (--warm
+ile kapatılır). Yanıt cache'i benchmark sürecinde yalnızca bellekte tutulur;
+ANSWER_CACHE_PATH ile paylaşılan kalıcı cache'e dokunulmaz.
+
+Kullanım:
+    python benchmark.py --offline --repeats 5
+    python benchmark.py --repeats 3 --output cache/benchmark.json
+    python benchmark.py --offline --json          # stdout'a JSON rapor
+"""
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+from latency_stats import format_table, record_stages, summarize, summarize_timings
+
+logger = logging.getLogger("hotel_chatbot.benchmark")
+
+# Her konuşma beklenen rotasıyla; rezervasyon konuşması birden çok tur sürer
+BENCHMARK_CONVERSATIONS: List[Dict[str, Any]] = [
+    {"route": "small_talk", "messages": ["Merhaba"]},
+    {"route": "small_talk", "messages": ["Çok teşekkür ederim"]},
+    {"route": "small_talk", "messages": ["Görüşmek üzere, iyi günler"]},
+    {"route": "rag", "messages": ["Check-in saat kaçta?"]},
+    {"route": "rag", "messages": ["Otelde havuz var mı?"]},
+    {"route": "rag", "messages": ["Kahvaltı saat kaçta başlıyor?"]},
+    {"route": "rag", "messages": ["Otopark ücretli mi?"]},
+    {"route": "rag", "messages": ["Havalimanından otele transfer hizmetiniz var mı?"]},
+    {"route": "redirect", "messages": ["Rezervasyonumu iptal etmek istiyorum"]},
+    {"route": "redirect", "messages": ["Rezervasyon tarihlerimi değiştirmek istiyorum"]},
+    {"route": "booking", "messages": ["Oda fiyatları ne kadar?"]},
+    {"route": "booking", "messages": [
+        "Rezervasyon yapmak istiyorum",
+        "12-15 Ağustos",
+        "2 yetişkin, çocuk yok, 1 oda",
+        "Evet, onaylıyorum",
+    ]},
+]
+
+
+def setup(offline: bool = False, qdrant_path: Optional[str] = None):
+    """
+    Classifier ve Qdrant istemcisini kurar.
+    offline=True ise OpenAI ve Qdrant yerine yerel yedekler kullanılır.
+    Returns: (classifier, qdrant_client)
+    """
+    # Benchmark konuşmalar arasında yanıt cache'ini temizler; paylaşılan
+    # (kalıcı) cache'e dokunmamak için bu süreçte yalnızca bellekte tutulur
+    os.environ.pop("ANSWER_CACHE_PATH", None)
+    if offline:
+        # Zincirler yüklenirken OpenAI() kurulur; anahtar önceden verilmeli
+        os.environ.setdefault("OPENAI_API_KEY", "offline")
+        from offline_backends import install
+        install(path=qdrant_path)
+
+    import qdrant_config
+    from chains.intent_classifier_qdrant import IntentClassifier
+    return IntentClassifier(), qdrant_config.get_qdrant_client()
+
+
+def _reset_caches() -> None:
+    """Süreç içi embedding ve semantik yanıt cache'lerini temizler"""
+    from chains.embedding_service import get_embedding_service
+    from chains.answer_cache import get_answer_cache
+
+    get_embedding_service().clear()
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        return
+    if answer_cache.path:
+        # setup() dışından çalıştırıldı: diskteki paylaşılan cache silinmez
+        logger.warning("Yanıt cache'i kalıcı; benchmark onu temizlemiyor")
+        return
+    answer_cache.invalidate()
+
+
+def _run_turn(session, message, classifier, qdrant_client, stream: bool):
+    """Tek tur; pipeline süreleri ile zincir aşamalarını birleştirir"""
+    from pipeline import process_message, stream_message
+
+    with record_stages() as stages:
+        if stream:
+            t0 = time.perf_counter()
+            gen = stream_message(session, message, classifier, qdrant_client)
+            first_token = None
+            while True:
+                try:
+                    next(gen)
+                except StopIteration as stop:
+                    result = stop.value
+                    break
+                if first_token is None:
+                    first_token = (time.perf_counter() - t0) * 1000
+            if first_token is not None:
+                stages["first_token"] = first_token
+        else:
+            result = process_message(session, message, classifier, qdrant_client)
+    result.timings.update(stages)
+    return result
+
+
+def run_benchmark(
+    classifier,
+    qdrant_client=None,
+    repeats: int = 3,
+    stream: bool = False,
+    warm: bool = False,
+    conversations: Optional[List[Dict[str, Any]]] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Konuşmaları repeats kez sırayla çalıştırır.
+    Returns: {"meta", "overall", "summary": {rota: {aşama: özet}},
+              "route_mismatches", "records"}
+    """
+    from pipeline import new_session
+
+    conversations = conversations or BENCHMARK_CONVERSATIONS
+    total_turns = repeats * sum(len(c["messages"]) for c in conversations)
+    records: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+
+    for repeat in range(repeats):
+        for conv_index, conv in enumerate(conversations):
+            if not warm:
+                _reset_caches()
+            session = new_session()
+            for turn, message in enumerate(conv["messages"]):
+                record = {
+                    "repeat": repeat,
+                    "conversation": conv_index,
+                    "turn": turn,
+                    "expected_route": conv["route"],
+                    "message": message,
+                }
+                try:
+                    result = _run_turn(session, message, classifier, qdrant_client, stream)
+                    record.update(asdict(result))
+                except Exception as e:
+                    logger.error(f"Benchmark turu başarısız: {e}")
+                    record["error"] = str(e)
+                records.append(record)
+                if progress is not None:
+                    progress(len(records), total_turns)
+
+    ok = [r for r in records if "error" not in r]
+    return {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "wall_seconds": time.perf_counter() - started,
+            "repeats": repeats,
+            "turns": len(records),
+            "errors": len(records) - len(ok),
+            "stream": stream,
+            "warm": warm,
+            "python": platform.python_version(),
+            "env": {k: os.getenv(k) for k in (
+                "INTENT_INDEX_MODE", "INTENT_STRATEGY", "INTENT_FAST_PATH",
+                "SPECULATIVE_RETRIEVAL", "EMBED_CACHE_ENABLED", "ANSWER_CACHE_ENABLED",
+                "BOOKING_EXTRACTION_MODE",
+            )},
+        },
+        "overall": summarize(r["timings"]["total"] for r in ok),
+        "summary": summarize_timings(ok, group_by="route"),
+        "route_mismatches": sum(
+            1 for r in ok if r["turn"] == 0 and r["route"] != r["expected_route"]
+        ),
+        "records": records,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline gecikme benchmark'ı")
+    parser.add_argument("--offline", action="store_true",
+                        help="OpenAI/Qdrant yerine yerel yedekleri kullan")
+    parser.add_argument("--offline-qdrant-path", metavar="DIR",
+                        help="Çevrimdışı modda yerel Qdrant'ı bu dizinde diskte tut")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Soru setinin kaç kez çalıştırılacağı")
+    parser.add_argument("--stream", action="store_true",
+                        help="Akış sürümünü ölç (first_token aşaması eklenir)")
+    parser.add_argument("--warm", action="store_true",
+                        help="Konuşmalar arasında süreç içi cache'leri temizleme")
+    parser.add_argument("--output", metavar="FILE.json",
+                        help="JSON raporunu bu dosyaya yaz")
+    parser.add_argument("--json", action="store_true",
+                        help="Tablo yerine JSON raporu stdout'a yaz")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    classifier, qdrant_client = setup(args.offline, args.offline_qdrant_path)
+    report = run_benchmark(classifier, qdrant_client, max(1, args.repeats),
+                           stream=args.stream, warm=args.warm)
+    report["meta"]["backend"] = "offline" if args.offline else "live"
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+        return report
+
+    meta, overall = report["meta"], report["overall"]
+    print(f"📊 {meta['turns']} tur ({meta['backend']}), hata: {meta['errors']}, "
+          f"rota uyuşmazlığı: {report['route_mismatches']}, süre: {meta['wall_seconds']:.2f} sn")
+    print(f"   Toplam gecikme (ms): p50={overall['p50']:.1f} p95={overall['p95']:.1f} "
+          f"p99={overall['p99']:.1f}")
+    print(format_table(report["summary"]))
+    if args.output:
+        print(f"✅ Rapor: {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Semantik Yanıt Cache'i
+======================
+"check-in saat kaçta?" sorusunun her farklı ifadesi için embedding + top-10
+arama + chat completion çalıştırmak yerine, soru embedding'i daha önce
+yanıtlanmış bir soruya yeterince benziyorsa (cosine >= eşik) kayıtlı yanıtı
+döndürür.
+
+- Kayıtlar TTL sonunda geçersiz olur.
+- knowledge_collection_2 yeniden yüklendiğinde (bkz. bump_knowledge_version)
+  tüm cache temizlenir.
+- Varsayılan olarak yalnızca bellekte tutulur; path verilirse SQLite'a yazılır
+  ve yeniden başlatmada geri yüklenir.
+"""
+from typing import List, Optional
+from pathlib import Path
+import threading
+import logging
+import sqlite3
+import time
+import os
+
+import numpy as np
+
+logger = logging.getLogger("hotel_chatbot.answer_cache")
+
+# Göreli yol proje köküne göre çözülür: migrate_to_qdrant'ın yazdığı işaret,
+# sunucu hangi dizinden başlatılırsa başlatılsın aynı dosyadır
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+KNOWLEDGE_VERSION_PATH = str(
+    PROJECT_ROOT / os.getenv("KNOWLEDGE_VERSION_PATH", "cache/knowledge_version")
+)
+
+
+def read_knowledge_version(path: Optional[str] = None) -> str:
+    """Bilgi tabanı sürüm işaretini okur (yoksa boş)"""
+    try:
+        return Path(path or KNOWLEDGE_VERSION_PATH).read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+def bump_knowledge_version(path: Optional[str] = None) -> str:
+    """knowledge_collection_2 yeniden yüklendiğinde çağrılır; yanıt cache'lerini geçersiz kılar"""
+    path = path or KNOWLEDGE_VERSION_PATH
+    version = f"{time.time():.6f}"
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(version, encoding="utf-8")
+    logger.info(f"Bilgi tabanı sürümü güncellendi: {version}")
+    return version
+
+
+class SemanticAnswerCache:
+    """Soru embedding'ine göre benzerlik eşikli, TTL'li yanıt cache'i"""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: float = 24 * 3600,
+        max_entries: int = 1000,
+        path: Optional[str] = None,
+        version_path: Optional[str] = None,
+        version_check_interval: float = 5.0
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.version_path = version_path or KNOWLEDGE_VERSION_PATH
+        self.version_check_interval = version_check_interval
+
+        self._lock = threading.Lock()
+        self._questions: List[str] = []
+        self._answers: List[str] = []
+        self._created: List[float] = []
+        self._vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._version = read_knowledge_version(self.version_path)
+        self._last_version_check = time.time()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = None
+        if path:
+            self._open(path)
+
+    # ------------------------------------------------------------------
+    # Kalıcılık
+    # ------------------------------------------------------------------
+    def _open(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                   question TEXT NOT NULL,
+                   answer   TEXT NOT NULL,
+                   vector   BLOB NOT NULL,
+                   created  REAL NOT NULL,
+                   version  TEXT NOT NULL
+               )"""
+        )
+        self._conn.commit()
+
+        cutoff = time.time() - self.ttl
+        rows = self._conn.execute(
+            "SELECT question, answer, vector, created FROM answers "
+            "WHERE version = ? AND created >= ? ORDER BY created",
+            (self._version, cutoff),
+        ).fetchall()
+        for question, answer, blob, created in rows[-self.max_entries:]:
+            vector = np.frombuffer(blob, dtype=np.float32)
+            self._append(question, answer, vector, created)
+        # Eski sürüm ve süresi dolmuş kayıtları at
+        self._conn.execute(
+            "DELETE FROM answers WHERE version != ? OR created < ?", (self._version, cutoff)
+        )
+        self._conn.commit()
+        logger.info(f"Yanıt cache'i diskten yüklendi: {len(self._answers)} kayıt")
+
+    # ------------------------------------------------------------------
+    # Bellek içi indeks
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _append(self, question: str, answer: str, vector: np.ndarray, created: float) -> None:
+        self._questions.append(question)
+        self._answers.append(answer)
+        self._vectors.append(vector)
+        self._created.append(created)
+        self._matrix = None
+
+    def _drop_first(self, count: int) -> None:
+        del self._questions[:count], self._answers[:count]
+        del self._vectors[:count], self._created[:count]
+        self._matrix = None
+
+    def _check_version(self) -> None:
+        now = time.time()
+        if now - self._last_version_check < self.version_check_interval:
+            return
+        self._last_version_check = now
+        version = read_knowledge_version(self.version_path)
+        if version != self._version:
+            logger.info("Bilgi tabanı değişmiş, yanıt cache'i temizleniyor")
+            self._version = version
+            self._clear_locked()
+
+    def _clear_locked(self) -> None:
+        self._drop_first(len(self._answers))
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+    def lookup(self, embedding, count: bool = True) -> Optional[str]:
+        """
+        Eşik üstünde benzer ve süresi dolmamış bir soru varsa yanıtını döndürür.
+        count=False ise isabet/ıska sayaçları güncellenmez (ön kontrol için).
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            self._check_version()
+
+            # Süresi dolanları baştan at (kayıtlar oluşturulma sırasında)
+            cutoff = time.time() - self.ttl
+            expired = 0
+            while expired < len(self._created) and self._created[expired] < cutoff:
+                expired += 1
+            if expired:
+                self._drop_first(expired)
+
+            answer = None
+            if self._vectors:
+                if self._matrix is None:
+                    self._matrix = np.vstack(self._vectors)
+                scores = self._matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    logger.debug(f"Yanıt cache isabeti ({scores[best]:.3f}): {self._questions[best]}")
+                    answer = self._answers[best]
+
+            if count:
+                if answer is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return answer
+
+    def store(self, question: str, embedding, answer: str) -> None:
+        """Yeni bir soru-yanıt çifti ekler"""
+        vector = self._normalize(embedding)
+        created = time.time()
+        with self._lock:
+            self._append(question, answer, vector, created)
+            overflow = len(self._answers) - self.max_entries
+            if overflow > 0:
+                self._drop_first(overflow)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO answers (question, answer, vector, created, version) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (question, answer, vector.tobytes(), created, self._version),
+                )
+                self._conn.commit()
+
+    def invalidate(self) -> None:
+        """Tüm kayıtları siler"""
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._answers),
+        }
+
+
+_cache: Optional[SemanticAnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Ortam değişkenlerine göre paylaşılan yanıt cache'ini döndürür (kapalıysa None)"""
+    global _cache
+    if os.getenv("ANSWER_CACHE_ENABLED", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = SemanticAnswerCache(
+                        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+                        ttl=float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600))),
+                        path=os.getenv("ANSWER_CACHE_PATH") or None,
+                    )
+                except Exception as e:
+                    logger.warning(f"Yanıt cache'i başlatılamadı: {e}")
+                    return None
+    return _cache
@@ -0,0 +1,42 @@
+"""
+Asenkron İstemciler
+===================
+Zincirlerin async sürümlerinin paylaştığı AsyncOpenAI ve AsyncQdrantClient
+örnekleri. Ayarlar senkron istemcilerle aynıdır.
+"""
+import logging
+import os
+
+_async_openai_client = None
+_async_qdrant_client = None
+
+def get_async_openai_client():
+    """AsyncOpenAI client'ı lazy loading ile al"""
+    global _async_openai_client
+    if _async_openai_client is None:
+        try:
+            from openai import AsyncOpenAI
+            _async_openai_client = AsyncOpenAI()
+        except Exception as e:
+            logging.error(f"AsyncOpenAI client oluşturulamadı: {e}")
+            raise
+    return _async_openai_client
+
+def get_async_qdrant_client():
+    """AsyncQdrantClient'ı lazy loading ile al"""
+    global _async_qdrant_client
+    if _async_qdrant_client is None:
+        try:
+            from qdrant_client import AsyncQdrantClient
+            _async_qdrant_client = AsyncQdrantClient(
+                url=os.getenv("QDRANT_URL"),
+                api_key=os.getenv("QDRANT_API_KEY"),
+                prefer_grpc=True,
+                grpc_port=6334,
+                timeout=30,
+                check_compatibility=False
+            )
+        except Exception as e:
+            logging.error(f"AsyncQdrantClient oluşturulamadı: {e}")
+            raise
+    return _async_qdrant_client
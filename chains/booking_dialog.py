@@ -3,11 +3,17 @@
 # Cullinan Hotel – Akıcı Rezervasyon Diyaloğu (URL dahili)
 # =====================================================================
 from __future__ import annotations
-import logging, re, time
+import json, logging, os, re, struct, threading, time
+from collections import deque
 from datetime import datetime, date
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Generator, Iterator, List, Optional, Tuple
 from urllib.parse import urlencode, quote_plus
 from openai import OpenAI            # pip install openai>=1.0
+from chains.async_clients import get_async_openai_client
+from chains.slot_extractor import extract_slots
+from chains.context_builder import count_tokens, truncate_tokens
+from chains.prompt_cache_stats import record_usage
+from latency_stats import stage
 
 # ---------------------------------------------------------------------
 # Genel Ayarlar
@@ -36,6 +42,17 @@ DOMAIN      = "www.cullinanhotels.com"
 LANGUAGEID  = 1
 ANCHOR      = "guestsandrooms"
 
+# Geçmiş sınırları: son N tur (kullanıcı + asistan) aynen gönderilir, daha
+# eskileri zaten "Toplanan veriler" içinde olduğundan atılır. Her çağrının
+# toplam prompt'u PROMPT_TOKEN_LIMIT'i aşamaz.
+HISTORY_TURNS      = int(os.getenv("BOOKING_HISTORY_TURNS", "3"))
+PROMPT_TOKEN_LIMIT = int(os.getenv("BOOKING_PROMPT_TOKEN_LIMIT", "1200"))
+MESSAGE_OVERHEAD   = 4   # Mesaj başına rol/ayraç tokenları
+
+# Veri çıkarım modu: "text" → `---` sonrası anahtar=deger satırları,
+# "json" → JSON şemasıyla yapılandırılmış çıktı (response_format)
+EXTRACTION_MODE = os.getenv("BOOKING_EXTRACTION_MODE", "text")
+
 # Zorunlu alanlar  (çocuk sayısı 0 olabilir)
 REQUIRED = [
     "giris_tarihi",
@@ -45,6 +62,184 @@ REQUIRED = [
     "oda_sayisi"
 ]
 
+# ---------------------------------------------------------------------
+# Oturum Durumu
+# ---------------------------------------------------------------------
+# Ring buffer kapasitesi: son HISTORY_TURNS tur + geçerli tur
+HISTORY_LIMIT = 2 * HISTORY_TURNS + 2
+
+_ROLES = ("user", "assistant")
+_HEADER = struct.Struct("<BIIbbbBIH")   # sürüm, tarihler, sayılar, yaş/katlanan/geçmiş adedi
+_MESSAGE = struct.Struct("<BI")         # rol, metin uzunluğu
+_VERSION = 1
+
+class BookingState:
+    """
+    Tek bir rezervasyon konuşmasının durumu. Alanlar __slots__ ile tutulur,
+    geçmiş (rol, metin) demetlerinden oluşan sabit kapasiteli bir ring
+    buffer'dır. Eski kodla uyum için dict gibi de kullanılabilir
+    (state["oda_sayisi"], "giris_tarihi" in state, state.get(...)); değeri
+    None olan alan yok sayılır. state["history"] salt okunur bir kopyadır
+    (tuple); geçmişe yalnızca add_message ile yazılır.
+    """
+    __slots__ = ("giris_tarihi", "cikis_tarihi", "yetiskin_sayisi", "cocuk_sayisi",
+                 "oda_sayisi", "cocuk_yaslari", "history", "history_folded")
+
+    FIELDS = ("giris_tarihi", "cikis_tarihi", "yetiskin_sayisi",
+              "cocuk_sayisi", "oda_sayisi", "cocuk_yaslari")
+
+    def __init__(self) -> None:
+        self.giris_tarihi: Optional[str] = None      # ISO YYYY-MM-DD
+        self.cikis_tarihi: Optional[str] = None
+        self.yetiskin_sayisi: Optional[int] = None
+        self.cocuk_sayisi: Optional[int] = None
+        self.oda_sayisi: Optional[int] = None
+        self.cocuk_yaslari: Optional[List[int]] = None
+        self.history: deque = deque(maxlen=HISTORY_LIMIT)
+        self.history_folded: int = 0
+
+    # --- Geçmiş -------------------------------------------------------
+    def add_message(self, role: str, content: str) -> None:
+        """Geçmişe mesaj ekler; kapasite doluysa en eskisi katlanır"""
+        if len(self.history) == self.history.maxlen:
+            self.history_folded += 1
+        self.history.append((role, content))
+
+    def fold(self, keep: int) -> None:
+        """Yalnızca son `keep` mesajı tutar"""
+        while len(self.history) > max(keep, 0):
+            self.history.popleft()
+            self.history_folded += 1
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Geçmişi chat API mesajları olarak döndürür"""
+        return [{"role": role, "content": content} for role, content in self.history]
+
+    # --- dict uyumluluğu ----------------------------------------------
+    def __getitem__(self, key: str) -> Any:
+        if key == "history":
+            # Salt okunur: eski kod state["history"].append(...) ile yazmaya
+            # çalışırsa yazma sessizce kaybolmasın, hata versin
+            return tuple(self.messages())
+        if key == "history_folded":
+            return self.history_folded
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "history":
+            self.history = deque(((m["role"], m["content"]) for m in value),
+                                 maxlen=HISTORY_LIMIT)
+        elif key == "history_folded" or key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        setattr(self, key, None)
+
+    def __contains__(self, key: object) -> bool:
+        if key in ("history", "history_folded"):
+            return True
+        return key in self.FIELDS and getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            if getattr(self, key) is not None:
+                yield key
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for key in self.keys():
+            yield key, getattr(self, key)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        for key, value in data.items():
+            self[key] = value
+
+    def to_dict(self, with_history: bool = False) -> Dict[str, Any]:
+        """Loglama / JSON için sade sözlük"""
+        d = dict(self.items())
+        if with_history:
+            d["history"] = self.messages()
+        return d
+
+    @classmethod
+    def coerce(cls, state: Any) -> "BookingState":
+        """
+        Eski dict durumlarını (ör. {} veya önceki sürümler) BookingState'e
+        çevirir. Alan değerleri merge() doğrulamasından geçer; geçersizler
+        ("12 Ağustos" gibi ISO olmayan tarihler) atılır ve tekrar sorulur.
+        """
+        if isinstance(state, cls):
+            return state
+        state = state or {}
+        new = cls()
+        if "history" in state:
+            new["history"] = state["history"]
+        new.history_folded = int(state.get("history_folded") or 0)
+        merge(new, {k: v for k, v in state.items() if k in cls.FIELDS and v is not None})
+        return new
+
+    # --- Serileştirme -------------------------------------------------
+    def to_bytes(self) -> bytes:
+        """Sabit başlık + yaşlar + (rol, uzunluk, UTF-8 metin) kayıtları"""
+        def ordinal(iso):
+            return date.fromisoformat(iso).toordinal() if iso else 0
+
+        def count(n):
+            return -1 if n is None else n
+
+        ages = self.cocuk_yaslari or []
+        parts = [
+            _HEADER.pack(_VERSION, ordinal(self.giris_tarihi), ordinal(self.cikis_tarihi),
+                         count(self.yetiskin_sayisi), count(self.cocuk_sayisi),
+                         count(self.oda_sayisi), len(ages), self.history_folded,
+                         len(self.history)),
+            bytes(ages),
+        ]
+        for role, content in self.history:
+            text = content.encode("utf-8")
+            parts.append(_MESSAGE.pack(_ROLES.index(role), len(text)))
+            parts.append(text)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BookingState":
+        (version, gi, co, adults, children, rooms, n_ages, folded,
+         n_history) = _HEADER.unpack_from(data, 0)
+        if version != _VERSION:
+            raise ValueError(f"Desteklenmeyen BookingState sürümü: {version}")
+        new = cls()
+        new.giris_tarihi = date.fromordinal(gi).isoformat() if gi else None
+        new.cikis_tarihi = date.fromordinal(co).isoformat() if co else None
+        new.yetiskin_sayisi = None if adults < 0 else adults
+        new.cocuk_sayisi = None if children < 0 else children
+        new.oda_sayisi = None if rooms < 0 else rooms
+        offset = _HEADER.size
+        if n_ages:
+            new.cocuk_yaslari = list(data[offset:offset + n_ages])
+        offset += n_ages
+        new.history_folded = folded
+        for _ in range(n_history):
+            role, length = _MESSAGE.unpack_from(data, offset)
+            offset += _MESSAGE.size
+            new.history.append((_ROLES[role], data[offset:offset + length].decode("utf-8")))
+            offset += length
+        return new
+
+    def __repr__(self) -> str:
+        return f"BookingState({self.to_dict()}, history={len(self.history)})"
+
 # ---------------------------------------------------------------------
 # Yardımcı Fonksiyonlar
 # ---------------------------------------------------------------------
@@ -113,47 +308,116 @@ def summary(st: Dict[str, Any]) -> str:
 # ---------------------------------------------------------------------
 # Sistem Mesajı
 # ---------------------------------------------------------------------
-def system_prompt(st: Dict[str, Any]) -> str:
+# Sabit talimat bloğu: her çağrıda bayt bayt aynı kalır ki sağlayıcı tarafı
+# prompt cache'i öneki yeniden kullanabilsin. Tarih, toplanan veriler ve
+# eksik alanlar mesaj listesinin sonuna ayrı bir system mesajı olarak eklenir.
+_BASE_INSTRUCTIONS = (
+    "Sen Cullinan Hotel’in Türkçe konuşan sanal rezervasyon asistanısın.\n"
+    "• Kullanıcıyı biçimlere zorlamadan, **tek ve kapsayıcı sorularla** "
+    "giriş/çıkış tarihleri, yetişkin & çocuk sayısı, oda sayısı ve "
+    "(gerekirse) çocuk yaşlarını öğren.\n"
+    "• Eksik birden çok alan varsa şu tip sor: "
+    "“Hangi tarihler arasında, kaç yetişkin ve çocukla, kaç odada "
+    "konaklamayı planlıyorsunuz?”\n"
+    "• Gereksiz hiçbir detay isteme.\n"
+    "• Tarihleri ISO `YYYY-MM-DD` biçiminde döndür.\n"
+    "• Konuşmanın sonundaki *Durum* mesajı bugünün tarihini, toplanan "
+    "verileri ve eksik alanları içerir.\n"
+)
+
+SYSTEM_INSTRUCTIONS = _BASE_INSTRUCTIONS + (
+    "• **Tüm** alanlar tamamlandığında özetle ve mutlaka *‘evet/hayır’* "
+    "onayı iste. Kullanıcı onay verirse, aşağıdaki *ikinci bölümde* "
+    "KESİNLİKLE `karar=ONAY` satırı bulunsun.\n"
+    "• Cevaplarının İKİ bölümü olsun, `---` çizgisiyle ayır:\n"
+    "  1) Kullanıcıya giden sohbet metni.\n"
+    "  2) Çıkardığın veriler: her satır `anahtar=deger` veya `karar=ONAY/RED`.\n"
+)
+
+SYSTEM_INSTRUCTIONS_JSON = _BASE_INSTRUCTIONS + (
+    "• **Tüm** alanlar tamamlandığında özetle ve mutlaka *‘evet/hayır’* "
+    "onayı iste. Kullanıcı onay verirse `karar` alanını `ONAY`, "
+    "reddederse `RED` yap.\n"
+    "• Cevabını verilen JSON şemasında döndür: `reply` kullanıcıya giden "
+    "sohbet metni; diğer alanlar bu mesajdan çıkardığın veriler, "
+    "bilinmeyenler `null`.\n"
+)
+
+# Yapılandırılmış çıktı şeması (EXTRACTION_MODE="json")
+BOOKING_SCHEMA = {
+    "name": "booking_turn",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "reply":           {"type": "string"},
+            "giris_tarihi":    {"type": ["string", "null"]},
+            "cikis_tarihi":    {"type": ["string", "null"]},
+            "yetiskin_sayisi": {"type": ["integer", "null"]},
+            "cocuk_sayisi":    {"type": ["integer", "null"]},
+            "oda_sayisi":      {"type": ["integer", "null"]},
+            "cocuk_yaslari":   {"type": ["array", "null"], "items": {"type": "integer"}},
+            "karar":           {"type": ["string", "null"], "enum": ["ONAY", "RED", None]},
+        },
+        "required": ["reply", "giris_tarihi", "cikis_tarihi", "yetiskin_sayisi",
+                     "cocuk_sayisi", "oda_sayisi", "cocuk_yaslari", "karar"],
+        "additionalProperties": False,
+    },
+}
+
+def state_prompt(st: Dict[str, Any]) -> str:
+    """Her turda değişen kısım: tarih, toplanan veriler, eksik alanlar"""
     today = date.today().isoformat()
-    known = {k: v for k, v in st.items() if k not in {"history"}}
+    known = {k: v for k, v in st.items() if k not in {"history", "history_folded"}}
     miss  = missing(st)
 
-    instr = (
-        "Sen Cullinan Hotel’in Türkçe konuşan sanal rezervasyon asistanısın.\n"
-        "• Kullanıcıyı biçimlere zorlamadan, **tek ve kapsayıcı sorularla** "
-        "giriş/çıkış tarihleri, yetişkin & çocuk sayısı, oda sayısı ve "
-        "(gerekirse) çocuk yaşlarını öğren.\n"
-        "• Eksik birden çok alan varsa şu tip sor: "
-        "“Hangi tarihler arasında, kaç yetişkin ve çocukla, kaç odada "
-        "konaklamayı planlıyorsunuz?”\n"
-        "• Gereksiz hiçbir detay isteme.\n"
-        "• **Tüm** alanlar tamamlandığında özetle ve mutlaka *‘evet/hayır’* "
-        "onayı iste. Kullanıcı onay verirse, aşağıdaki *ikinci bölümde* "
-        "KESİNLİKLE `karar=ONAY` satırı bulunsun.\n"
-        "• Cevaplarının İKİ bölümü olsun, `---` çizgisiyle ayır:\n"
-        "  1) Kullanıcıya giden sohbet metni.\n"
-        "  2) Çıkardığın veriler: her satır `anahtar=deger` veya `karar=ONAY/RED`.\n"
-        "• Tarihleri ISO `YYYY-MM-DD` biçiminde döndür.\n"
-    )
-
     context = ("Eksik alanlar: " + (", ".join(miss) if miss else
                "— yok, onay iste."))
-    return f"{instr}\nBugün: {today}\nToplanan veriler: {known or '—'}\n{context}"
+    if st.get("history_folded"):
+        context += (f"\nÖnceki {st['history_folded']} mesaj kısaltıldı; o mesajlardaki "
+                    "bilgiler yukarıdaki toplanan verilerde yer alıyor.")
+    return f"Durum\nBugün: {today}\nToplanan veriler: {known or '—'}\n{context}"
+
+def _instructions() -> str:
+    return SYSTEM_INSTRUCTIONS_JSON if _mode() == "json" else SYSTEM_INSTRUCTIONS
+
+def system_prompt(st: Dict[str, Any]) -> str:
+    return f"{_instructions()}\n{state_prompt(st)}"
 
 # ---------------------------------------------------------------------
 # LLM Çağrısı
 # ---------------------------------------------------------------------
-@timed("LLM")
-def llm_step(state: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
-    msgs = [{"role": "system", "content": system_prompt(state)}] + state["history"]
-    resp = client.chat.completions.create(
-        model       = CHAT_MODEL,
-        messages    = msgs,
-        temperature = 0.2,
-        max_tokens  = 350
-    )
-    raw = resp.choices[0].message.content.strip()
-    part1, part2 = (raw.split("---", 1) + ["", ""])[:2]
+SEPARATOR = "---"
+JSON_FALLBACK_REPLY = ("Bilgilerinizi tam anlayamadım. Hangi tarihler arasında, "
+                       "kaç yetişkin ve çocukla, kaç odada konaklamak istersiniz?")
+
+# Mod başına çıkarım sayaçları: LLM çağrısı, ayrıştırılamayan yanıt,
+# merge() tarafından reddedilen alan
+_stats_lock = threading.Lock()
+_extraction_stats = {
+    mode: {"calls": 0, "parse_failures": 0, "invalid_fields": 0}
+    for mode in ("text", "json")
+}
+
+def _count(mode: str, key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _extraction_stats[mode][key] += n
+
+def extraction_stats() -> Dict[str, Dict[str, float]]:
+    """Mod başına çağrı / ayrıştırma hatası / geçersiz alan sayıları"""
+    with _stats_lock:
+        return {
+            mode: dict(c, failure_rate=c["parse_failures"] / c["calls"] if c["calls"] else 0.0)
+            for mode, c in _extraction_stats.items()
+        }
+
+def _parse_reply(raw: str) -> Tuple[str, Dict[str, str]]:
+    """LLM çıktısını (sohbet metni, anahtar=deger verileri) olarak ayırır"""
+    _count("text", "calls")
+    if SEPARATOR not in raw:
+        _count("text", "parse_failures")
+        log.warning("LLM yanıtında veri bölümü yok: %r", raw[:120])
+    part1, part2 = (raw.split(SEPARATOR, 1) + ["", ""])[:2]
 
     data: Dict[str, str] = {}
     for line in part2.strip().splitlines():
@@ -162,49 +426,284 @@ def llm_step(state: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
             data[k.strip()] = v.strip()
     return part1.strip(), data
 
-def merge(state: Dict[str, Any], data: Dict[str, str]) -> None:
-    if "giris_tarihi"   in data: state["giris_tarihi"]   = data["giris_tarihi"]
-    if "cikis_tarihi"   in data: state["cikis_tarihi"]   = data["cikis_tarihi"]
-    if "yetiskin_sayisi" in data:
-        try: state["yetiskin_sayisi"] = int(data["yetiskin_sayisi"])
-        except: pass
-    if "cocuk_sayisi" in data:
-        try: state["cocuk_sayisi"] = int(data["cocuk_sayisi"])
-        except: pass
-    if "oda_sayisi"   in data:
-        try: state["oda_sayisi"]   = int(data["oda_sayisi"])
-        except: pass
+def _parse_json_reply(raw: str) -> Tuple[str, Dict[str, Any]]:
+    """JSON şemalı yanıtı (sohbet metni, veriler) olarak ayırır; null alanlar atlanır"""
+    _count("json", "calls")
+    try:
+        obj = json.loads(raw)
+        if not isinstance(obj, dict) or not isinstance(obj.get("reply"), str):
+            raise ValueError("reply alanı eksik")
+        reply = obj.pop("reply")
+    except ValueError as e:
+        _count("json", "parse_failures")
+        log.warning("JSON yanıtı ayrıştırılamadı (%s): %r", e, raw[:120])
+        return JSON_FALLBACK_REPLY, {}
+    return reply.strip(), {k: v for k, v in obj.items() if v is not None}
+
+def _mode() -> str:
+    return "json" if EXTRACTION_MODE == "json" else "text"
+
+def _parse(raw: str) -> Tuple[str, Dict[str, Any]]:
+    return _parse_json_reply(raw) if _mode() == "json" else _parse_reply(raw)
+
+def _messages(state: BookingState) -> List[Dict[str, str]]:
+    """
+    LLM mesajları: sabit talimatlar + son HISTORY_TURNS tur + durum mesajı.
+    Token tavanı aşılırsa en eski mesajlar da katlanır; son kullanıcı mesajı
+    tek başına sığmıyorsa kırpılır.
+    """
+    # Geçerli kullanıcı mesajı + önceki HISTORY_TURNS tam tur
+    state.fold(2 * HISTORY_TURNS + 1)
+    history = state.history
+
+    def size(msgs):
+        return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in msgs)
+
+    static = {"role": "system", "content": _instructions()}
+    status = {"role": "system", "content": state_prompt(state)}
+    while len(history) > 1 and size([static, status] + state.messages()) > PROMPT_TOKEN_LIMIT:
+        state.fold(len(history) - 1)
+        status = {"role": "system", "content": state_prompt(state)}
+
+    turns = state.messages()
+    over = size([static, status] + turns) - PROMPT_TOKEN_LIMIT
+    if over > 0 and turns and turns[-1]["role"] == "user":
+        last = turns[-1]
+        last["content"] = truncate_tokens(last["content"], count_tokens(last["content"]) - over)
+    return [static] + turns + [status]
+
+def _completion_args(state: BookingState) -> Dict[str, Any]:
+    args = dict(
+        model       = CHAT_MODEL,
+        messages    = _messages(state),
+        temperature = 0.2,
+        max_tokens  = 350
+    )
+    if _mode() == "json":
+        args["response_format"] = {"type": "json_schema", "json_schema": BOOKING_SCHEMA}
+    return args
+
+@timed("LLM")
+def llm_step(state: BookingState) -> Tuple[str, Dict[str, Any]]:
+    with stage("completion"):
+        resp = client.chat.completions.create(**_completion_args(state))
+    record_usage("booking", resp.usage)
+    raw = (resp.choices[0].message.content or "").strip()
+    return _parse(raw)
+
+async def allm_step(state: BookingState) -> Tuple[str, Dict[str, Any]]:
+    """llm_step'in async sürümü"""
+    t0 = time.time()
+    try:
+        with stage("completion"):
+            resp = await get_async_openai_client().chat.completions.create(
+                **_completion_args(state)
+            )
+    finally:
+        log.debug("LLM %.0f ms", (time.time() - t0) * 1000)
+    record_usage("booking", resp.usage)
+    raw = (resp.choices[0].message.content or "").strip()
+    return _parse(raw)
+
+def llm_step_stream(
+    state: BookingState
+) -> Generator[str, None, Tuple[str, Dict[str, str]]]:
+    """
+    llm_step'in akış sürümü: `---` ayracından önceki sohbet metnini parça
+    parça yield eder, veri bölümünü kullanıcıya göstermez.
+    Generator'ın dönüş değeri llm_step ile aynıdır: (metin, veriler).
+    JSON modunda sohbet metni yanıt tamamlanınca tek parça olarak gelir.
+    """
+    if _mode() == "json":
+        reply, data = llm_step(state)
+        yield reply
+        return reply, data
+
+    raw, emitted, cut = "", 0, False
+    # Akışta ölçülen süre, parçaları tüketen tarafın bekleme süresini de içerir
+    with stage("completion"):
+        stream = client.chat.completions.create(
+            **_completion_args(state),
+            stream      = True,
+            stream_options = {"include_usage": True}
+        )
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                record_usage("booking", chunk.usage)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            raw += delta
+            if cut:
+                continue
+            sep = raw.find(SEPARATOR)
+            if sep >= 0:
+                cut = True
+                visible_end = sep
+            else:
+                # Parçalar arasında bölünmüş olabilecek ayraç için pay bırak
+                visible_end = len(raw) - (len(SEPARATOR) - 1)
+            if visible_end > emitted:
+                yield raw[emitted:visible_end]
+                emitted = visible_end
+    if not cut and len(raw) > emitted:
+        yield raw[emitted:]
+    return _parse_reply(raw.strip())
+
+# Sayısal alanların geçerli aralıkları
+COUNT_LIMITS = {
+    "yetiskin_sayisi": (1, 20),
+    "cocuk_sayisi":    (0, 10),
+    "oda_sayisi":      (1, 10),
+}
+MAX_CHILD_AGE = 17
+
+def _valid_date(value: Any) -> str:
+    """ISO tarih metnini doğrular; geçmiş tarihleri reddeder"""
+    d = date.fromisoformat(str(value).strip())
+    if d < date.today():
+        raise ValueError("geçmiş tarih")
+    return d.isoformat()
+
+def _valid_count(key: str, value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError("sayı değil")
+    n = int(str(value).strip())
+    lo, hi = COUNT_LIMITS[key]
+    if not lo <= n <= hi:
+        raise ValueError(f"{lo}-{hi} aralığı dışında")
+    return n
+
+def _valid_ages(value: Any) -> List[int]:
+    ages = ([int(a) for a in value] if isinstance(value, list)
+            else [int(n) for n in re.findall(r"\d+", str(value))])
+    if not ages or any(not 0 <= a <= MAX_CHILD_AGE for a in ages):
+        raise ValueError("geçersiz yaş")
+    if len(ages) > COUNT_LIMITS["cocuk_sayisi"][1]:
+        raise ValueError("çok fazla yaş")
+    return ages
+
+def merge(state: Dict[str, Any], data: Dict[str, Any]) -> List[str]:
+    """
+    Verileri doğrulayarak state'e işler. Metin ("2") veya tipli (2) değerler
+    kabul edilir; geçersiz alanlar atlanır ve listesi döndürülür.
+    """
+    rejected = []
+    updates: Dict[str, Any] = {}
+    for key in ("giris_tarihi", "cikis_tarihi"):
+        if key in data:
+            try: updates[key] = _valid_date(data[key])
+            except (TypeError, ValueError): rejected.append(key)
+    for key in COUNT_LIMITS:
+        if key in data:
+            try: updates[key] = _valid_count(key, data[key])
+            except (TypeError, ValueError): rejected.append(key)
     if "cocuk_yaslari" in data:
-        state["cocuk_yaslari"] = [int(n) for n in re.findall(r"\d+", data["cocuk_yaslari"])]
+        try: updates["cocuk_yaslari"] = _valid_ages(data["cocuk_yaslari"])
+        except (TypeError, ValueError): rejected.append("cocuk_yaslari")
+
+    # Yaş sayısı çocuk sayısını aşamaz
+    children = updates.get("cocuk_sayisi", state.get("cocuk_sayisi"))
+    if children is not None:
+        if len(updates.get("cocuk_yaslari", ())) > children:
+            del updates["cocuk_yaslari"]
+            rejected.append("cocuk_yaslari")
+        elif "cocuk_yaslari" not in updates and len(state.get("cocuk_yaslari") or ()) > children:
+            # Çocuk sayısı azaldı: eski yaşlar silinir ve gerekirse yeniden sorulur
+            del state["cocuk_yaslari"]
+
+    # Çıkış girişten sonra olmalı
+    gi = updates.get("giris_tarihi", state.get("giris_tarihi"))
+    co = updates.get("cikis_tarihi", state.get("cikis_tarihi"))
+    if gi and co and co <= gi:
+        if "cikis_tarihi" in updates:
+            # Yeni çıkış tarihi (tek başına ya da girişle birlikte) tutarsız
+            for key in ("giris_tarihi", "cikis_tarihi"):
+                if key in updates:
+                    del updates[key]
+                    rejected.append(key)
+        else:
+            # Giriş ileri alındı ve eski çıkışı geçti: giriş kabul edilir,
+            # eski çıkış silinir ve yeniden sorulur
+            log.info("Giriş tarihi eski çıkış tarihini geçti; çıkış tarihi yeniden sorulacak")
+            del state["cikis_tarihi"]
+
+    state.update(updates)
+    if rejected:
+        log.info("Geçersiz rezervasyon alanları atlandı: %s", ", ".join(rejected))
+    return rejected
 
 # Heuristik “evet/onay” kelimeleri
 _POSITIVE_WORDS = ("onay", "evet", "kabul", "tamam", "olur", "onaylıyorum",
                    "onayladım", "peki")
 
+_NEGATIVE_WORDS = ("hayır", "hayir", "değil", "yanlış", "iptal", "vazgeç",
+                   "onaylamıyorum", "istemiyorum")
+
 def _user_confirms(text: str) -> bool:
     t = text.lower()
     return any(w in t for w in _POSITIVE_WORDS)
 
-# ---------------------------------------------------------------------
-# Ana Fonksiyon
-# ---------------------------------------------------------------------
-def handle_booking(
-    state: Dict[str, Any],
-    user_msg: str
-) -> Tuple[Dict[str, Any], str, bool]:
+# LLM'siz onay için mesaj yalnızca bu kelimelerden oluşmalı
+_CONFIRM_TOKENS = {"evet", "onay", "onaylıyorum", "onayladım", "onaylarım", "kabul",
+                   "tamam", "tamamdır", "olur", "peki", "ok", "okey", "aynen", "doğru"}
+_CONFIRM_FILLER = {"ediyorum", "ederim", "lütfen", "hepsi", "bilgiler", "çok", "güzel",
+                   "harika", "süper", "teşekkürler", "teşekkür", "sağolun", "ben", "de", "da"}
+_TOKEN = re.compile(r"\w+")
+
+def _bare_confirmation(text: str) -> bool:
     """
-    ► state    : Oturum belleği (ilk çağrıda {})
-    ► user_msg : Kullanıcı mesajı
-    ◄ returns  : (güncellenmiş state, asistan cevabı, işlem tamam mı)
+    Mesaj yalnızca bir onaydan mı ibaret? ("Evet, onaylıyorum" → True;
+    "peki ya kahvaltı dahil mi?", "evet ama bir oda daha" → False)
+    """
+    if "?" in text:
+        return False
+    tokens = _TOKEN.findall(text.replace("I", "ı").replace("İ", "i").lower())
+    return (any(t in _CONFIRM_TOKENS for t in tokens)
+            and all(t in _CONFIRM_TOKENS or t in _CONFIRM_FILLER for t in tokens))
+
+def _user_declines(text: str) -> bool:
+    t = text.lower()
+    return any(w in t for w in _NEGATIVE_WORDS)
+
+def _start_turn(state: Any, user_msg: str) -> BookingState:
+    state = BookingState.coerce(state)
+    state.add_message("user", user_msg)
+    return state
+
+def _rule_based_turn(state: BookingState, user_msg: str):
     """
-    if "history" not in state:
-        state["history"] = []
+    Kural tabanlı slot çıkarımı. Bulunan alanlar her durumda state'e işlenir;
+    LLM'e gerek kalmıyorsa (tüm alanlar tamam veya özet onaylandı)
+    (cevap, tamam mı) döner, aksi halde None.
+    """
+    was_complete = not missing(state)
+    slots = extract_slots(user_msg, state)
+    merge(state, slots)
+    if missing(state) or _user_declines(user_msg):
+        return None
 
-    state["history"].append({"role": "user", "content": user_msg})
+    # Özet gösterilmişti ve kullanıcı yeni bilgi vermeden yalnızca onayladı;
+    # soru veya değişiklik isteği içeren mesajlar LLM'e gider
+    if was_complete and not slots and _bare_confirmation(user_msg):
+        log.info("Rezervasyon onayı LLM'siz işlendi")
+        return _finish_turn(state, user_msg, "", {"karar": "ONAY"})
+    # Bu mesajla tüm alanlar tamamlandı → doğrudan özet
+    if slots:
+        log.info("Rezervasyon alanları LLM'siz tamamlandı: %s", ", ".join(slots))
+        return _finish_turn(state, "", "", {})
+    return None
 
-    # LLM yanıtı
-    reply, parsed = llm_step(state)
-    merge(state, parsed)
+def _finish_turn(
+    state: BookingState,
+    user_msg: str,
+    reply: str,
+    parsed: Dict[str, str]
+) -> Tuple[str, bool]:
+    """LLM verilerini state'e işler; nihai cevabı ve tamamlanma durumunu döndürür"""
+    rejected = merge(state, parsed)
+    if rejected:
+        _count(_mode(), "invalid_fields", len(rejected))
 
     # Tamamlandı mı?
     finished = False
@@ -230,7 +729,63 @@ def handle_booking(
     elif no_missing and parsed.get("karar") != "RED":
         reply = summary(state)
 
-    state["history"].append({"role": "assistant", "content": reply})
+    state.add_message("assistant", reply)
+    return reply, finished
+
+# ---------------------------------------------------------------------
+# Ana Fonksiyon
+# ---------------------------------------------------------------------
+def handle_booking(
+    state: BookingState | Dict[str, Any],
+    user_msg: str
+) -> Tuple[BookingState, str, bool]:
+    """
+    ► state    : BookingState (ilk çağrıda {} de verilebilir)
+    ► user_msg : Kullanıcı mesajı
+    ◄ returns  : (güncellenmiş state, asistan cevabı, işlem tamam mı)
+    """
+    state = _start_turn(state, user_msg)
+    shortcut = _rule_based_turn(state, user_msg)
+    if shortcut is not None:
+        return (state, *shortcut)
+
+    # LLM yanıtı
+    reply, parsed = llm_step(state)
+    reply, finished = _finish_turn(state, user_msg, reply, parsed)
+    return state, reply, finished
+
+async def ahandle_booking(
+    state: BookingState | Dict[str, Any],
+    user_msg: str
+) -> Tuple[BookingState, str, bool]:
+    """handle_booking'in async sürümü"""
+    state = _start_turn(state, user_msg)
+    shortcut = _rule_based_turn(state, user_msg)
+    if shortcut is not None:
+        return (state, *shortcut)
+
+    reply, parsed = await allm_step(state)
+    reply, finished = _finish_turn(state, user_msg, reply, parsed)
+    return state, reply, finished
+
+def handle_booking_stream(
+    state: BookingState | Dict[str, Any],
+    user_msg: str
+) -> Generator[str, None, Tuple[BookingState, str, bool]]:
+    """
+    handle_booking'in akış sürümü. LLM'in sohbet metnini parça parça yield
+    eder; dönüş değeri handle_booking ile aynıdır: (state, cevap, tamam mı).
+    Nihai cevap özet veya rezervasyon bağlantısıyla değiştirilmiş olabilir,
+    bu yüzden arayüz akış bitince dönüş değerindeki cevabı göstermelidir.
+    """
+    state = _start_turn(state, user_msg)
+    shortcut = _rule_based_turn(state, user_msg)
+    if shortcut is not None:
+        yield shortcut[0]
+        return (state, *shortcut)
+
+    reply, parsed = yield from llm_step_stream(state)
+    reply, finished = _finish_turn(state, user_msg, reply, parsed)
     return state, reply, finished
 
 # ---------------------------------------------------------------------
@@ -0,0 +1,130 @@
+"""
+Token Bütçeli Context Oluşturucu
+================================
+RAG zincirinde getirilen parçaları olduğu gibi birleştirmek yerine:
+
+1. Skora göre sıralar,
+2. Birbirinin neredeyse aynısı olan parçaları eler (kelime 3-gram Jaccard),
+3. Tokenizer ile ölçülen bütçe dolunca durur. En yüksek skorlu parça her
+   zaman girer; bütçeden büyükse bütçeye kırpılır.
+
+Tokenizer olarak tiktoken kullanılır; kurulu değilse karakter sayısından
+kaba bir tahmin yapılır.
+"""
+from typing import Iterable, List, Optional, Set, Tuple
+import logging
+import os
+import re
+
+logger = logging.getLogger("hotel_chatbot.context_builder")
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+DEFAULT_DUP_THRESHOLD = float(os.getenv("RAG_CONTEXT_DUP_THRESHOLD", "0.85"))
+SEPARATOR = "\n\n"
+
+_encoder = None
+_encoder_loaded = False
+_WORD = re.compile(r"\w+")
+
+
+def _get_encoder():
+    """tiktoken encoder'ını lazy loading ile al (yoksa None)"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")  # gpt-4o ailesi
+        except Exception as e:
+            logger.warning(f"tiktoken kullanılamıyor, token sayısı tahmin edilecek: {e}")
+            _encoder = None
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Metnin token sayısı"""
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    # Türkçe metinde ~3 karakter/token
+    return max(1, len(text) // 3) if text else 0
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Metni en fazla max_tokens token olacak şekilde baştan keser"""
+    if max_tokens <= 0:
+        return ""
+    encoder = _get_encoder()
+    if encoder is not None:
+        tokens = encoder.encode(text)
+        return text if len(tokens) <= max_tokens else encoder.decode(tokens[:max_tokens])
+    return text[:max_tokens * 3]
+
+
+def _shingles(text: str, n: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < n:
+        return {tuple(words)}
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def build_context(
+    chunks: Iterable[Tuple[str, float]],
+    token_budget: Optional[int] = None,
+    dup_threshold: Optional[float] = None
+) -> Tuple[str, List[str], int]:
+    """
+    (metin, skor) parçalarından bütçeli context üretir.
+
+    Returns:
+        (context metni, seçilen parçalar, context token sayısı)
+    """
+    budget = DEFAULT_TOKEN_BUDGET if token_budget is None else token_budget
+    threshold = DEFAULT_DUP_THRESHOLD if dup_threshold is None else dup_threshold
+    sep_tokens = count_tokens(SEPARATOR)
+
+    selected: List[str] = []
+    seen: List[Set] = []
+    used = 0
+    dropped_dup = dropped_budget = 0
+    truncated = False
+
+    for text, _score in sorted(chunks, key=lambda c: c[1], reverse=True):
+        text = text.strip()
+        if not text:
+            continue
+
+        sh = _shingles(text)
+        if any(_jaccard(sh, other) >= threshold for other in seen):
+            dropped_dup += 1
+            continue
+
+        cost = count_tokens(text) + (sep_tokens if selected else 0)
+        if not selected and cost > budget:
+            # En ilgili parça bütçeden büyük: atlamak yerine bütçeye kırpılır
+            text = truncate_tokens(text, budget)
+            if not text:
+                break
+            cost = count_tokens(text)
+            truncated = True
+        elif used + cost > budget:
+            # Daha kısa bir parça hâlâ sığabilir; devam et
+            dropped_budget += 1
+            continue
+
+        selected.append(text)
+        seen.append(sh)
+        used += cost
+
+    logger.info(
+        f"Context oluşturuldu: {len(selected)} parça, {used} token "
+        f"(bütçe {budget}, tekrar {dropped_dup}, bütçe dışı {dropped_budget}"
+        f"{', ilk parça kırpıldı' if truncated else ''})"
+    )
+    return SEPARATOR.join(selected), selected, used
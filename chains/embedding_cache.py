@@ -0,0 +1,148 @@
+"""
+Kalıcı Embedding Cache'i
+========================
+Embedding vektörlerini SQLite içinde float32 blob olarak saklar. Anahtar,
+model adı + normalize edilmiş metindir; model değişirse eski kayıtlar
+kullanılmaz. Kayıt sayısı sınırı aşıldığında en uzun süredir kullanılmayan
+kayıtlar silinir (LRU). Streamlit yeniden başlatıldığında cache korunur.
+Okumalarda erişim zamanı hemen yazılmaz; biriktirilip sonraki yazma,
+tahliye veya kapanışta (ya da belli sayıda isabetten sonra) toplu işlenir.
+"""
+from typing import Dict, List, Optional
+from array import array
+from pathlib import Path
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import os
+
+logger = logging.getLogger("hotel_chatbot.embedding_cache")
+
+# Göreli yol proje köküne göre çözülür; çalışma dizini değişse de aynı dosya kullanılır
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PATH = str(PROJECT_ROOT / os.getenv("EMBED_CACHE_PATH", "cache/embeddings.sqlite3"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+
+
+def _cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingDiskCache:
+    """SQLite tabanlı, LRU tahliyeli embedding cache'i"""
+
+    # Bu kadar isabet birikince erişim zamanları yazılır
+    TOUCH_FLUSH_SIZE = 64
+
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                   key         TEXT PRIMARY KEY,
+                   model       TEXT NOT NULL,
+                   dim         INTEGER NOT NULL,
+                   vector      BLOB NOT NULL,
+                   last_access REAL NOT NULL
+               )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Cache'te varsa vektörü döndürür; erişim zamanı toplu yazılmak üzere biriktirilir"""
+        key = _cache_key(model, text)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT dim, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.TOUCH_FLUSH_SIZE:
+                self._flush_touched()
+                self._conn.commit()
+
+        dim, blob = row
+        vector = array("f")
+        vector.frombytes(blob)
+        if len(vector) != dim:
+            logger.warning("Bozuk embedding cache kaydı atlandı")
+            return None
+        return vector.tolist()
+
+    def put(self, model: str, text: str, vector: List[float]) -> None:
+        """Vektörü float32 olarak yazar, gerekirse LRU tahliyesi yapar"""
+        key = _cache_key(model, text)
+        blob = array("f", vector).tobytes()
+        with self._lock:
+            now = time.time()
+            self._touched.pop(key, None)
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO embeddings (key, model, dim, vector, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, len(vector), blob, now),
+            )
+            if cur.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE embeddings SET dim = ?, vector = ?, last_access = ? WHERE key = ?",
+                    (len(vector), blob, now, key),
+                )
+            self._flush_touched()
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        """Biriken erişim zamanlarını tek sorguda yazar (kilit altında çağrılır)"""
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE embeddings SET last_access = ? WHERE key = ?",
+            [(at, key) for key, at in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict(self) -> None:
+        # Her seferinde tek kayıt silmek yerine %10 pay bırak
+        target = int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "  SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (max(self._count - target, 0),),
+        )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Embedding cache tahliyesi yapıldı, kalan kayıt: {self._count}")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        """Tüm kayıtları siler"""
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._count = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,237 @@
+"""
+Paylaşılan Embedding Servisi
+============================
+Intent sınıflandırıcı ve RAG zinciri aynı kullanıcı mesajını ayrı ayrı embed
+ediyordu. Bu modül süreç genelinde tek bir embedding servisi sunar: aynı
+normalize edilmiş metin için aynı vektörü döndürür ve OpenAI'ye yalnızca bir
+kez gidilir. Süreç içi cache'in arkasında, yeniden başlatmalarda da korunan
+SQLite tabanlı bir disk cache'i bulunur (bkz. chains/embedding_cache.py).
+"""
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from array import array
+import asyncio
+import threading
+import unicodedata
+import logging
+import os
+import re
+
+from latency_stats import stage
+
+logger = logging.getLogger("hotel_chatbot.embeddings")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Cache anahtarı için metni normalize eder (NFC + boşluk sadeleştirme)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+class EmbeddingService:
+    """Süreç içi LRU cache'li, eşzamanlı çağrıları birleştiren embedding servisi"""
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        max_entries: int = 2048,
+        client=None,
+        disk_cache=None,
+        async_client=None
+    ):
+        self.model = model or os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
+        self.max_entries = max_entries
+        self._client = client
+        self._async_client = async_client
+        self.disk_cache = disk_cache
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._ainflight: Dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _get_client(self):
+        """OpenAI client'ı lazy loading ile al"""
+        if self._client is None:
+            try:
+                from openai import OpenAI
+                self._client = OpenAI()
+            except Exception as e:
+                logger.error(f"OpenAI client oluşturulamadı: {e}")
+                raise
+        return self._client
+
+    def _get_async_client(self):
+        """AsyncOpenAI client'ı lazy loading ile al"""
+        if self._async_client is None:
+            from chains.async_clients import get_async_openai_client
+            self._async_client = get_async_openai_client()
+        return self._async_client
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def embed(self, text: str) -> List[float]:
+        """Tek bir metni embed eder; aynı metin için API'ye tekrar gitmez"""
+        key = normalize_text(text)
+
+        while True:
+            with self._lock:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return list(vector)
+
+                pending = self._inflight.get(key)
+                if pending is None:
+                    # Bu metni biz hesaplayacağız
+                    pending = threading.Event()
+                    self._inflight[key] = pending
+                    self.misses += 1
+                    break
+
+            # Aynı metin başka bir thread'de embed ediliyor, sonucunu bekle
+            pending.wait()
+
+        try:
+            vector = self._disk_get(key)
+            if vector is not None:
+                self.disk_hits += 1
+            else:
+                with stage("embed"):
+                    response = self._get_client().embeddings.create(model=self.model, input=[key])
+                # Disk cache float32 sakladığı için bellekte de aynı hassasiyeti
+                # kullan; yeniden başlatma sonrası vektörler birebir aynı kalsın
+                vector = array("f", response.data[0].embedding).tolist()
+                self._disk_put(key, vector)
+            with self._lock:
+                self._remember(key, vector)
+            return list(vector)
+        except Exception as e:
+            logger.error(f"Embedding hatası: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set()
+
+    async def aembed(self, text: str) -> List[float]:
+        """embed'in async sürümü; aynı bellek ve disk cache'lerini kullanır"""
+        key = normalize_text(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+
+        # Aynı event loop'ta aynı metin zaten embed ediliyorsa onu bekle
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        pending = self._ainflight.get(inflight_key)
+        if pending is not None:
+            return list(await asyncio.shield(pending))
+
+        pending = loop.create_future()
+        self._ainflight[inflight_key] = pending
+        self.misses += 1
+        try:
+            vector = await asyncio.to_thread(self._disk_get, key)
+            if vector is not None:
+                self.disk_hits += 1
+            else:
+                with stage("embed"):
+                    response = await self._get_async_client().embeddings.create(
+                        model=self.model, input=[key]
+                    )
+                vector = array("f", response.data[0].embedding).tolist()
+                await asyncio.to_thread(self._disk_put, key, vector)
+            with self._lock:
+                self._remember(key, vector)
+            pending.set_result(vector)
+            return list(vector)
+        except Exception as e:
+            logger.error(f"Embedding hatası: {e}")
+            pending.set_exception(e)
+            pending.exception()  # Bekleyen yoksa "never retrieved" uyarısını engelle
+            raise
+        finally:
+            self._ainflight.pop(inflight_key, None)
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        if self.disk_cache is None:
+            return None
+        try:
+            return self.disk_cache.get(self.model, key)
+        except Exception as e:
+            logger.warning(f"Embedding disk cache okunamadı: {e}")
+            return None
+
+    def _disk_put(self, key: str, vector: List[float]) -> None:
+        if self.disk_cache is None:
+            return
+        try:
+            self.disk_cache.put(self.model, key, vector)
+        except Exception as e:
+            logger.warning(f"Embedding disk cache yazılamadı: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """Cache isabet istatistikleri (API çağrısı = misses - disk_hits)"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+            "entries": len(self._cache),
+            "disk_entries": len(self.disk_cache) if self.disk_cache is not None else 0,
+        }
+
+    def clear(self) -> None:
+        """Süreç içi cache'i temizler"""
+        with self._lock:
+            self._cache.clear()
+
+
+# Süreç genelinde tek servis
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def _open_disk_cache():
+    """EMBED_CACHE_ENABLED=0 değilse disk cache'ini açar; hata olursa devre dışı kalır"""
+    if os.getenv("EMBED_CACHE_ENABLED", "1") == "0":
+        return None
+    try:
+        from chains.embedding_cache import EmbeddingDiskCache
+        return EmbeddingDiskCache()
+    except Exception as e:
+        logger.warning(f"Embedding disk cache açılamadı, yalnızca bellek cache'i kullanılacak: {e}")
+        return None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Paylaşılan embedding servisini lazy loading ile al"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService(disk_cache=_open_disk_cache())
+    return _service
+
+
+def embed_single(text: str) -> list[float]:
+    """Tek bir metni paylaşılan servis üzerinden embed eder"""
+    return get_embedding_service().embed(text)
+
+
+async def aembed_single(text: str) -> list[float]:
+    """embed_single'ın async sürümü"""
+    return await get_embedding_service().aembed(text)
@@ -2,12 +2,20 @@
 Qdrant Tabanlı Intent Sınıflandırıcısı
 =====================================
 Bu modül Qdrant Cloud'u kullanarak kullanıcı niyetlerini sınıflandırır.
+
+Stratejiler (INTENT_STRATEGY):
+- top1     : En yakın örneğin intent'i (varsayılan)
+- vote     : k komşu üzerinde skor ağırlıklı çoğunluk oyu
+- centroid : Her intent'in ortalama vektörüne en yakın olan (yerel indeks gerekir)
 """
-from typing import Tuple
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 import time
 import logging
 import os
 
+from chains.embedding_service import embed_single, aembed_single
+
 # Global client ve cache
 _qdrant_client = None
 _openai_client = None
@@ -43,61 +51,227 @@ def get_qdrant_client():
             raise
     return _qdrant_client
 
-def embed_single(text: str) -> list[float]:
-    """Tek bir metni embed eder"""
-    try:
-        client = get_openai_client()
-        model = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
-        
-        response = client.embeddings.create(model=model, input=[text])
-        return response.data[0].embedding
-        
-    except Exception as e:
-        logging.error(f"Embedding hatası: {e}")
-        raise
+STRATEGIES = ("top1", "vote", "centroid")
+
+@dataclass
+class IntentPrediction:
+    """
+    Sınıflandırma sonucu; margin = confidence - runner_up_confidence.
+    confidence her stratejide cosine benzerliğidir; vote stratejisinde
+    kazananın skor ağırlıklı oy payı (0-1) ayrıca vote_share'de tutulur.
+    """
+    intent: str
+    confidence: float
+    runner_up: Optional[str] = None
+    runner_up_confidence: float = 0.0
+    vote_share: Optional[float] = None
+
+    @property
+    def margin(self) -> float:
+        return self.confidence - self.runner_up_confidence
+
+UNKNOWN = IntentPrediction("unknown", 0.0)
 
 class IntentClassifierQdrant:
-    def __init__(self, k: int = 3):
+    def __init__(self, k: int = 3, mode: str = None, strategy: str = None):
         self.k = k
         self.collection_name = "intent_collection_1"  # Sabit koleksiyon adı
-        
-    def classify(self, text: str) -> Tuple[str, float]:
+        # "qdrant": her mesajda Qdrant sorgusu, "local": bellek içi NumPy indeksi
+        self.mode = mode or os.getenv("INTENT_INDEX_MODE", "qdrant")
+        self.strategy = strategy or os.getenv("INTENT_STRATEGY", "top1")
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Bilinmeyen intent stratejisi: {self.strategy}")
+        self.local_index = None
+        # Centroid'ler yerel indeksten hesaplandığı için bu strateji de indeksi yükler
+        if self.mode == "local" or self.strategy == "centroid":
+            self._init_local_index()
+
+    def _init_local_index(self):
+        """Yerel indeksi yükler; başarısız olursa Qdrant moduna düşer"""
+        try:
+            from chains.intent_index import LocalIntentIndex
+            index = LocalIntentIndex(self.collection_name, get_qdrant_client())
+            index.load()
+            self.local_index = index
+        except Exception as e:
+            logging.error(f"Yerel intent indeksi yüklenemedi, Qdrant kullanılacak: {e}")
+            self.local_index = None
+
+    def _neighbors(self, query_embedding) -> list[Tuple[str, float]]:
+        """En yakın k intent örneğini (intent, skor) listesi olarak döndürür"""
+        if self.local_index is not None and self.local_index.ready:
+            self.local_index.maybe_refresh()
+            return self.local_index.search(query_embedding, self.k)
+
+        client = get_qdrant_client()
+        search_result = client.query_points(
+            collection_name=self.collection_name,
+            query=query_embedding,
+            limit=self.k
+        )
+        return self._points_to_neighbors(search_result.points)
+
+    async def _aneighbors(self, query_embedding) -> list[Tuple[str, float]]:
+        """_neighbors'ın async sürümü"""
+        if self.local_index is not None and self.local_index.ready:
+            self.local_index.maybe_refresh()
+            return self.local_index.search(query_embedding, self.k)
+
+        from chains.async_clients import get_async_qdrant_client
+        search_result = await get_async_qdrant_client().query_points(
+            collection_name=self.collection_name,
+            query=query_embedding,
+            limit=self.k
+        )
+        return self._points_to_neighbors(search_result.points)
+
+    @staticmethod
+    def _points_to_neighbors(points) -> list[Tuple[str, float]]:
+        return [
+            (point.payload.get('intent', 'unknown') if point.payload else 'unknown',
+             float(point.score))
+            for point in points
+        ]
+
+    @staticmethod
+    def _top1(neighbors: List[Tuple[str, float]]) -> IntentPrediction:
+        """En yakın örnek + farklı intent'e sahip ilk komşu"""
+        intent, confidence = neighbors[0]
+        for other, score in neighbors[1:]:
+            if other != intent:
+                return IntentPrediction(intent, confidence, other, score)
+        return IntentPrediction(intent, confidence)
+
+    @staticmethod
+    def _vote(neighbors: List[Tuple[str, float]]) -> IntentPrediction:
         """
-        Kullanıcı metnini sınıflandırır ve intent + confidence döndürür
+        Skor ağırlıklı oy. confidence = kazanan intent'in en yüksek benzerliği
+        (eşikler diğer stratejilerle aynı ölçekte kalır), vote_share = oy payı.
+        """
+        weights, best = {}, {}
+        for intent, score in neighbors:
+            weights[intent] = weights.get(intent, 0.0) + max(score, 0.0)
+            best[intent] = max(best.get(intent, score), score)
+        total = sum(weights.values())
+        if total <= 0:
+            return IntentClassifierQdrant._top1(neighbors)
+
+        ranked = sorted(weights.items(), key=lambda kv: kv[1], reverse=True)
+        intent, weight = ranked[0]
+        if len(ranked) == 1:
+            return IntentPrediction(intent, best[intent], vote_share=weight / total)
+        runner_up = ranked[1][0]
+        return IntentPrediction(intent, best[intent], runner_up, best[runner_up],
+                                vote_share=weight / total)
+
+    def _use_centroids(self) -> bool:
+        return self.strategy == "centroid" and self.local_index is not None and self.local_index.ready
+
+    def _centroid_prediction(self, query_embedding) -> IntentPrediction:
+        self.local_index.maybe_refresh()
+        neighbors = self.local_index.search_centroids(query_embedding, k=2)
+        return self._top1(neighbors) if neighbors else UNKNOWN
+
+    def _decide(self, neighbors: List[Tuple[str, float]]) -> IntentPrediction:
+        if not neighbors:
+            return UNKNOWN
+        if self.strategy == "vote":
+            return self._vote(neighbors)
+        return self._top1(neighbors)
+
+    def predict_embedding(self, query_embedding) -> IntentPrediction:
+        """Hazır bir embedding'i seçili stratejiyle sınıflandırır"""
+        if self._use_centroids():
+            return self._centroid_prediction(query_embedding)
+        return self._decide(self._neighbors(query_embedding))
+
+    async def apredict_embedding(self, query_embedding) -> IntentPrediction:
+        """predict_embedding'in async sürümü"""
+        if self._use_centroids():
+            return self._centroid_prediction(query_embedding)
+        return self._decide(await self._aneighbors(query_embedding))
+
+    def classify_detailed(self, text: str) -> IntentPrediction:
+        """
+        Kullanıcı metnini sınıflandırır; runner-up intent ve margin'i de döndürür
         """
         try:
-            # 1. Embedding oluştur
             query_embedding = embed_single(text)
-            
-            # 2. Qdrant'ta arama yap
-            client = get_qdrant_client()
-            search_result = client.query_points(
-                collection_name=self.collection_name,
-                query=query_embedding,
-                limit=self.k
-            )
-            
-            # 3. En yüksek skorlu sonucu al
-            if not search_result.points:
-                return "unknown", 0.0
-            
-            best_match = search_result.points[0]
-            intent = best_match.payload.get('intent', 'unknown') if best_match.payload else 'unknown'
-            confidence = float(best_match.score)
-            
-            return intent, confidence
-            
+            return self.predict_embedding(query_embedding)
         except Exception as e:
             logging.error(f"Intent classification hatası: {e}")
-            return "unknown", 0.0
+            return UNKNOWN
+
+    async def aclassify_detailed(self, text: str) -> IntentPrediction:
+        """classify_detailed'ın async sürümü"""
+        try:
+            query_embedding = await aembed_single(text)
+            return await self.apredict_embedding(query_embedding)
+        except Exception as e:
+            logging.error(f"Intent classification hatası: {e}")
+            return UNKNOWN
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """
+        Kullanıcı metnini sınıflandırır ve intent + confidence döndürür
+        """
+        prediction = self.classify_detailed(text)
+        return prediction.intent, prediction.confidence
+
+    async def aclassify(self, text: str) -> Tuple[str, float]:
+        """classify'ın async sürümü"""
+        prediction = await self.aclassify_detailed(text)
+        return prediction.intent, prediction.confidence
 
 # Backward compatibility için wrapper
 class IntentClassifier:
-    """ChromaDB'den Qdrant'a geçiş için backward compatibility wrapper"""
+    """ChromaDB'den Qdrant'a geçiş için backward compatibility wrapper
+
+    Vektör sınıflandırıcının önünde ağ çağrısı yapmayan sözcüksel bir kısayol
+    bulunur (INTENT_FAST_PATH=0 ile kapatılabilir).
+    """
     
-    def __init__(self, col=None, k: int = 3):
+    def __init__(self, col=None, k: int = 3, mode: str = None, strategy: str = None,
+                 fast_path: bool = None):
         # col parametresi artık kullanılmıyor ama backward compatibility için alıyoruz
-        self.qdrant_classifier = IntentClassifierQdrant(k=k)
+        self.qdrant_classifier = IntentClassifierQdrant(k=k, mode=mode, strategy=strategy)
+        if fast_path is None:
+            fast_path = os.getenv("INTENT_FAST_PATH", "1") != "0"
+        self.lexical = None
+        if fast_path:
+            from chains.lexical_intents import LexicalIntentMatcher
+            self.lexical = LexicalIntentMatcher()
+
+    def fast_path(self, text: str) -> Optional[IntentPrediction]:
+        """Sözcüksel kısayol eşleşirse tahmini, yoksa None döndürür (ağ çağrısı yok)"""
+        if self.lexical is None:
+            return None
+        intent = self.lexical.match(text)
+        if intent is None:
+            return None
+        logging.debug(f"Sözcüksel kısayol eşleşti: {intent}")
+        return IntentPrediction(intent, 1.0)
     
     def classify(self, text: str) -> Tuple[str, float]:
-        return self.qdrant_classifier.classify(text)
+        prediction = self.classify_detailed(text)
+        return prediction.intent, prediction.confidence
+
+    def classify_detailed(self, text: str) -> IntentPrediction:
+        return self.fast_path(text) or self.qdrant_classifier.classify_detailed(text)
+
+    def predict_embedding(self, query_embedding) -> IntentPrediction:
+        return self.qdrant_classifier.predict_embedding(query_embedding)
+
+    async def apredict_embedding(self, query_embedding) -> IntentPrediction:
+        return await self.qdrant_classifier.apredict_embedding(query_embedding)
+
+    async def aclassify(self, text: str) -> Tuple[str, float]:
+        prediction = await self.aclassify_detailed(text)
+        return prediction.intent, prediction.confidence
+
+    async def aclassify_detailed(self, text: str) -> IntentPrediction:
+        return self.fast_path(text) or await self.qdrant_classifier.aclassify_detailed(text)
+
+    def fast_path_stats(self) -> dict:
+        """Sözcüksel kısayolun isabet oranı"""
+        return self.lexical.stats() if self.lexical is not None else {}
@@ -0,0 +1,166 @@
+"""
+Süreç İçi Intent İndeksi
+========================
+intent_collection_1 küçük ve neredeyse sabit bir koleksiyon. Her mesajda
+Qdrant'a gRPC sorgusu atmak yerine tüm intent vektörlerini başlangıçta
+bitişik bir float32 NumPy matrisine yükler ve sınıflandırmayı tek bir
+vektörel çarpımla yapar. Her intent için ortalama (centroid) vektörler de
+hesaplanır; centroid stratejisi yalnızca intent sayısı kadar vektörle
+karşılaştırma yapar. Koleksiyondaki nokta sayısı değiştiğinde indeks
+arka planda yeniden yüklenir.
+"""
+from typing import List, NamedTuple, Optional, Tuple
+import threading
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger("hotel_chatbot.intent_index")
+
+
+class _Snapshot(NamedTuple):
+    """Bir yüklemenin tüm dizileri; tek referansla değiştirilir"""
+    matrix: Optional[np.ndarray]
+    labels: np.ndarray
+    centroids: Optional[np.ndarray]
+    centroid_labels: List[str]
+
+
+_EMPTY = _Snapshot(None, np.empty(0, dtype=object), None, [])
+
+
+class LocalIntentIndex:
+    """Intent koleksiyonunun bellek içi (cosine) kopyası"""
+
+    def __init__(self, collection_name: str, client, refresh_interval: float = 300.0):
+        self.collection_name = collection_name
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self._snapshot = _EMPTY
+        self._points_count: Optional[int] = None
+        self._last_check = 0.0
+        self._refreshing = threading.Lock()
+
+    @property
+    def matrix(self) -> Optional[np.ndarray]:
+        return self._snapshot.matrix
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self._snapshot.labels
+
+    @property
+    def centroids(self) -> Optional[np.ndarray]:
+        return self._snapshot.centroids
+
+    @property
+    def centroid_labels(self) -> List[str]:
+        return self._snapshot.centroid_labels
+
+    @property
+    def ready(self) -> bool:
+        snapshot = self._snapshot
+        return snapshot.matrix is not None and len(snapshot.labels) > 0
+
+    def load(self) -> None:
+        """Koleksiyondaki tüm vektörleri ve intent etiketlerini yükler"""
+        t0 = time.time()
+        info = self.client.get_collection(self.collection_name)
+        vectors, labels = [], []
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=["intent"],
+                with_vectors=True
+            )
+            for record in records:
+                if record.vector is None:
+                    continue
+                vectors.append(record.vector)
+                labels.append((record.payload or {}).get("intent", "unknown"))
+            if offset is None:
+                break
+
+        matrix = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+        if matrix.size:
+            # Satırları normalize et: dot product = cosine benzerliği
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.maximum(norms, 1e-12)
+
+        labels_arr = np.asarray(labels, dtype=object)
+        centroids, centroid_labels = self._build_centroids(matrix, labels_arr)
+
+        # Atomik değişim: okuyucular ya eski ya yeni indeksi görür
+        self._snapshot = _Snapshot(matrix, labels_arr, centroids, centroid_labels)
+        # Vektörsüz noktalar etiketlere girmez; karşılaştırma koleksiyon sayısıyla
+        self._points_count = info.points_count
+        self._last_check = time.time()
+        logger.info(f"Intent indeksi yüklendi: {len(labels)} vektör, "
+                    f"{(time.time() - t0) * 1000:.0f} ms")
+
+    @staticmethod
+    def _build_centroids(matrix: np.ndarray, labels: np.ndarray):
+        """Her intent için normalize edilmiş ortalama vektör"""
+        if not len(labels):
+            return None, []
+        unique = sorted(set(labels))
+        centroids = np.empty((len(unique), matrix.shape[1]), dtype=np.float32)
+        for row, label in enumerate(unique):
+            centroid = matrix[labels == label].mean(axis=0)
+            centroids[row] = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+        return centroids, unique
+
+    def _refresh_if_changed(self) -> None:
+        if not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            info = self.client.get_collection(self.collection_name)
+            if info.points_count != self._points_count:
+                logger.info("Intent koleksiyonu değişmiş, indeks yenileniyor")
+                self.load()
+            else:
+                self._last_check = time.time()
+        except Exception as e:
+            logger.warning(f"Intent indeksi yenileme kontrolü başarısız: {e}")
+            self._last_check = time.time()
+        finally:
+            self._refreshing.release()
+
+    def maybe_refresh(self) -> None:
+        """Süre dolduysa koleksiyon değişikliğini arka planda kontrol eder"""
+        if time.time() - self._last_check < self.refresh_interval:
+            return
+        if self._refreshing.locked():
+            return
+        threading.Thread(target=self._refresh_if_changed, daemon=True).start()
+
+    @staticmethod
+    def _top_k(matrix: np.ndarray, labels, query_vector, k: int) -> List[Tuple[str, float]]:
+        q = np.asarray(query_vector, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        scores = matrix @ q
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(labels[i], float(scores[i])) for i in top]
+
+    def search(self, query_vector, k: int = 3) -> List[Tuple[str, float]]:
+        """En yakın k komşuyu (intent, skor) olarak döndürür"""
+        snapshot = self._snapshot
+        matrix, labels = snapshot.matrix, snapshot.labels
+        if matrix is None or not len(labels):
+            return []
+        return self._top_k(matrix, labels, query_vector, k)
+
+    def search_centroids(self, query_vector, k: int = 2) -> List[Tuple[str, float]]:
+        """En yakın k intent centroid'ini (intent, skor) olarak döndürür"""
+        snapshot = self._snapshot
+        centroids, labels = snapshot.centroids, snapshot.centroid_labels
+        if centroids is None or not labels:
+            return []
+        return self._top_k(centroids, labels, query_vector, k)
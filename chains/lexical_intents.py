@@ -0,0 +1,220 @@
+"""
+Sözcüksel Intent Kısayolu
+=========================
+"merhaba", "teşekkürler", "rezervasyonumu iptal etmek istiyorum" gibi
+mesajlar için embedding + Qdrant araması yapmadan intent döndürür.
+
+Kalıplar normalize edilmiş Türkçe metin üzerinde önceden derlenmiş bir
+Aho-Corasick otomatıyla tek geçişte aranır. Small talk kalıpları tam kelime
+olarak eşleşir; link kalıpları kelime başında başlar ama kelime ortasında
+bitebilir, böylece ekli biçimler ("değiştirmek", "durumu") kök üzerinden
+yakalanır.
+
+- Small talk: Mesajın tamamı selamlama/veda/teşekkür/yardım kalıpları ve
+  dolgu kelimelerinden oluşmalıdır ("merhaba, havuz var mı?" eşleşmez).
+- Link intent'leri: Kısa bir mesajda tek bir link intent'inin kalıbı
+  geçmeli ve kalıptan sonra olumsuzluk gelmemelidir ("iptal etmek
+  istemiyorum" eşleşmez). Kalıplar rezervasyon/oda ismine bağlıdır;
+  "iptal etmek istiyorum" gibi nesnesiz istekler ("aboneliği iptal etmek
+  istiyorum" da olabilir) sınıflandırıcıya bırakılır.
+
+Emin olunamayan her durumda None döner ve vektör sınıflandırıcıya düşülür.
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+import threading
+import logging
+import re
+
+logger = logging.getLogger("hotel_chatbot.lexical_intents")
+
+SMALL_TALK_PATTERNS = {
+    "selamla": [
+        "merhaba", "merhabalar", "selam", "selamlar", "günaydın", "iyi günler",
+        "iyi akşamlar", "tünaydın", "selamün aleyküm", "hello",
+    ],
+    "veda": [
+        "görüşürüz", "görüşmek üzere", "hoşça kal", "hoşça kalın", "hoşçakal",
+        "güle güle", "iyi geceler", "bay bay", "bye", "kendine iyi bak",
+        "kendinize iyi bakın",
+    ],
+    "teşekkür": [
+        "teşekkür", "teşekkürler", "teşekkür ederim", "teşekkür ederiz",
+        "sağ ol", "sağ olun", "sağol", "sağolun", "eyvallah", "mersi",
+        "çok naziksiniz", "thanks", "thank you",
+    ],
+    "yardım": [
+        "yardım", "yardım eder misin", "yardım eder misiniz",
+        "yardıma ihtiyacım var", "yardımcı olur musun", "yardımcı olur musunuz",
+        "ne yapabilirsin", "neler yapabilirsin",
+    ],
+}
+
+LINK_PATTERNS = {
+    "rezervasyon_iptali": [
+        "rezervasyonumu iptal", "rezervasyonumun iptal", "rezervasyonu iptal",
+        "rezervasyon iptali yap", "odamı iptal", "odamın iptal", "oda rezervasyonumu iptal",
+    ],
+    "rezervasyon_değiştirme": [
+        "rezervasyonumu değiştir", "rezervasyonumda değişiklik", "rezervasyonu değiştir",
+        "rezervasyonumu güncelle", "rezervasyon tarihimi değiştir",
+        "rezervasyon tarihlerimi değiştir", "odamı değiştir", "odamda değişiklik",
+    ],
+    "rezervasyon_durumu": [
+        "rezervasyonumun durum", "rezervasyon durumum", "rezervasyonum ne durumda",
+        "rezervasyonumu kontrol", "rezervasyonum onaylandı mı",
+        "rezervasyonum var mı",
+    ],
+}
+
+# Small talk mesajında eşleşmeye engel olmayan dolgu kelimeleri
+FILLER_WORDS = {
+    "çok", "tekrar", "size", "sana", "ya", "hocam", "efendim", "abi", "abla",
+    "bey", "hanım", "bir", "kez", "de", "da", "ederim", "ediyorum", "olun",
+    "herkese", "hepinize", "iyi", "ok", "tamam", "canım", "dostum", "lütfen",
+}
+
+# Link intent'i için en fazla kelime sayısı
+MAX_LINK_TOKENS = 12
+
+# Link kalıbından sonra gelen olumsuzluk ("iptal etmek istemiyorum",
+# "rezervasyonumu değiştirmeyeceğim"): normalize edilmiş metinde fiil
+# olumsuzluk ekleri (-me/-ma + zaman eki) ve olumsuz kelimeler
+_NEGATION = re.compile(
+    r"m[iu]yor|m[ea]y[ea]c[ea][kg]|m[ea]d[iu]|m[ea]m[iu]s|m[ea]y[iu]n|m[ea]y[ea]l[iu]m"
+    r"|m[ea]z\b|m[ea]y[iu]z\b|\bistemem\b|\b(?:degil|hayir|vazgec)"
+)
+
+_TR_LOWER = str.maketrans({"I": "ı", "İ": "i"})
+_ASCII_FOLD = str.maketrans({
+    "ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u",
+    "â": "a", "î": "i", "û": "u",
+})
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_tr(text: str) -> str:
+    """Türkçe küçük harf + ASCII katlama + noktalama temizliği"""
+    text = (text or "").translate(_TR_LOWER).lower().translate(_ASCII_FOLD)
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class AhoCorasick:
+    """Basit Aho-Corasick otomatı; (başlangıç, bitiş, etiket) döndürür"""
+
+    def __init__(self, patterns: List[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+
+        for pattern, label in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), label))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f][ch] if node and ch in self._goto[f] else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str):
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, label in self._out[node]:
+                yield i - length + 1, i + 1, label
+
+
+class LexicalIntentMatcher:
+    """Small talk ve link intent'leri için ağ çağrısız intent eşleştirici"""
+
+    def __init__(self):
+        patterns = []
+        self._kind: Dict[str, str] = {}
+        for kind, table in (("small_talk", SMALL_TALK_PATTERNS), ("link", LINK_PATTERNS)):
+            for intent, phrases in table.items():
+                self._kind[intent] = kind
+                for phrase in phrases:
+                    # Baştaki boşluk kalıbın kelime başında başlamasını zorunlu kılar;
+                    # small talk kalıpları sondaki boşlukla tam kelimeye bağlanır
+                    pattern = " " + normalize_tr(phrase)
+                    if kind == "small_talk":
+                        pattern += " "
+                    patterns.append((pattern, intent))
+        self._automaton = AhoCorasick(patterns)
+        self._filler = {normalize_tr(w) for w in FILLER_WORDS}
+
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits: Dict[str, int] = {}
+
+    def _match(self, text: str) -> Optional[str]:
+        norm = normalize_tr(text)
+        if not norm:
+            return None
+        padded = f" {norm} "
+
+        matches = list(self._automaton.finditer(padded))
+        if not matches:
+            return None
+
+        link_intents = {label for _, _, label in matches if self._kind[label] == "link"}
+        if link_intents:
+            if len(link_intents) > 1 or len(norm.split()) > MAX_LINK_TOKENS:
+                return None
+            # Kalıp kelime ortasında bitebilir ("değiştir|miyorum"): son link
+            # eşleşmesinden sonraki kısımda olumsuzluk varsa karar sınıflandırıcıya kalır
+            tail = padded[max(end for _, end, label in matches if self._kind[label] == "link"):]
+            if _NEGATION.search(tail):
+                return None
+            return link_intents.pop()
+
+        # Small talk: eşleşmeler çıkarıldığında geriye yalnızca dolgu kalmalı
+        covered = [False] * len(padded)
+        for start, end, _ in matches:
+            for i in range(start, end):
+                covered[i] = True
+        rest = "".join(" " if covered[i] else ch for i, ch in enumerate(padded)).split()
+        if any(token not in self._filler for token in rest):
+            return None
+
+        # Birden çok small talk intent'i varsa mesajda ilk geçen kazanır
+        return min(matches)[2]
+
+    def match(self, text: str) -> Optional[str]:
+        """Eminse intent adını, değilse None döndürür"""
+        intent = self._match(text)
+        with self._lock:
+            self.lookups += 1
+            if intent is not None:
+                self.hits[intent] = self.hits.get(intent, 0) + 1
+        return intent
+
+    def stats(self) -> Dict[str, object]:
+        """Kısayolun karşıladığı trafik oranı"""
+        with self._lock:
+            total_hits = sum(self.hits.values())
+            return {
+                "lookups": self.lookups,
+                "hits": total_hits,
+                "hit_rate": total_hits / self.lookups if self.lookups else 0.0,
+                "by_intent": dict(self.hits),
+            }
@@ -0,0 +1,52 @@
+"""
+Prompt Cache İstatistikleri
+===========================
+OpenAI, 1024 tokenı aşan prompt'larda aynı önekle başlayan istekleri
+sağlayıcı tarafında cache'ler; cache'ten gelen tokenlar
+completion.usage.prompt_tokens_details.cached_tokens alanında raporlanır.
+Bu modül zincir bazında cached / toplam prompt token oranını toplar.
+"""
+from typing import Any, Dict
+import logging
+import threading
+
+logger = logging.getLogger("hotel_chatbot.prompt_cache")
+
+_lock = threading.Lock()
+_totals: Dict[str, Dict[str, int]] = {}
+
+
+def cached_tokens(usage: Any) -> int:
+    """usage nesnesindeki cache'ten gelen prompt token sayısı (yoksa 0)"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return int(getattr(details, "cached_tokens", 0) or 0)
+
+
+def record_usage(chain: str, usage: Any) -> None:
+    """Bir chat completion'ın usage bilgisini zincir adıyla kaydeder"""
+    if usage is None:
+        return
+    prompt = int(getattr(usage, "prompt_tokens", 0) or 0)
+    cached = cached_tokens(usage)
+    with _lock:
+        entry = _totals.setdefault(chain, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt
+        entry["cached_tokens"] += cached
+    logger.debug(f"{chain}: {cached}/{prompt} prompt token cache'ten geldi")
+
+
+def prompt_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Zincir başına çağrı, prompt token, cached token ve cache oranı"""
+    with _lock:
+        return {
+            chain: dict(entry, cached_ratio=(
+                entry["cached_tokens"] / entry["prompt_tokens"] if entry["prompt_tokens"] else 0.0
+            ))
+            for chain, entry in _totals.items()
+        }
+
+
+def reset_prompt_cache_stats() -> None:
+    with _lock:
+        _totals.clear()
@@ -3,10 +3,18 @@ Qdrant Tabanlı RAG Sistemi - Otel bilgisi için RAG zinciri
 ========================================================
 Bu modül Qdrant Cloud vektör veritabanını kullanarak otel hakkındaki soruları yanıtlar.
 """
+from typing import Iterator
 import time
 import logging
 import os
 
+from chains.embedding_service import embed_single, aembed_single
+from chains.async_clients import get_async_openai_client, get_async_qdrant_client
+from chains.answer_cache import get_answer_cache
+from chains.context_builder import build_context
+from chains.prompt_cache_stats import record_usage
+from latency_stats import stage
+
 # Global client'ları cache için
 _qdrant_client = None
 _openai_client = None
@@ -42,76 +50,231 @@ def get_qdrant_client():
             raise
     return _qdrant_client
 
-def embed_single(text: str) -> list[float]:
-    """Tek bir metni embed eder"""
-    try:
-        client = get_openai_client()
-        model = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
-        
-        response = client.embeddings.create(model=model, input=[text])
-        return response.data[0].embedding
-        
-    except Exception as e:
-        logging.error(f"Embedding hatası: {e}")
-        raise
-
 SYSTEM_BASE = """Sen Cullinan Hotel'in akıllı asistanısın. 
 Aşağıdaki döküman parçalarından yararlanarak soruları kesin ve doğru biçimde yanıtla.
 Yanıtın dostça, kısa ve net olsun. Yalnızca emin olduğun bilgileri paylaş."""
 
-def answer_hotel_qdrant(question: str, qdrant_client=None) -> str:
+CHAT_MODEL = "ft:gpt-4o-mini-2024-07-18:personal::Bj1i1nW4"
+COLLECTION_NAME = "knowledge_collection_2"  # Sabit koleksiyon adı
+
+NO_INFO_REPLY = "Üzgünüm, bu konuda yeterli bilgim bulunmuyor. Lütfen farklı bir soru sorabilir misiniz?"
+ERROR_REPLY = "Üzgünüm, şu anda sorunuzu yanıtlayamıyorum. Lütfen daha sonra tekrar deneyin."
+
+def _cached_answer(q_emb, count: bool = True):
+    """Semantik cache: benzer bir soru daha önce yanıtlandıysa yanıtını döndür"""
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        return answer_cache.lookup(q_emb, count=count)
+    return None
+
+def _search(qdrant_client, q_emb):
+    return qdrant_client.query_points(
+        collection_name=COLLECTION_NAME,
+        query=q_emb,
+        limit=10
+    )
+
+def retrieve(q_emb, qdrant_client=None):
     """
-    Qdrant Cloud kullanarak otel hakkındaki soruları RAG ile yanıtlar
+    knowledge_collection_2'de arama yapar ve noktaları döndürür. Router bunu
+    intent sınıflandırmasıyla paralel (spekülatif) çalıştırır.
     """
     if qdrant_client is None:
         qdrant_client = get_qdrant_client()
+    with stage("search"):
+        return _search(qdrant_client, q_emb).points
+
+async def aretrieve(q_emb, qdrant_client=None):
+    """retrieve'in async sürümü"""
+    if qdrant_client is None:
+        qdrant_client = get_async_qdrant_client()
+    with stage("search"):
+        return (await _search(qdrant_client, q_emb)).points
+
+def cached_answer(question_embedding):
+    """
+    Semantik cache'te karşılığı varsa yanıtı döndürür. Sayaçları güncellemez:
+    asıl (sayılan) kontrol yanıt zincirinde yapılır, rota RAG değilse hiç yapılmaz.
+    """
+    return _cached_answer(question_embedding, count=False)
+
+def _build_messages(question: str, points):
+    """Arama sonuçlarından chat mesajlarını kurar; parça yoksa None"""
+    chunks = []
+    for point in points:
+        if point.payload and 'text' in point.payload:
+            chunks.append((point.payload['text'], float(point.score)))
     
-    collection_name = "knowledge_collection_2"  # Sabit koleksiyon adı
+    if not chunks:
+        return None
     
-    try:
-        # 1. Embedding oluştur
+    # Context oluştur (tekrarsız, skora göre, token bütçeli)
+    with stage("context"):
+        context, _, _ = build_context(chunks)
+    
+    # Sıra, fine-tune edilmiş modelin eğitildiği biçimdir: context sorudan önce.
+    # SYSTEM_BASE önbelleğe alma eşiğinin (1024 token) altında kaldığından
+    # sırayı değiştirmek sağlayıcı prompt cache'inden kazanç getirmez.
+    return [
+        {"role": "system", "content": SYSTEM_BASE},
+        {"role": "system", "content": f"<KONTEKS>\n{context}\n</KONTEKS>"},
+        {"role": "user", "content": question},
+    ]
+
+def _prepare(question: str, qdrant_client, q_emb=None, points=None):
+    """
+    Embedding, cache kontrolü, arama ve context adımları. Router embedding'i
+    ve arama sonuçlarını önceden hesapladıysa (q_emb, points) tekrar yapılmaz.
+    Returns: (hazır yanıt veya None, chat mesajları, soru embedding'i)
+    """
+    # 1. Embedding oluştur
+    if q_emb is None:
         q_emb = embed_single(question)
+    
+    cached = _cached_answer(q_emb)
+    if cached is not None:
+        return cached, None, q_emb
+    
+    # 2. Qdrant'tan relevantı dokümanları getir
+    if points is None:
+        with stage("search"):
+            points = _search(qdrant_client, q_emb).points
+    
+    # 3. Sonuçları işle
+    messages = _build_messages(question, points)
+    if messages is None:
+        return NO_INFO_REPLY, None, q_emb
+    return None, messages, q_emb
+
+async def _aprepare(question: str, qdrant_client, q_emb=None, points=None):
+    """_prepare'in async sürümü (AsyncQdrantClient ile)"""
+    if q_emb is None:
+        q_emb = await aembed_single(question)
+    
+    cached = _cached_answer(q_emb)
+    if cached is not None:
+        return cached, None, q_emb
+    
+    if points is None:
+        with stage("search"):
+            points = (await _search(qdrant_client, q_emb)).points
+    
+    messages = _build_messages(question, points)
+    if messages is None:
+        return NO_INFO_REPLY, None, q_emb
+    return None, messages, q_emb
+
+def _remember(question: str, q_emb, answer: str) -> None:
+    answer_cache = get_answer_cache()
+    if answer_cache is not None and answer:
+        answer_cache.store(question, q_emb, answer)
+
+def answer_hotel_qdrant(question: str, qdrant_client=None, q_emb=None, points=None) -> str:
+    """
+    Qdrant Cloud kullanarak otel hakkındaki soruları RAG ile yanıtlar.
+    q_emb / points verilirse embedding ve arama adımları atlanır.
+    """
+    if qdrant_client is None:
+        qdrant_client = get_qdrant_client()
+    
+    try:
+        ready, messages, q_emb = _prepare(question, qdrant_client, q_emb, points)
+        if ready is not None:
+            return ready
         
-        # 2. Qdrant'tan relevantı dokümanları getir
-        search_result = qdrant_client.query_points(
-            collection_name=collection_name,
-            query=q_emb,
-            limit=10
-        )
+        # 5. Chat completion
+        client = get_openai_client()
+        with stage("completion"):
+            completion = client.chat.completions.create(
+                model=CHAT_MODEL, 
+                messages=messages,
+                temperature=0.1,
+                max_tokens=500
+            )
+        
+        record_usage("rag", completion.usage)
+        answer = completion.choices[0].message.content.strip()
+        _remember(question, q_emb, answer)
+        return answer
+        
+    except Exception as e:
+        logging.error(f"RAG hatası: {e}")
+        return ERROR_REPLY
+
+async def aanswer_hotel_qdrant(question: str, qdrant_client=None, q_emb=None, points=None) -> str:
+    """
+    answer_hotel_qdrant'ın async sürümü (AsyncOpenAI + AsyncQdrantClient)
+    """
+    if qdrant_client is None:
+        qdrant_client = get_async_qdrant_client()
+    
+    try:
+        ready, messages, q_emb = await _aprepare(question, qdrant_client, q_emb, points)
+        if ready is not None:
+            return ready
         
-        # 3. Sonuçları işle
-        chunks = []
-        for point in search_result.points:
-            if point.payload and 'text' in point.payload:
-                chunks.append(point.payload['text'])
+        with stage("completion"):
+            completion = await get_async_openai_client().chat.completions.create(
+                model=CHAT_MODEL, 
+                messages=messages,
+                temperature=0.1,
+                max_tokens=500
+            )
         
-        if not chunks:
-            return "Üzgünüm, bu konuda yeterli bilgim bulunmuyor. Lütfen farklı bir soru sorabilir misiniz?"
+        record_usage("rag", completion.usage)
+        answer = completion.choices[0].message.content.strip()
+        _remember(question, q_emb, answer)
+        return answer
         
-        # 4. Context oluştur
-        context = "\n\n".join(chunks)
+    except Exception as e:
+        logging.error(f"RAG hatası: {e}")
+        return ERROR_REPLY
+
+def stream_answer_hotel_qdrant(question: str, qdrant_client=None, q_emb=None, points=None) -> Iterator[str]:
+    """
+    answer_hotel_qdrant'ın akış (streaming) sürümü: yanıt parçalarını üretildikçe
+    yield eder. Generator'ın dönüş değeri tam yanıttır.
+    """
+    if qdrant_client is None:
+        qdrant_client = get_qdrant_client()
+    
+    parts = []
+    try:
+        ready, messages, q_emb = _prepare(question, qdrant_client, q_emb, points)
+        if ready is not None:
+            yield ready
+            return ready
         
-        # 5. Chat completion
         client = get_openai_client()
-        messages = [
-            {"role": "system", "content": SYSTEM_BASE},
-            {"role": "system", "content": f"<KONTEKS>\n{context}\n</KONTEKS>"},
-            {"role": "user", "content": question},
-        ]
-        
-        completion = client.chat.completions.create(
-            model="ft:gpt-4o-mini-2024-07-18:personal::Bj1i1nW4", 
-            messages=messages,
-            temperature=0.1,
-            max_tokens=500
-        )
+        # Akışta ölçülen süre, parçaları tüketen tarafın bekleme süresini de içerir
+        with stage("completion"):
+            stream = client.chat.completions.create(
+                model=CHAT_MODEL, 
+                messages=messages,
+                temperature=0.1,
+                max_tokens=500,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    record_usage("rag", chunk.usage)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
         
-        answer = completion.choices[0].message.content.strip()
+        answer = "".join(parts).strip()
+        _remember(question, q_emb, answer)
         return answer
         
     except Exception as e:
         logging.error(f"RAG hatası: {e}")
-        return "Üzgünüm, şu anda sorunuzu yanıtlayamıyorum. Lütfen daha sonra tekrar deneyin."
+        if parts:
+            # Yanıtın bir kısmı zaten gösterildi; o kısmı tam yanıt say
+            return "".join(parts).strip()
+        yield ERROR_REPLY
+        return ERROR_REPLY
 
 # Backward compatibility için alias
 answer_hotel = answer_hotel_qdrant
@@ -0,0 +1,239 @@
+"""
+Kural Tabanlı Rezervasyon Slot Çıkarıcı
+=======================================
+"2 yetişkin 1 çocuk, 12-15 Ağustos" gibi mesajlardan LLM'e gitmeden
+rezervasyon alanlarını çıkarır:
+
+- Tarihler: "12 Ağustos", "12-15 Ağustos", "12 ile 15 ağustos arası",
+  "12.08.2026", "2026-08-12", "yarın", "öbür gün", "hafta sonu", "3 gece"
+- Sayılar: yetişkin / çocuk / oda sayısı (rakam veya "iki", "tek" gibi
+  kelimelerle), "çocuk yok", çocuk yaşları ("5 ve 8 yaşında")
+
+Sonuç booking_dialog.merge() ile uyumlu bir {alan: metin} sözlüğüdür;
+emin olunamayan alanlar boş bırakılır ve LLM'e kalır.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+MONTHS = {
+    "ocak": 1, "subat": 2, "mart": 3, "nisan": 4, "mayis": 5, "haziran": 6,
+    "temmuz": 7, "agustos": 8, "eylul": 9, "ekim": 10, "kasim": 11, "aralik": 12,
+}
+NUMBER_WORDS = {
+    "tek": 1, "bir": 1, "iki": 2, "uc": 3, "dort": 4, "bes": 5,
+    "alti": 6, "yedi": 7, "sekiz": 8, "dokuz": 9, "on": 10,
+}
+# "on iki", "yirmi bir" gibi bileşik sayılar için onlar basamağı
+TENS_WORDS = {"on": 10, "yirmi": 20}
+_UNITS = [w for w, n in NUMBER_WORDS.items() if 1 <= n <= 9 and w != "tek"]
+
+_FOLD = str.maketrans({
+    "I": "ı", "İ": "i",
+})
+_ASCII = str.maketrans({
+    "ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u", "â": "a", "î": "i", "û": "u",
+})
+
+_MONTH = r"(" + "|".join(MONTHS) + r")\w*"
+_YEAR = r"(?:\s+(\d{4}))?"
+_NUM = (r"((?:" + "|".join(TENS_WORDS) + r")\s+(?:" + "|".join(_UNITS) + r")\b|\d{1,2}|"
+        + "|".join(NUMBER_WORDS) + r")")
+
+_RE_ISO = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_RE_NUMERIC = re.compile(r"\b(\d{1,2})[./](\d{1,2})(?:[./](\d{4}|\d{2}))?\b")
+_RE_RANGE = re.compile(
+    r"\b(\d{1,2})\s*(?:-|–|ile|ila|/)\s*(\d{1,2})\s+" + _MONTH + _YEAR
+)
+_RE_TEXTUAL = re.compile(r"\b(\d{1,2})\s+" + _MONTH + _YEAR)
+_RE_RELATIVE = re.compile(
+    r"\b(bugun|yarin|obur gun|ertesi gun|(?:bu |gelecek |haftaya )?hafta ?sonu)\b"
+)
+_RE_NIGHTS = re.compile(r"\b" + _NUM + r"\s*gece")
+
+# "bir oda daha", "2 kişi daha": mevcut değere göreli değişiklik → LLM'e kalır
+_NOT_RELATIVE = r"(?!\w*\s+daha\b)"
+# "büyük" yalnızca kişi ismiyle yetişkin sayılır ("2 büyük oda", "1 büyük yatak" değil)
+_RE_ADULTS = re.compile(r"\b" + _NUM + r"\s*(?:yetiskin|buyuk\s+(?:kisi|insan))" + _NOT_RELATIVE)
+_RE_PEOPLE = re.compile(r"\b" + _NUM + r"\s*kisi" + _NOT_RELATIVE)
+_RE_CHILDREN = re.compile(r"\b" + _NUM + r"\s*(?:cocuk|bebek)" + _NOT_RELATIVE)
+_RE_NO_CHILDREN = re.compile(r"\bcocu\w*\s+(?:yok|olmayacak)|\bcocuksuz\b")
+_RE_AGES = re.compile(r"((?:\d{1,2}\s*(?:,|ve|-)\s*)*\d{1,2})\s*yas")
+_RE_ROOMS = re.compile(r"\b" + _NUM + r"\s*oda" + _NOT_RELATIVE)
+
+
+def _fold(text: str) -> str:
+    return (text or "").translate(_FOLD).lower().translate(_ASCII)
+
+
+def _num(token: str) -> int:
+    if token.isdigit():
+        return int(token)
+    words = token.split()
+    if len(words) == 2:
+        return TENS_WORDS[words[0]] + NUMBER_WORDS[words[1]]
+    return NUMBER_WORDS[token]
+
+
+def _make_date(day: int, month: int, year: Optional[int], today: date) -> Optional[date]:
+    """Yıl verilmemişse geçmişte kalan tarih bir sonraki yıla atılır"""
+    if year is not None and year < 100:
+        year += 2000
+    try:
+        d = date(year or today.year, month, day)
+    except ValueError:
+        return None
+    if year is None and d < today:
+        try:
+            d = date(today.year + 1, month, day)
+        except ValueError:
+            return None
+    return d
+
+
+def _range_dates(first: int, last: int, month: int, year: Optional[int],
+                 today: date) -> Tuple[Optional[date], Optional[date]]:
+    """
+    "12-15 Ağustos" → (12 Ağu, 15 Ağu). Ay dönümünde ("28-2 Ağustos")
+    başlangıç bir önceki aydadır (Ocak için önceki yılın Aralık'ı).
+    """
+    end = _make_date(last, month, year, today)
+    if end is None:
+        return None, None
+    if first < last:
+        # Başlangıç, bitişle aynı yıla yazılır (yıl devri yalnızca bitişe göre)
+        try:
+            return date(end.year, month, first), end
+        except ValueError:
+            return None, None
+
+    def previous_month(end_date: date) -> Optional[date]:
+        prev_year, prev_month = (end_date.year - 1, 12) if month == 1 else (end_date.year, month - 1)
+        try:
+            return date(prev_year, prev_month, first)
+        except ValueError:
+            return None
+
+    start = previous_month(end)
+    if start is not None and year is None and start < today:
+        # Yıl verilmemiş ve başlangıç geçmişte: aralığın tamamı gelecek yıla
+        try:
+            end = date(end.year + 1, month, last)
+        except ValueError:
+            return None, None
+        start = previous_month(end)
+    if start is None:
+        # Geçersiz gün (ör. "30-2 Mart"): tahmin etmek yerine LLM'e bırak
+        return None, None
+    return start, end
+
+
+def _find_dates(text: str, today: date) -> List[date]:
+    """Metindeki tarihleri geçtikleri sırayla döndürür"""
+    found: List[Tuple[int, date]] = []
+    taken: List[Tuple[int, int]] = []
+
+    def add(span, *dates):
+        if any(span[0] < end and start < span[1] for start, end in taken):
+            return
+        taken.append(span)
+        for offset, d in enumerate(dates):
+            if d is not None:
+                found.append((span[0] + offset, d))
+
+    for m in _RE_ISO.finditer(text):
+        add(m.span(), _make_date(int(m.group(3)), int(m.group(2)), int(m.group(1)), today))
+
+    for m in _RE_RANGE.finditer(text):
+        year = int(m.group(4)) if m.group(4) else None
+        start, end = _range_dates(int(m.group(1)), int(m.group(2)), MONTHS[m.group(3)],
+                                  year, today)
+        add(m.span(), start, end)
+
+    for m in _RE_TEXTUAL.finditer(text):
+        year = int(m.group(3)) if m.group(3) else None
+        add(m.span(), _make_date(int(m.group(1)), MONTHS[m.group(2)], year, today))
+
+    for m in _RE_NUMERIC.finditer(text):
+        day, month = int(m.group(1)), int(m.group(2))
+        if not 1 <= month <= 12:
+            continue
+        year = int(m.group(3)) if m.group(3) else None
+        add(m.span(), _make_date(day, month, year, today))
+
+    for m in _RE_RELATIVE.finditer(text):
+        word = m.group(1)
+        if word == "bugun":
+            add(m.span(), today)
+        elif word == "yarin":
+            add(m.span(), today + timedelta(days=1))
+        elif word in ("obur gun", "ertesi gun"):
+            add(m.span(), today + timedelta(days=2))
+        else:
+            # Hafta sonu: Cumartesi giriş, Pazar çıkış
+            saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+            if word.startswith(("gelecek", "haftaya")):
+                saturday += timedelta(days=7)
+            add(m.span(), saturday, saturday + timedelta(days=1))
+
+    return [d for _, d in sorted(found, key=lambda item: item[0])]
+
+
+def extract_slots(
+    text: str,
+    state: Optional[Dict[str, Any]] = None,
+    today: Optional[date] = None
+) -> Dict[str, str]:
+    """
+    Kullanıcı mesajından rezervasyon alanlarını çıkarır.
+    state verilirse tek tarih, eksik olan alana (giriş veya çıkış) yazılır.
+    """
+    state = state or {}
+    today = today or date.today()
+    t = _fold(text)
+    slots: Dict[str, str] = {}
+
+    # --- Tarihler -----------------------------------------------------
+    dates = _find_dates(t, today)
+    nights = _RE_NIGHTS.search(t)
+    if len(dates) >= 2 and dates[1] > dates[0]:
+        slots["giris_tarihi"] = dates[0].isoformat()
+        slots["cikis_tarihi"] = dates[1].isoformat()
+    elif len(dates) == 1:
+        d = dates[0]
+        if "giris_tarihi" in state and "cikis_tarihi" not in state and not nights:
+            if d > date.fromisoformat(state["giris_tarihi"]):
+                slots["cikis_tarihi"] = d.isoformat()
+        else:
+            slots["giris_tarihi"] = d.isoformat()
+    if nights and "cikis_tarihi" not in slots:
+        start = slots.get("giris_tarihi") or state.get("giris_tarihi")
+        if start:
+            end = date.fromisoformat(start) + timedelta(days=_num(nights.group(1)))
+            slots["cikis_tarihi"] = end.isoformat()
+
+    # --- Kişi / oda sayıları -------------------------------------------
+    adults = _RE_ADULTS.search(t)
+    children = _RE_CHILDREN.search(t)
+    if adults:
+        slots["yetiskin_sayisi"] = str(_num(adults.group(1)))
+    elif not children and "cocuk" not in t:
+        # "2 kişi" yalnızca çocuktan söz edilmiyorsa yetişkin sayısıdır
+        people = _RE_PEOPLE.search(t)
+        if people:
+            slots["yetiskin_sayisi"] = str(_num(people.group(1)))
+
+    if children:
+        slots["cocuk_sayisi"] = str(_num(children.group(1)))
+    elif _RE_NO_CHILDREN.search(t):
+        slots["cocuk_sayisi"] = "0"
+
+    ages = _RE_AGES.search(t)
+    if ages and (children or state.get("cocuk_sayisi")):
+        slots["cocuk_yaslari"] = ",".join(re.findall(r"\d{1,2}", ages.group(1)))
+
+    rooms = _RE_ROOMS.search(t)
+    if rooms:
+        slots["oda_sayisi"] = str(_num(rooms.group(1)))
+
+    return slots
@@ -2,9 +2,14 @@
 Selamlama, veda, teşekkür, yardım mesajlarını 4o-mini ile üretir.
 """
 from openai import OpenAI
+from typing import Iterator
+import random
 import time
 import logging
 from logging_config import log_api_call
+from chains.async_clients import get_async_openai_client
+from chains.prompt_cache_stats import record_usage
+from latency_stats import stage
 
 # Logger
 logger = logging.getLogger("hotel_chatbot.small_talk")
@@ -15,6 +20,19 @@ client = OpenAI()
 TEMPLATE = """Sen Cullinan Hotel'in nazik sohbet asistanısın. 
 Kullanıcının mesajına kısa, sıcak ve samimi bir cevap ver."""
 
+FALLBACK_RESPONSES = [
+    "Teşekkür ederim! Size nasıl yardımcı olabilirim?",
+    "Merhaba! Cullinan Hotel'e hoş geldiniz.",
+    "Size nasıl yardımcı olabilirim?",
+    "İyi günler! Sorularınızı bekliyorum."
+]
+
+def _messages(user_msg: str) -> list:
+    return [
+        {"role": "system", "content": TEMPLATE},
+        {"role": "user", "content": user_msg},
+    ]
+
 @log_api_call("OpenAI Chat Completion")
 def respond_small_talk(user_msg: str) -> str:
     """
@@ -27,23 +45,20 @@ def respond_small_talk(user_msg: str) -> str:
     start_time = time.time()
     
     try:
-        messages = [
-            {"role": "system", "content": TEMPLATE},
-            {"role": "user", "content": user_msg},
-        ]
-        
-        completion = client.chat.completions.create(
-            model=CHAT_MODEL, 
-            messages=messages,
-            temperature=0.7,
-            max_tokens=150
-        )
+        with stage("completion"):
+            completion = client.chat.completions.create(
+                model=CHAT_MODEL, 
+                messages=_messages(user_msg),
+                temperature=0.7,
+                max_tokens=150
+            )
         
         response = completion.choices[0].message.content.strip()
         execution_time = (time.time() - start_time) * 1000
         
         # Token kullanımı
         usage = completion.usage
+        record_usage("small_talk", usage)
         
         logger.info(f"Small talk response generated", extra={
             'user_message': user_msg,
@@ -65,14 +80,94 @@ def respond_small_talk(user_msg: str) -> str:
         }, exc_info=True)
         
         # Fallback yanıt
-        fallback_responses = [
-            "Teşekkür ederim! Size nasıl yardımcı olabilirim?",
-            "Merhaba! Cullinan Hotel'e hoş geldiniz.",
-            "Size nasıl yardımcı olabilirim?",
-            "İyi günler! Sorularınızı bekliyorum."
-        ]
-        
-        import random
-        fallback = random.choice(fallback_responses)
+        fallback = random.choice(FALLBACK_RESPONSES)
         logger.info(f"Returning fallback response: {fallback}")
         return fallback
+
+async def arespond_small_talk(user_msg: str) -> str:
+    """
+    respond_small_talk'ın async sürümü (AsyncOpenAI ile)
+    """
+    start_time = time.time()
+    
+    try:
+        with stage("completion"):
+            completion = await get_async_openai_client().chat.completions.create(
+                model=CHAT_MODEL, 
+                messages=_messages(user_msg),
+                temperature=0.7,
+                max_tokens=150
+            )
+        
+        response = completion.choices[0].message.content.strip()
+        usage = completion.usage
+        record_usage("small_talk", usage)
+        
+        logger.info(f"Small talk response generated", extra={
+            'user_message': user_msg,
+            'response_length': len(response),
+            'execution_time': (time.time() - start_time) * 1000,
+            'model': CHAT_MODEL,
+            'prompt_tokens': usage.prompt_tokens if usage else None,
+            'completion_tokens': usage.completion_tokens if usage else None,
+            'total_tokens': usage.total_tokens if usage else None
+        })
+        return response
+        
+    except Exception as e:
+        logger.error(f"Small talk response generation failed: {str(e)}", extra={
+            'user_message': user_msg,
+            'execution_time': (time.time() - start_time) * 1000
+        }, exc_info=True)
+        return random.choice(FALLBACK_RESPONSES)
+
+def stream_small_talk(user_msg: str) -> Iterator[str]:
+    """
+    respond_small_talk'ın akış (streaming) sürümü; yanıt parçalarını yield eder.
+    Generator'ın dönüş değeri tam yanıttır.
+    """
+    start_time = time.time()
+    first_token_time = None
+    parts = []
+    
+    try:
+        # Akışta ölçülen süre, parçaları tüketen tarafın bekleme süresini de içerir
+        with stage("completion"):
+            stream = client.chat.completions.create(
+                model=CHAT_MODEL, 
+                messages=_messages(user_msg),
+                temperature=0.7,
+                max_tokens=150,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    record_usage("small_talk", chunk.usage)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first_token_time is None:
+                        first_token_time = (time.time() - start_time) * 1000
+                    parts.append(delta)
+                    yield delta
+        
+        response = "".join(parts).strip()
+        logger.info(f"Small talk response streamed", extra={
+            'user_message': user_msg,
+            'response_length': len(response),
+            'execution_time': (time.time() - start_time) * 1000,
+            'time_to_first_token': first_token_time,
+            'model': CHAT_MODEL
+        })
+        return response
+        
+    except Exception as e:
+        logger.error(f"Small talk streaming failed: {str(e)}", extra={
+            'user_message': user_msg,
+            'execution_time': (time.time() - start_time) * 1000
+        }, exc_info=True)
+        if parts:
+            return "".join(parts).strip()
+        fallback = random.choice(FALLBACK_RESPONSES)
+        yield fallback
+        return fallback
@@ -0,0 +1,103 @@
+"""
+Gecikme İstatistikleri
+======================
+Replay ve benchmark çıktıları için yüzdelik (p50/p95/p99) özetleri.
+
+Aşama ölçümü: Zincirler embedding, arama, context ve completion adımlarını
+stage("...") ile sarar. Yalnızca record_stages() bloğu içinde (benchmark)
+süre tutulur; aksi halde stage() hiçbir şey yapmaz.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional
+import threading
+import math
+import time
+
+PERCENTILES = (50, 95, 99)
+
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("latency_stages", default=None)
+_stages_lock = threading.Lock()
+
+
+@contextmanager
+def record_stages() -> Iterator[Dict[str, float]]:
+    """Blok içinde stage() ile ölçülen süreleri {aşama: ms} olarak toplar"""
+    stages: Dict[str, float] = {}
+    token = _stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Aşama süresini etkin kayda ekler (aynı aşama birden çok kez ölçülürse toplanır)"""
+    stages = _stages.get()
+    if stages is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        with _stages_lock:
+            stages[name] = stages.get(name, 0.0) + ms
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Sıralı olmayan listede doğrusal enterpolasyonlu yüzdelik"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(values: Iterable[float]) -> Dict[str, float]:
+    """count, mean, p50, p95, p99, max"""
+    values = list(values)
+    summary = {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}"] = percentile(values, q)
+    summary["max"] = max(values) if values else 0.0
+    return summary
+
+
+def summarize_timings(
+    records: Iterable[Dict],
+    group_by: Optional[str] = None
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    {"timings": {aşama: ms}, ...} kayıtlarından aşama bazında özet.
+    group_by verilirse (ör. "route") önce o alana göre gruplanır.
+    Returns: {grup: {aşama: özet}}; gruplama yoksa tek grup "all".
+    """
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    for record in records:
+        group = str(record.get(group_by)) if group_by else "all"
+        stages = samples.setdefault(group, {})
+        for stage, ms in (record.get("timings") or {}).items():
+            stages.setdefault(stage, []).append(ms)
+    return {
+        group: {stage: summarize(values) for stage, values in stages.items()}
+        for group, stages in samples.items()
+    }
+
+
+def format_table(summary: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+    """summarize_timings çıktısını terminal tablosu olarak biçimlendirir"""
+    lines = [f"{'grup':<12} {'aşama':<12} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"]
+    for group, stages in summary.items():
+        for stage, s in stages.items():
+            lines.append(
+                f"{group:<12} {stage:<12} {s['count']:>6} {s['p50']:>9.1f} "
+                f"{s['p95']:>9.1f} {s['p99']:>9.1f} {s['max']:>9.1f}"
+            )
+    return "\n".join(lines)
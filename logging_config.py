@@ -240,7 +240,7 @@ class ChatbotLogger:
             extra={
                 'request_id': self.current_request_id,
                 'user_input': user_input,
-                'state_data': state,
+                'state_data': state.to_dict() if hasattr(state, 'to_dict') else state,
                 'booking_complete': is_complete,
                 'event_type': 'booking_state_update'
             }
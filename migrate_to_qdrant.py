@@ -5,20 +5,26 @@ Bu script mevcut ChromaDB verilerini Qdrant Cloud'a aktarır.
 """
 import sys
 import os
+import json
+import hashlib
 import logging
+import argparse
+import threading
 import traceback
 import time
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from typing import List, Dict, Any, Set, Iterable, Iterator, Tuple, Callable, Optional
 from pathlib import Path
 
-# Gerekli kütüphaneleri import et
+# Gerekli kütüphaneleri import et (chromadb yalnızca kaynak okunurken yüklenir)
 try:
-    import chromadb
+    import numpy as np
     from qdrant_client import QdrantClient
-    from qdrant_client.http.models import VectorParams, Distance, PointStruct
-    from openai import OpenAI
+    from qdrant_client.http.models import PointStruct, PointIdsList
+    from openai import (OpenAI, RateLimitError, APIConnectionError,
+                        APITimeoutError, InternalServerError)
     from dotenv import load_dotenv
-    from qdrant_config import get_qdrant_client, get_collection_name, qdrant_config
+    from qdrant_config import get_qdrant_client, get_collection_name, qdrant_config, point_id
 except ImportError as e:
     print(f"❌ Gerekli kütüphane eksik: {e}")
     print("Lütfen şu komutu çalıştırın: pip install -r requirements.txt")
@@ -28,6 +34,17 @@ except ImportError as e:
 logging.basicConfig(format="%(asctime)s | %(levelname)s | %(message)s", level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Aktarım ayarları (komut satırından da verilebilir)
+DEFAULT_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "100"))
+DEFAULT_WORKERS = int(os.getenv("MIGRATION_WORKERS", "4"))
+DEFAULT_CHECKPOINT_DIR = os.getenv("MIGRATION_CHECKPOINT_DIR", "cache/migration")
+# Chroma'daki hazır vektörler: auto (model eşleşirse), always, never
+DEFAULT_REUSE_EMBEDDINGS = os.getenv("MIGRATION_REUSE_EMBEDDINGS", "auto")
+# Chroma metadata'sında embedding modelinin yazılabileceği anahtarlar
+_MODEL_METADATA_KEYS = ("embed_model", "embedding_model", "model_name", "model")
+# auto modunda örnek vektörün yeniden hesaplananla en az bu kadar benzer olması gerekir
+_MODEL_PROBE_THRESHOLD = 0.99
+
 def initialize_clients():
     """OpenAI ve Qdrant istemcilerini başlat"""
     load_dotenv()
@@ -59,100 +76,620 @@ def create_embeddings(texts: List[str], openai_client: OpenAI) -> List[List[floa
         logger.error(f"Embedding oluşturma hatası: {e}")
         raise
 
+class AdaptiveRateLimiter:
+    """
+    Sabit bekleme yerine uyarlanır aralık: başarılı çağrılarda istekler
+    arasındaki süre kısalır, 429 / geçici hatada katlanarak uzar (AIMD).
+    Tüm worker'lar aynı limiter'ı paylaşır.
+    """
+
+    def __init__(self, min_interval: float = 0.0, max_interval: float = 30.0,
+                 backoff: float = 2.0, recovery: float = 0.8):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.recovery = recovery
+        self.interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Sıradaki istek zamanı gelene kadar bekler"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def success(self) -> None:
+        with self._lock:
+            self.interval = max(self.min_interval, self.interval * self.recovery)
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.interval = min(self.max_interval, max(self.interval * self.backoff, 0.5))
+            logger.warning(f"⏳ Hız sınırı: istek aralığı {self.interval:.2f} sn")
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Hız sınırı, zaman aşımı ve 5xx hataları yeniden denenir"""
+    if isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+def _with_retry(fn, limiter: AdaptiveRateLimiter, retries: int = 5):
+    """fn'i limiter üzerinden çağırır; geçici hatalarda geri çekilip tekrar dener"""
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            result = fn()
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            limiter.throttled()
+            time.sleep(limiter.interval)
+            continue
+        limiter.success()
+        return result
+
+
+class MigrationCheckpoint:
+    """
+    Tamamlanan batch'leri JSON dosyasında tutar. Batch'ler paralel
+    bittiği için sıralı bir sayaç yerine tamamlanan indeksler saklanır;
+    dosya her batch'ten sonra atomik olarak yeniden yazılır.
+    """
+
+    def __init__(self, path: Path, fingerprint: Dict[str, Any]):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.completed: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Aynı kaynak ve batch boyutuna ait checkpoint varsa yükler"""
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Checkpoint okunamadı, baştan başlanıyor: {e}")
+            return
+        if data.get("fingerprint") != self.fingerprint:
+            logger.warning("⚠️ Checkpoint farklı bir kaynağa ait, baştan başlanıyor")
+            return
+        self.completed = set(data.get("completed", []))
+
+    def mark(self, batch_index: int) -> None:
+        with self._lock:
+            self.completed.add(batch_index)
+            self._write()
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "fingerprint": self.fingerprint,
+            "completed": sorted(self.completed),
+            "updated": time.time(),
+        }), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _open_source_collection(chroma_db_path: str, chroma_collection_name: str):
+    """Kaynak ChromaDB koleksiyonunu açar"""
+    import chromadb
+    return chromadb.PersistentClient(path=chroma_db_path).get_collection(chroma_collection_name)
+
+
+def _checkpoint_path(checkpoint_dir: str, chroma_collection_name: str,
+                     qdrant_collection_name: str) -> Path:
+    return Path(checkpoint_dir) / f"{chroma_collection_name}__{qdrant_collection_name}.json"
+
+
+def content_hash(text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Embedding modeli, metin ve metadata'nın özeti. Payload'da original_id'nin
+    yanında tutulur; artımlı senkronizasyon değişmeyen dökümanları bununla atlar.
+    """
+    digest = hashlib.sha256()
+    digest.update(qdrant_config.embed_model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((text or "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(metadata or {}, sort_keys=True, ensure_ascii=False,
+                             default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _build_points(documents, metadatas, ids, embeddings) -> List[PointStruct]:
+    """Batch verilerinden Qdrant noktalarını hazırlar"""
+    points = []
+    for doc, metadata, doc_id, embedding in zip(documents, metadatas, ids, embeddings):
+        # Payload oluştur
+        payload = {
+            "text": doc,
+            "original_id": doc_id,
+            "content_hash": content_hash(doc, metadata)
+        }
+        
+        # Metadata'yı ekle
+        if metadata:
+            payload.update(metadata)
+        
+        points.append(PointStruct(
+            id=point_id(doc_id),  # Deterministik: tekrar aktarım üzerine yazar
+            vector=embedding,
+            payload=payload
+        ))
+    return points
+
+
+def ensure_collection(qdrant_client: QdrantClient, qdrant_collection_name: str) -> None:
+    """Qdrant koleksiyonu yoksa oluşturur"""
+    try:
+        qdrant_client.get_collection(qdrant_collection_name)
+        logger.info(f"✅ Qdrant koleksiyonu '{qdrant_collection_name}' mevcut")
+    except Exception:
+        # Koleksiyon yoksa oluştur
+        logger.info(f"🆕 Qdrant koleksiyonu '{qdrant_collection_name}' oluşturuluyor...")
+        qdrant_client.create_collection(
+            collection_name=qdrant_collection_name,
+            vectors_config=qdrant_config.get_vector_params()
+        )
+
+
+def _valid_vector(vector, dim: int) -> bool:
+    return vector is not None and len(vector) == dim and bool(np.all(np.isfinite(vector)))
+
+
+def detect_reusable_embeddings(
+    chroma_collection,
+    documents: List[str],
+    embeddings,
+    openai_client: OpenAI,
+    mode: str = DEFAULT_REUSE_EMBEDDINGS
+) -> bool:
+    """
+    Chroma'daki vektörlerin qdrant_config.embed_model ile üretilip
+    üretilmediğini belirler. Önce boyut, sonra koleksiyon metadata'sındaki
+    model adı kontrol edilir; model adı yoksa bir örnek döküman yeniden
+    embed edilip saklı vektörle karşılaştırılır (tek API çağrısı).
+    """
+    if mode == "never" or embeddings is None or len(embeddings) == 0:
+        return False
+    dim = qdrant_config.get_vector_size()
+    sample = next((i for i, vector in enumerate(embeddings) if _valid_vector(vector, dim)), None)
+    if sample is None:
+        logger.info(f"ℹ️ Chroma vektörleri {dim} boyutlu değil, yeniden embed edilecek")
+        return False
+    if mode == "always":
+        return True
+    
+    metadata = getattr(chroma_collection, "metadata", None) or {}
+    model = next((metadata[k] for k in _MODEL_METADATA_KEYS if metadata.get(k)), None)
+    if model is not None:
+        if model != qdrant_config.embed_model:
+            logger.info(f"ℹ️ Chroma vektörleri '{model}' ile üretilmiş, yeniden embed edilecek")
+        return model == qdrant_config.embed_model
+    
+    probe = np.asarray(create_embeddings([documents[sample]], openai_client)[0], dtype=np.float32)
+    stored = np.asarray(embeddings[sample], dtype=np.float32)
+    similarity = float(probe @ stored / (np.linalg.norm(probe) * np.linalg.norm(stored) or 1.0))
+    if similarity < _MODEL_PROBE_THRESHOLD:
+        logger.info(f"ℹ️ Chroma vektörleri farklı bir modele ait görünüyor "
+                    f"(benzerlik {similarity:.3f}), yeniden embed edilecek")
+    return similarity >= _MODEL_PROBE_THRESHOLD
+
+
+def upload_batches(
+    batches: Iterable[Tuple[Any, List[str], List[Dict[str, Any]], List[str], Any]],
+    qdrant_client: QdrantClient,
+    qdrant_collection_name: str,
+    openai_client: OpenAI,
+    workers: int = DEFAULT_WORKERS,
+    on_done: Optional[Callable[[Any, int], None]] = None,
+    stats: Optional[Dict[str, int]] = None
+) -> int:
+    """
+    (anahtar, dökümanlar, metadatalar, kimlikler, vektörler) batch'lerini
+    sınırlı bir worker havuzunda embed edip Qdrant'a yükler. Vektörler
+    (Chroma'dan gelen NumPy satırları) verilmişse yalnızca eksik veya boyutu
+    uymayan kayıtlar embed edilir. Aynı anda en fazla 2 × workers batch
+    bellekte bekler. Her başarılı batch için on_done(anahtar, nokta sayısı)
+    çağrılır; stats verilirse "reused" / "embedded" sayaçları güncellenir.
+    Returns: başarısız batch sayısı.
+    """
+    # OpenAI ve Qdrant çağrıları ayrı hız sınırlarına tabi
+    limiter = AdaptiveRateLimiter()
+    upsert_limiter = AdaptiveRateLimiter()
+    workers = max(1, workers)
+    dim = qdrant_config.get_vector_size()
+    counts = stats if stats is not None else {}
+    counts.setdefault("reused", 0)
+    counts.setdefault("embedded", 0)
+    counts_lock = threading.Lock()
+    
+    def upload(documents, metadatas, ids, vectors) -> int:
+        metadatas = metadatas or [{}] * len(documents)
+        embeddings = list(vectors) if vectors is not None else [None] * len(documents)
+        missing = [j for j, vector in enumerate(embeddings) if not _valid_vector(vector, dim)]
+        if missing:
+            # Embedding'leri oluştur
+            created = _with_retry(
+                lambda: create_embeddings([documents[j] for j in missing], openai_client), limiter
+            )
+            for j, vector in zip(missing, created):
+                embeddings[j] = vector
+        with counts_lock:
+            counts["embedded"] += len(missing)
+            counts["reused"] += len(documents) - len(missing)
+        # Seri hale getirme sınırında listeye çevrilir; NumPy satırları o ana kadar kopyalanmaz
+        embeddings = [v.tolist() if isinstance(v, np.ndarray) else v for v in embeddings]
+        points = _build_points(documents, metadatas, ids, embeddings)
+        # Qdrant'a yükle
+        _with_retry(
+            lambda: qdrant_client.upsert(collection_name=qdrant_collection_name, points=points),
+            upsert_limiter
+        )
+        return len(points)
+    
+    failed = 0
+    pending: Dict[Any, Any] = {}
+    
+    def collect(block: bool) -> None:
+        nonlocal failed
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED if block else ALL_COMPLETED)
+        for future in done:
+            key = pending.pop(future)
+            try:
+                count = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"❌ Batch {key} aktarılamadı: {e}")
+                continue
+            if on_done is not None:
+                on_done(key, count)
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="migrate") as pool:
+        for key, documents, metadatas, ids, vectors in batches:
+            if len(pending) >= 2 * workers:
+                collect(block=True)
+            pending[pool.submit(upload, documents, metadatas, ids, vectors)] = key
+        if pending:
+            collect(block=False)
+    return failed
+
+
+def iter_source_pages(
+    chroma_collection,
+    page_size: int,
+    include: List[str],
+    skip: Set[int] = frozenset()
+) -> Iterator[Tuple[int, List[str], Optional[List[Dict[str, Any]]], List[str], Any]]:
+    """
+    Kaynak koleksiyonu limit/offset ile sayfa sayfa okur; bellekte aynı anda
+    yalnızca tüketilmekte olan sayfalar bulunur. skip'teki sayfalar okunmaz.
+    Yields: (sayfa numarası (0'dan), dökümanlar, metadatalar, kimlikler, vektörler)
+    """
+    total = chroma_collection.count()
+    for page, offset in enumerate(range(0, total, page_size)):
+        if page in skip:
+            continue
+        data = chroma_collection.get(include=include, limit=page_size, offset=offset)
+        ids = data.get('ids') or []
+        if not ids:
+            break
+        yield (page, data.get('documents') or [], data.get('metadatas') or None,
+               ids, data.get('embeddings'))
+
+
+def _source_include(reuse_embeddings: str) -> List[str]:
+    include = ["documents", "metadatas"]
+    if reuse_embeddings != "never":
+        include.append("embeddings")
+    return include
+
+
 def migrate_collection(
     chroma_db_path: str,
     chroma_collection_name: str,
     qdrant_client: QdrantClient,
     qdrant_collection_name: str,
-    openai_client: OpenAI
-):
-    """Tek bir koleksiyonu ChromaDB'den Qdrant'a aktarır"""
+    openai_client: OpenAI,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR,
+    resume: bool = True,
+    reuse_embeddings: str = DEFAULT_REUSE_EMBEDDINGS
+) -> bool:
+    """
+    Tek bir koleksiyonu ChromaDB'den Qdrant'a aktarır.
+    Kaynak batch boyutunda sayfalarla okunur (oku → embed → yükle hattı);
+    batch'ler sınırlı bir worker havuzunda paralel işlenir, böylece bellek
+    kullanımı koleksiyon boyutundan bağımsız kalır. Her başarılı batch
+    checkpoint'e yazılır ve yarıda kalan aktarım kaldığı yerden sürer.
+    Returns: tüm batch'ler aktarıldıysa True.
+    """
     
     logger.info(f"🔄 '{chroma_collection_name}' -> '{qdrant_collection_name}' aktarımı başlıyor...")
     
     try:
-        # ChromaDB'den veri oku
-        chroma_client = chromadb.PersistentClient(path=chroma_db_path)
-        chroma_collection = chroma_client.get_collection(chroma_collection_name)
-        
-        # Tüm verileri al
-        all_data = chroma_collection.get()
-        documents = all_data.get('documents', [])
-        metadatas = all_data.get('metadatas', [])
-        ids = all_data.get('ids', [])
+        # ChromaDB'ye bağlan
+        chroma_collection = _open_source_collection(chroma_db_path, chroma_collection_name)
         
-        if not documents:
+        total = chroma_collection.count()
+        if not total:
             logger.warning(f"'{chroma_collection_name}' koleksiyonu boş")
-            return
+            return True
         
-        logger.info(f"📖 {len(documents)} döküman bulundu")
+        logger.info(f"📖 {total} döküman bulundu")
         
-        # Qdrant koleksiyonu oluştur veya kontrol et
-        try:
-            collection_info = qdrant_client.get_collection(qdrant_collection_name)
-            logger.info(f"✅ Qdrant koleksiyonu '{qdrant_collection_name}' mevcut")
-        except Exception:
-            # Koleksiyon yoksa oluştur
-            logger.info(f"🆕 Qdrant koleksiyonu '{qdrant_collection_name}' oluşturuluyor...")
-            qdrant_client.create_collection(
-                collection_name=qdrant_collection_name,
-                vectors_config=qdrant_config.get_vector_params()
-            )
+        ensure_collection(qdrant_client, qdrant_collection_name)
         
-        # Embedding'leri oluştur (batch halinde)
-        batch_size = 100
-        total_migrated = 0
+        first_id = chroma_collection.get(limit=1, include=[])['ids'][0]
+        checkpoint = MigrationCheckpoint(
+            _checkpoint_path(checkpoint_dir, chroma_collection_name, qdrant_collection_name),
+            {"source": f"{chroma_db_path}:{chroma_collection_name}",
+             "target": qdrant_collection_name, "batch_size": batch_size,
+             "total": total, "first_id": first_id, "id_scheme": "uuid5"},
+        )
+        if resume:
+            checkpoint.load()
         
-        for i in range(0, len(documents), batch_size):
-            batch_end = min(i + batch_size, len(documents))
-            batch_documents = documents[i:batch_end]
-            batch_metadatas = metadatas[i:batch_end] if metadatas else [{}] * len(batch_documents)
-            batch_ids = ids[i:batch_end]
-            
-            logger.info(f"📤 Batch {i//batch_size + 1}: {len(batch_documents)} döküman işleniyor...")
-            
-            # Embedding'leri oluştur
-            embeddings = create_embeddings(batch_documents, openai_client)
-            
-            # Qdrant noktalarını hazırla
-            points = []
-            for j, (doc, metadata, doc_id, embedding) in enumerate(zip(
-                batch_documents, batch_metadatas, batch_ids, embeddings
-            )):
-                # Payload oluştur
-                payload = {
-                    "text": doc,
-                    "original_id": doc_id
-                }
-                
-                # Metadata'yı ekle
-                if metadata:
-                    payload.update(metadata)
-                
-                point = PointStruct(
-                    id=hash(doc_id) % (2**63),  # String ID'yi integer'a çevir
-                    vector=embedding,
-                    payload=payload
-                )
-                points.append(point)
-            
-            # Qdrant'a yükle
-            qdrant_client.upsert(
-                collection_name=qdrant_collection_name,
-                points=points
-            )
-            
-            total_migrated += len(points)
-            logger.info(f"✅ {total_migrated}/{len(documents)} döküman aktarıldı")
-            
-            # Kısa bekleme
-            time.sleep(0.5)
+        total_batches = -(-total // batch_size)
+        if checkpoint.completed:
+            logger.info(f"⏩ Checkpoint: {len(checkpoint.completed)}/{total_batches} batch zaten aktarılmış")
+        
+        reuse: Optional[bool] = None  # İlk okunan sayfada belirlenir
+        
+        def batches():
+            nonlocal reuse
+            pages = iter_source_pages(chroma_collection, batch_size,
+                                      _source_include(reuse_embeddings), set(checkpoint.completed))
+            for page, documents, metadatas, ids, embeddings in pages:
+                if reuse is None:
+                    reuse = detect_reusable_embeddings(chroma_collection, documents, embeddings,
+                                                       openai_client, reuse_embeddings)
+                # Anahtar: 1'den başlayan batch numarası (loglarda)
+                yield (page + 1, documents, metadatas, ids, embeddings if reuse else None)
+        
+        progress = {"done": sum(min(batch_size, total - b * batch_size)
+                                for b in checkpoint.completed)}
         
-        logger.info(f"🎉 '{chroma_collection_name}' aktarımı tamamlandı! ({total_migrated} döküman)")
+        def on_done(batch_number: int, count: int) -> None:
+            checkpoint.mark(batch_number - 1)
+            progress["done"] += count
+            logger.info(f"✅ Batch {batch_number}/{total_batches}: "
+                        f"{progress['done']}/{total} döküman aktarıldı")
+        
+        started = time.perf_counter()
+        counts: Dict[str, int] = {}
+        failed = upload_batches(batches(), qdrant_client, qdrant_collection_name,
+                                openai_client, workers, on_done, counts)
+        logger.info(f"♻️ {counts['reused']} vektör Chroma'dan kullanıldı, "
+                    f"{counts['embedded']} döküman embed edildi")
+        elapsed = time.perf_counter() - started
+        if failed:
+            logger.error(f"⚠️ '{chroma_collection_name}': {failed} batch başarısız; "
+                         f"tekrar çalıştırıldığında checkpoint'ten devam edilecek")
+            return False
+        
+        checkpoint.clear()
+        logger.info(f"🎉 '{chroma_collection_name}' aktarımı tamamlandı! "
+                    f"({progress['done']} döküman, {elapsed:.1f} sn)")
+        return True
         
     except Exception as e:
         logger.error(f"❌ '{chroma_collection_name}' aktarımında hata: {e}")
         traceback.print_exc()
+        return False
+
+
+def _scroll_index(qdrant_client: QdrantClient, collection_name: str,
+                  page_size: int = 256) -> Dict[str, Dict[str, Any]]:
+    """
+    Koleksiyondaki noktaları vektörsüz tarar.
+    Returns: {original_id: {"ids": [nokta kimlikleri], "hash": content_hash}}
+    """
+    index: Dict[str, Dict[str, Any]] = {}
+    offset = None
+    while True:
+        records, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=["original_id", "content_hash"],
+            with_vectors=False,
+        )
+        for record in records:
+            payload = record.payload or {}
+            original_id = payload.get("original_id")
+            if original_id is None:
+                continue
+            entry = index.setdefault(str(original_id), {"ids": [], "hash": None})
+            entry["ids"].append(record.id)
+            if str(record.id) == point_id(original_id):
+                entry["hash"] = payload.get("content_hash")
+        if offset is None:
+            break
+    return index
+
+
+def sync_collection(
+    chroma_db_path: str,
+    chroma_collection_name: str,
+    qdrant_client: QdrantClient,
+    qdrant_collection_name: str,
+    openai_client: OpenAI,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    dry_run: bool = False,
+    reuse_embeddings: str = DEFAULT_REUSE_EMBEDDINGS
+) -> Dict[str, int]:
+    """
+    Artımlı senkronizasyon: kaynak ile Qdrant'taki content_hash'ler
+    karşılaştırılır; yalnızca yeni veya değişen dökümanlar embed edilip
+    yüklenir, kaynakta artık olmayanlar (ve eski kimlikli kopyalar) silinir.
+    Kaynak sayfa sayfa okunur; bellekte yalnızca hedefin kimlik/özet dizini
+    tutulur. Fark her çalıştırmada yeniden hesaplandığı için checkpoint gerekmez.
+    Bir batch yüklenemezse veya kaynak beklenenden az satır döndürürse silme
+    yapılmaz (sayısı "skipped_deletes"te raporlanır); sonraki çalıştırma tamamlar.
+    Returns: {"source", "unchanged", "upserted", "deleted", "skipped_deletes",
+              "failed_batches", "reused", "embedded"}
+    """
+    logger.info(f"🔁 '{chroma_collection_name}' -> '{qdrant_collection_name}' senkronizasyonu...")
+    
+    chroma_collection = _open_source_collection(chroma_db_path, chroma_collection_name)
+    expected = chroma_collection.count()
+    
+    ensure_collection(qdrant_client, qdrant_collection_name)
+    existing = _scroll_index(qdrant_client, qdrant_collection_name)
+    
+    stats = {"source": 0, "unchanged": 0, "upserted": 0, "deleted": 0, "skipped_deletes": 0,
+             "failed_batches": 0}
+    to_delete: List[Any] = []
+    reuse: Optional[bool] = None  # Değişen döküman içeren ilk sayfada belirlenir
+    
+    def changed_rows():
+        nonlocal reuse
+        include = ["documents", "metadatas"] if dry_run else _source_include(reuse_embeddings)
+        for _, documents, metadatas, ids, embeddings in iter_source_pages(
+                chroma_collection, batch_size, include):
+            metadatas = metadatas or [{}] * len(documents)
+            stats["source"] += len(documents)
+            changed = []
+            for j, (doc, metadata, doc_id) in enumerate(zip(documents, metadatas, ids)):
+                doc_id = str(doc_id)
+                entry = existing.pop(doc_id, None)
+                if entry is None or entry["hash"] != content_hash(doc, metadata):
+                    changed.append(j)
+                else:
+                    stats["unchanged"] += 1
+                if entry is not None:
+                    canonical = point_id(doc_id)
+                    to_delete.extend(pid for pid in entry["ids"] if str(pid) != canonical)
+            if changed and reuse is None and not dry_run:
+                reuse = detect_reusable_embeddings(chroma_collection, documents, embeddings,
+                                                   openai_client, reuse_embeddings)
+            for j in changed:
+                stats["upserted"] += 1
+                yield (documents[j], metadatas[j], str(ids[j]),
+                       embeddings[j] if reuse and embeddings is not None else None)
+    
+    def batches():
+        number, buffer = 0, []
+        for row in changed_rows():
+            buffer.append(row)
+            if len(buffer) == batch_size:
+                number += 1
+                yield (number, *map(list, zip(*buffer)))
+                buffer = []
+        if buffer:
+            yield (number + 1, *map(list, zip(*buffer)))
+    
+    if dry_run:
+        for _ in batches():
+            pass
+    else:
+        stats["failed_batches"] = upload_batches(
+            batches(), qdrant_client, qdrant_collection_name, openai_client, workers,
+            stats=stats
+        )
+    
+    # Kaynakta artık bulunmayan dökümanlar
+    for entry in existing.values():
+        to_delete.extend(entry["ids"])
+    if stats["failed_batches"] or stats["source"] < expected:
+        # Eksik tarama/yükleme: okunmayan dökümanlar "kaynakta yok" sanılıp
+        # silinmesin, kanonik kopyası yazılamayanların eskisi kaybolmasın
+        logger.warning(f"⚠️ '{qdrant_collection_name}': {stats['source']}/{expected} satır okundu, "
+                       f"{stats['failed_batches']} batch başarısız; {len(to_delete)} silme atlandı")
+        stats["skipped_deletes"], to_delete = len(to_delete), []
+    stats["deleted"] = len(to_delete)
+    if not dry_run:
+        for i in range(0, len(to_delete), 256):
+            qdrant_client.delete(
+                collection_name=qdrant_collection_name,
+                points_selector=PointIdsList(points=to_delete[i:i + 256]),
+            )
+    
+    logger.info(f"{'🔍 (deneme) ' if dry_run else '✅ '}'{qdrant_collection_name}': "
+                f"{stats['unchanged']} değişmedi, {stats['upserted']} yeni/değişen, "
+                f"{stats['deleted']} silindi")
+    return stats
+
+def compact_collection(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    dry_run: bool = False,
+    page_size: int = 256
+) -> Dict[str, int]:
+    """
+    Eski hash(doc_id) kimlikleriyle birikmiş kopyaları temizler.
+    Noktalar original_id'ye göre gruplanır; her gruptan point_id(original_id)
+    kimlikli tek nokta kalır. Kanonik nokta yoksa bir kopyanın vektörü ve
+    payload'ı kanonik kimlikle yeniden yazılır. original_id'si olmayan
+    noktalara dokunulmaz (aynı metin farklı intent'lere ait olabilir).
+    Returns: {"scanned", "groups", "rewritten", "deleted"}
+    """
+    groups: Dict[str, List[Any]] = {}
+    scanned = 0
+    offset = None
+    while True:
+        records, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=["original_id"],
+            with_vectors=False,
+        )
+        for record in records:
+            original_id = (record.payload or {}).get("original_id")
+            if original_id is not None:
+                groups.setdefault(str(original_id), []).append(record.id)
+        scanned += len(records)
+        if offset is None:
+            break
+
+    to_delete: List[Any] = []
+    rewritten = 0
+    for original_id, point_ids in groups.items():
+        canonical = point_id(original_id)
+        if canonical not in {str(pid) for pid in point_ids}:
+            if not dry_run:
+                source = qdrant_client.retrieve(
+                    collection_name=collection_name,
+                    ids=[point_ids[0]],
+                    with_payload=True,
+                    with_vectors=True,
+                )[0]
+                qdrant_client.upsert(
+                    collection_name=collection_name,
+                    points=[PointStruct(id=canonical, vector=source.vector, payload=source.payload)],
+                )
+            rewritten += 1
+        to_delete.extend(pid for pid in point_ids if str(pid) != canonical)
+
+    if to_delete and not dry_run:
+        for i in range(0, len(to_delete), page_size):
+            qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=to_delete[i:i + page_size]),
+            )
+
+    stats = {"scanned": scanned, "groups": len(groups), "rewritten": rewritten,
+             "deleted": len(to_delete)}
+    logger.info(f"🧹 '{collection_name}' sıkıştırma{' (deneme)' if dry_run else ''}: "
+                f"{scanned} nokta, {len(groups)} benzersiz, {rewritten} yeniden yazıldı, "
+                f"{len(to_delete)} kopya silindi")
+    return stats
 
 def verify_migration(qdrant_client: QdrantClient, collection_name: str, test_query: str = "test"):
     """Aktarımı doğrula"""
@@ -186,8 +723,39 @@ def verify_migration(qdrant_client: QdrantClient, collection_name: str, test_que
         logger.error(f"❌ Doğrulama hatası: {e}")
         return False
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ChromaDB → Qdrant aktarımı")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Tek embedding/upsert çağrısındaki döküman sayısı")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Eşzamanlı işlenen batch sayısı")
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR,
+                        help="Checkpoint dosyalarının dizini")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Checkpoint'i yok say, baştan aktar")
+    parser.add_argument("--compact", action="store_true",
+                        help="Aktarım yerine koleksiyonlardaki kopya noktaları temizle")
+    parser.add_argument("--sync", action="store_true",
+                        help="Artımlı senkronizasyon: yalnızca yeni/değişen dökümanları embed et, "
+                             "silinenleri kaldır")
+    parser.add_argument("--reuse-embeddings", choices=["auto", "always", "never"],
+                        default=DEFAULT_REUSE_EMBEDDINGS,
+                        help="Chroma'daki vektörleri kullan: auto (model eşleşirse), always, never")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="--compact / --sync ile: değişiklik yapmadan yalnızca raporla")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Ana aktarım işlemi"""
+    args = parse_args(argv)
+    if not args.compact:
+        # Sıkıştırma yalnızca Qdrant'la çalışır; aktarım ve senkronizasyon Chroma'yı okur
+        try:
+            import chromadb  # noqa: F401
+        except ImportError as e:
+            print(f"❌ Gerekli kütüphane eksik: {e}")
+            print("Lütfen şu komutu çalıştırın: pip install -r requirements.txt")
+            sys.exit(1)
     logger.info("🚀 ChromaDB -> Qdrant Cloud aktarımı başlıyor...")
     
     try:
@@ -208,7 +776,18 @@ def main():
             }
         ]
         
+        if args.compact:
+            for migration in migrations:
+                stats = compact_collection(qdrant_client, migration["qdrant_collection"],
+                                           dry_run=args.dry_run)
+                if (migration["qdrant_collection"] == get_collection_name("hotel")
+                        and stats["deleted"] and not args.dry_run):
+                    from chains.answer_cache import bump_knowledge_version
+                    bump_knowledge_version()
+            return
+        
         # Her koleksiyonu aktarır
+        failed = []
         for migration in migrations:
             chroma_path = Path(migration["chroma_db"])
             
@@ -216,13 +795,48 @@ def main():
                 logger.warning(f"⚠️ ChromaDB klasörü bulunamadı: {chroma_path}")
                 continue
             
-            migrate_collection(
+            if args.sync:
+                stats = sync_collection(
+                    str(chroma_path),
+                    migration["chroma_collection"],
+                    qdrant_client,
+                    migration["qdrant_collection"],
+                    openai_client,
+                    batch_size=args.batch_size,
+                    workers=args.workers,
+                    dry_run=args.dry_run,
+                    reuse_embeddings=args.reuse_embeddings
+                )
+                # Başarısız batch olsa da yüklemeler uygulandı: cache geçersiz
+                if (migration["qdrant_collection"] == get_collection_name("hotel")
+                        and (stats["upserted"] or stats["deleted"]) and not args.dry_run):
+                    from chains.answer_cache import bump_knowledge_version
+                    bump_knowledge_version()
+                if stats["failed_batches"] or stats["skipped_deletes"]:
+                    failed.append(migration["chroma_collection"])
+                continue
+            
+            ok = migrate_collection(
                 str(chroma_path),
                 migration["chroma_collection"],
                 qdrant_client,
                 migration["qdrant_collection"],
-                openai_client
+                openai_client,
+                batch_size=args.batch_size,
+                workers=args.workers,
+                checkpoint_dir=args.checkpoint_dir,
+                resume=not args.no_resume,
+                reuse_embeddings=args.reuse_embeddings
             )
+            if not ok:
+                # Yarım aktarım: checkpoint'ten devam edilene kadar sürüm değişmez
+                failed.append(migration["chroma_collection"])
+                continue
+            
+            # Bilgi tabanı değişti → semantik yanıt cache'lerini geçersiz kıl
+            if migration["qdrant_collection"] == get_collection_name("hotel"):
+                from chains.answer_cache import bump_knowledge_version
+                bump_knowledge_version()
         
         # Doğrulama
         logger.info("\n🔍 Aktarım doğrulaması yapılıyor...")
@@ -234,6 +848,11 @@ def main():
                 "test sorgu"
             )
         
+        if failed:
+            logger.error(f"\n💥 Aktarım tamamlanamadı: {', '.join(failed)}; "
+                         f"tekrar çalıştırın")
+            sys.exit(1)
+        
         logger.info("\n🎉 Tüm aktarım işlemleri tamamlandı!")
         logger.info("Artık Qdrant Cloud ile test edebilirsiniz:")
         logger.info("  python test_collections.py")
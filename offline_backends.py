@@ -0,0 +1,432 @@
+"""
+Çevrimdışı Arka Uçlar
+=====================
+OpenAI ve Qdrant Cloud olmadan tüm pipeline'ı çalıştırmak / profillemek için
+yerel yedekler:
+
+- FakeOpenAI / FakeAsyncOpenAI : Deterministik embedding'ler (kelime, kök ve
+  karakter 3-gram'larının hash'i; benzer metinler benzer vektör üretir),
+  ayarlanabilir gecikme ve zincire göre hazır chat yanıtları.
+- build_local_qdrant            : QdrantClient(":memory:") veya
+  QdrantClient(path=...) örneği; knowledge_collection_2 ve
+  intent_collection_1 bir fixture dosyasından doldurulur.
+- install                       : Zincirlerin kullandığı istemcileri bu
+  yedeklerle değiştirir; dönen nesnenin uninstall() metodu (veya with
+  bloğu) eski istemcileri geri yükler ve geçici dizini siler.
+
+Kullanım:
+    from offline_backends import install
+    backends = install()                 # veya install(path="cache/offline_qdrant")
+    from pipeline import new_session, process_message
+    ...
+    backends.uninstall()
+
+    with install() as backends:          # testlerde: çıkışta geri yüklenir
+        ...
+"""
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+import weakref
+
+import numpy as np
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "fixtures", "offline_fixture.json")
+KNOWLEDGE_COLLECTION = "knowledge_collection_2"
+INTENT_COLLECTION = "intent_collection_1"
+EMBED_DIM = 1536
+
+# Gecikmeler (ms) ortam değişkenleriyle de ayarlanabilir
+EMBED_LATENCY_MS = float(os.getenv("OFFLINE_EMBED_LATENCY_MS", "0"))
+CHAT_LATENCY_MS = float(os.getenv("OFFLINE_CHAT_LATENCY_MS", "0"))
+TOKEN_LATENCY_MS = float(os.getenv("OFFLINE_TOKEN_LATENCY_MS", "0"))
+
+_ASCII = str.maketrans("çğıöşüÇĞİÖŞÜ", "cgiosuCGIOSU")
+_WORD = re.compile(r"\w+")
+
+
+# ----------------------------------------------------------------------
+# Deterministik embedding
+# ----------------------------------------------------------------------
+def _features(text: str) -> List[str]:
+    words = _WORD.findall(text.translate(_ASCII).lower())
+    feats = [f"w:{w}" for w in words] + [f"s:{w[:4]}" for w in words if len(w) > 4]
+    for w in words:
+        padded = f"#{w}#"
+        feats.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return feats or ["<empty>"]
+
+
+def fake_embedding(text: str, dim: int = EMBED_DIM) -> List[float]:
+    """Metnin özelliklerini sabit hash'le boyutlara dağıtır; L2-normalize edilir"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feat in _features(text):
+        digest = hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        weight = 2.0 if feat[0] == "w" else 1.0
+        vector[index] += sign * weight
+    vector /= max(float(np.linalg.norm(vector)), 1e-12)
+    return vector.tolist()
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# ----------------------------------------------------------------------
+# Sahte OpenAI istemcisi
+# ----------------------------------------------------------------------
+BOOKING_QUESTION = ("Hangi tarihler arasında, kaç yetişkin ve çocukla, kaç odada "
+                    "konaklamayı planlıyorsunuz?")
+SMALL_TALK_REPLY = "Merhaba! Cullinan Hotel'e hoş geldiniz, size nasıl yardımcı olabilirim?"
+DEFAULT_REPLY = "Tamam."
+
+
+class _Embeddings:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, model: str, input, **kwargs):
+        self._owner.calls["embeddings"] += 1
+        texts = [input] if isinstance(input, str) else list(input)
+        self._owner._sleep(self._owner.embed_latency_ms)
+        return self._owner._embedding_response(model, texts)
+
+
+class _ChatCompletions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, model: str, messages: List[Dict[str, str]], stream: bool = False,
+               stream_options: Optional[Dict[str, Any]] = None, **kwargs):
+        self._owner._sleep(self._owner.chat_latency_ms)
+        return self._owner._completion(model, messages, stream, stream_options, kwargs)
+
+
+class FakeOpenAI:
+    """
+    openai.OpenAI yerine geçen, ağ kullanmayan istemci.
+
+    canned: (anahtar kelime, yanıt) çiftleri; son kullanıcı mesajı anahtar
+    kelimeyi içeriyorsa o yanıt döner. Eşleşme yoksa zincire göre (system
+    prompt'tan anlaşılır) varsayılan yanıt üretilir.
+    """
+
+    def __init__(
+        self,
+        embed_latency_ms: float = EMBED_LATENCY_MS,
+        chat_latency_ms: float = CHAT_LATENCY_MS,
+        token_latency_ms: float = TOKEN_LATENCY_MS,
+        canned: Sequence[Tuple[str, str]] = (),
+        dim: int = EMBED_DIM
+    ):
+        self.embed_latency_ms = embed_latency_ms
+        self.chat_latency_ms = chat_latency_ms
+        self.token_latency_ms = token_latency_ms
+        self.canned = list(canned)
+        self.dim = dim
+        self.calls = {"embeddings": 0, "chat": 0}
+        self._seen_prefixes = set()
+        self.embeddings = _Embeddings(self)
+        self.chat = SimpleNamespace(completions=_ChatCompletions(self))
+
+    # --- Yardımcılar --------------------------------------------------
+    @staticmethod
+    def _sleep(ms: float) -> None:
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def _embedding_response(self, model: str, texts: List[str]):
+        return SimpleNamespace(
+            model=model,
+            data=[SimpleNamespace(index=i, embedding=fake_embedding(t, self.dim))
+                  for i, t in enumerate(texts)],
+            usage=SimpleNamespace(prompt_tokens=sum(_approx_tokens(t) for t in texts),
+                                  total_tokens=sum(_approx_tokens(t) for t in texts)),
+        )
+
+    def _completion(self, model, messages, stream, stream_options, kwargs,
+                    token_latency_ms: Optional[float] = None):
+        self.calls["chat"] += 1
+        content = self.reply_for(messages, kwargs.get("response_format"))
+        usage = self._usage(messages, content)
+        if stream:
+            include_usage = bool(stream_options and stream_options.get("include_usage"))
+            if token_latency_ms is None:
+                token_latency_ms = self.token_latency_ms
+            return self._stream(model, content, usage if include_usage else None,
+                                token_latency_ms)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                     message=SimpleNamespace(role="assistant", content=content))],
+            usage=usage,
+        )
+
+    def _usage(self, messages: List[Dict[str, str]], content: str):
+        prompt = sum(_approx_tokens(m.get("content") or "") + 4 for m in messages)
+        completion = _approx_tokens(content)
+        # Sağlayıcı prompt cache'ini taklit et: ilk mesaj daha önce görüldüyse
+        # 1024+ token'lık önek 128'lik bloklar halinde cache'ten gelir
+        first = messages[0].get("content", "") if messages else ""
+        cached = 0
+        if prompt >= 1024 and first in self._seen_prefixes:
+            cached = (_approx_tokens(first) // 128) * 128
+        self._seen_prefixes.add(first)
+        return SimpleNamespace(
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            total_tokens=prompt + completion,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+        )
+
+    def _stream(self, model: str, content: str, usage, token_latency_ms: float):
+        for piece in re.findall(r"\S+\s*|\s+", content):
+            self._sleep(token_latency_ms)
+            yield SimpleNamespace(
+                model=model, usage=None,
+                choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=piece))],
+            )
+        if usage is not None:
+            yield SimpleNamespace(model=model, choices=[], usage=usage)
+
+    # --- Hazır yanıtlar -----------------------------------------------
+    def reply_for(self, messages: List[Dict[str, str]], response_format=None) -> str:
+        system = " ".join(m["content"] for m in messages if m["role"] == "system")
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        for keyword, reply in self.canned:
+            if keyword.lower() in user.lower():
+                return reply
+
+        if "rezervasyon asistanı" in system:
+            return self._booking_reply(user, response_format)
+        if "<KONTEKS>" in system:
+            context = system.split("<KONTEKS>", 1)[1].split("</KONTEKS>", 1)[0].strip()
+            first = context.split("\n\n", 1)[0]
+            return re.split(r"(?<=[.!?])\s", first, maxsplit=1)[0] if first else DEFAULT_REPLY
+        if "sohbet asistanı" in system:
+            return SMALL_TALK_REPLY
+        return DEFAULT_REPLY
+
+    @staticmethod
+    def _booking_reply(user: str, response_format) -> str:
+        from chains.slot_extractor import extract_slots
+        slots = extract_slots(user)
+        if response_format:
+            data = {key: None for key in ("giris_tarihi", "cikis_tarihi", "yetiskin_sayisi",
+                                          "cocuk_sayisi", "oda_sayisi", "cocuk_yaslari", "karar")}
+            data.update(slots)
+            for key in ("yetiskin_sayisi", "cocuk_sayisi", "oda_sayisi"):
+                if data[key] is not None:
+                    data[key] = int(data[key])
+            if data["cocuk_yaslari"] is not None:
+                data["cocuk_yaslari"] = [int(a) for a in data["cocuk_yaslari"].split(",")]
+            return json.dumps(dict(data, reply=BOOKING_QUESTION), ensure_ascii=False)
+        lines = "\n".join(f"{k}={v}" for k, v in slots.items())
+        return f"{BOOKING_QUESTION}\n---\n{lines}"
+
+
+class FakeAsyncOpenAI:
+    """openai.AsyncOpenAI yerine geçen istemci; FakeOpenAI ile aynı yanıtları verir"""
+
+    def __init__(self, sync: Optional[FakeOpenAI] = None, **kwargs):
+        self.sync = sync or FakeOpenAI(**kwargs)
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    async def _embed(self, model: str, input, **kwargs):
+        self.sync.calls["embeddings"] += 1
+        texts = [input] if isinstance(input, str) else list(input)
+        await asyncio.sleep(self.sync.embed_latency_ms / 1000)
+        return self.sync._embedding_response(model, texts)
+
+    async def _chat(self, model: str, messages, stream: bool = False,
+                    stream_options: Optional[Dict[str, Any]] = None, **kwargs):
+        await asyncio.sleep(self.sync.chat_latency_ms / 1000)
+        if stream:
+            # Parçalar senkron akışla aynıdır; token gecikmesi event loop'u bloklamaz
+            chunks = self.sync._completion(model, messages, True, stream_options, kwargs,
+                                           token_latency_ms=0)
+            return self._astream(chunks)
+        return self.sync._completion(model, messages, False, None, kwargs)
+
+    async def _astream(self, chunks):
+        for chunk in chunks:
+            if chunk.choices:
+                await asyncio.sleep(self.sync.token_latency_ms / 1000)
+            yield chunk
+
+
+# ----------------------------------------------------------------------
+# Yerel Qdrant
+# ----------------------------------------------------------------------
+def load_fixture(path: str = FIXTURE_PATH) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _point_id(collection: str, text: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{collection}:{text}"))
+
+
+def build_local_qdrant(path: Optional[str] = None, fixture: Optional[str] = None,
+                       dim: int = EMBED_DIM):
+    """
+    Fixture'dan doldurulmuş yerel QdrantClient döndürür. path verilirse veriler
+    diskte tutulur ve koleksiyonlar zaten doluysa yeniden yüklenmez.
+    """
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    client = QdrantClient(path=path) if path else QdrantClient(location=":memory:")
+    data = load_fixture(fixture or FIXTURE_PATH)
+    seeds = {
+        KNOWLEDGE_COLLECTION: [{"text": text} for text in data["knowledge"]],
+        INTENT_COLLECTION: data["intents"],
+    }
+    for collection, payloads in seeds.items():
+        if client.collection_exists(collection):
+            if client.count(collection).count == len(payloads):
+                continue
+            client.delete_collection(collection)
+        client.create_collection(collection, vectors_config=VectorParams(
+            size=dim, distance=Distance.COSINE))
+        client.upsert(collection, points=[
+            PointStruct(id=_point_id(collection, p["text"]),
+                        vector=fake_embedding(p["text"], dim), payload=p)
+            for p in payloads
+        ])
+    return client
+
+
+class AsyncQdrantAdapter:
+    """
+    Yerel QdrantClient'ı AsyncQdrantClient gibi kullanılabilir yapar; böylece
+    senkron ve async zincirler aynı veriyi görür. Yerel modda çağrılar bellek
+    içi olduğundan doğrudan çalıştırılır.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+        return call
+
+
+# ----------------------------------------------------------------------
+# Zincirleri yedeklere bağlama
+# ----------------------------------------------------------------------
+@dataclass
+class OfflineBackends:
+    openai: FakeOpenAI
+    async_openai: FakeAsyncOpenAI
+    qdrant: Any
+    async_qdrant: AsyncQdrantAdapter
+    state_dir: str      # Bilgi tabanı sürüm işareti gibi geçici dosyalar
+    _restore: Optional[List[Tuple[Any, str, Any]]] = None
+    _cleanup: Optional[weakref.finalize] = None
+
+    def uninstall(self) -> None:
+        """
+        install() öncesindeki istemcileri, cache'leri ve ortam değişkenlerini
+        geri yükler, geçici dizini siler. Birden fazla çağrılabilir.
+        """
+        restore, self._restore = self._restore or [], None
+        for target, name, value in reversed(restore):
+            if target is os.environ:
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            else:
+                setattr(target, name, value)
+        if self._cleanup is not None:
+            self._cleanup()
+
+    def __enter__(self) -> "OfflineBackends":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.uninstall()
+
+
+def install(
+    openai_client: Optional[FakeOpenAI] = None,
+    qdrant_client=None,
+    path: Optional[str] = None,
+    fixture: Optional[str] = None
+) -> OfflineBackends:
+    """
+    Zincirlerin modül düzeyindeki istemcilerini yerel yedeklerle değiştirir.
+    Paylaşılan dosyalara dokunulmaz ve ağ kullanılmaz:
+    - Embedding servisi disk cache'i olmadan yeniden kurulur.
+    - Yanıt cache'i yalnızca bellekte tutulur (ANSWER_CACHE_PATH yok sayılır),
+      bilgi tabanı sürüm işareti geçici bir dizine yazılır.
+    - Token sayımı tiktoken yerine tahminle yapılır (tiktoken kodlama
+      dosyasını ilk kullanımda indirir).
+    Dönen nesnenin uninstall() metodu (veya with bloğu) her şeyi eski haline
+    getirir; çağrılmazsa geçici dizin en geç süreç kapanırken silinir.
+    """
+    restore: List[Tuple[Any, str, Any]] = []
+
+    def patch(target, name: str, value) -> None:
+        if target is os.environ:
+            restore.append((target, name, os.environ.get(name)))
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        else:
+            restore.append((target, name, getattr(target, name)))
+            setattr(target, name, value)
+
+    patch(os.environ, "OPENAI_API_KEY", os.environ.get("OPENAI_API_KEY") or "offline")
+    patch(os.environ, "ANSWER_CACHE_PATH", None)
+    state_dir = tempfile.mkdtemp(prefix="offline_backends_")
+    fake = openai_client or FakeOpenAI()
+    fake_async = FakeAsyncOpenAI(fake)
+    qdrant = qdrant_client or build_local_qdrant(path, fixture, fake.dim)
+    async_qdrant = AsyncQdrantAdapter(qdrant)
+
+    import qdrant_config
+    from chains import (answer_cache, async_clients, booking_dialog, context_builder,
+                        embedding_service, intent_classifier_qdrant, rag_hotel_qdrant,
+                        small_talk)
+
+    patch(booking_dialog, "client", fake)
+    patch(small_talk, "client", fake)
+    patch(rag_hotel_qdrant, "_openai_client", fake)
+    patch(rag_hotel_qdrant, "_qdrant_client", qdrant)
+    patch(intent_classifier_qdrant, "_openai_client", fake)
+    patch(intent_classifier_qdrant, "_qdrant_client", qdrant)
+    patch(async_clients, "_async_openai_client", fake_async)
+    patch(async_clients, "_async_qdrant_client", async_qdrant)
+    patch(embedding_service, "_service", embedding_service.EmbeddingService(
+        client=fake, async_client=fake_async
+    ))
+    patch(qdrant_config, "get_qdrant_client", lambda: qdrant)
+    patch(answer_cache, "KNOWLEDGE_VERSION_PATH", os.path.join(state_dir, "knowledge_version"))
+    patch(answer_cache, "_cache", None)
+    patch(context_builder, "_encoder", None)
+    patch(context_builder, "_encoder_loaded", True)
+
+    backends = OfflineBackends(fake, fake_async, qdrant, async_qdrant, state_dir, restore)
+    backends._cleanup = weakref.finalize(backends, shutil.rmtree, state_dir, ignore_errors=True)
+    return backends
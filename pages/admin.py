@@ -507,45 +507,67 @@ def show_test_tools():
     with col2:
         st.markdown("### 📊 Performance Testleri")
         
+        offline = st.checkbox("Çevrimdışı yedekler (OpenAI/Qdrant çağrısı yok)", value=True)
+        repeats = st.number_input("Tekrar sayısı", min_value=1, max_value=20, value=3)
+        stream = st.checkbox("Akış modu (ilk token süresi)", value=False)
+        
         if st.button("⚡ Chatbot Performance Test"):
-            # Basit performance testi
-            import time
-            
-            start_time = time.time()
+            # Benchmark ayrı süreçte çalışır; çevrimdışı yedekler bu sürecin
+            # istemcilerini değiştirmez
+            project_root = Path(__file__).parent.parent
+            cmd = [sys.executable, str(project_root / "benchmark.py"),
+                   "--repeats", str(int(repeats)), "--json"]
+            if offline:
+                cmd.append("--offline")
+            if stream:
+                cmd.append("--stream")
             
-            # Test mesajları
-            test_messages = [
-                "Merhaba",
-                "Rezervasyon yapmak istiyorum", 
-                "Fiyatlar nedir?",
-                "Teşekkürler"
-            ]
+            with st.spinner("Benchmark çalışıyor..."):
+                try:
+                    result = subprocess.run(cmd, capture_output=True, text=True,
+                                            cwd=project_root, timeout=1800)
+                except subprocess.TimeoutExpired:
+                    st.error("❌ Performance testi 30 dakikada tamamlanamadı; "
+                             "tekrar sayısını azaltıp yeniden deneyin")
+                    return
             
-            times = []
-            for msg in test_messages:
-                msg_start = time.time()
-                # Burada gerçek chatbot çağrısı yapılabilir
-                time.sleep(0.1)  # Simülasyon
-                msg_time = time.time() - msg_start
-                times.append(msg_time * 1000)  # ms
+            if result.returncode != 0:
+                st.error("❌ Performance testi başarısız")
+                st.code(result.stderr[-3000:])
+                return
             
-            total_time = time.time() - start_time
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+            meta, overall = report["meta"], report["overall"]
             
-            st.success("✅ Performance testi tamamlandı")
-            st.metric("Toplam Süre", f"{total_time:.2f}s")
-            st.metric("Ortalama Yanıt", f"{sum(times)/len(times):.2f}ms")
+            st.success(f"✅ Performance testi tamamlandı ({meta['turns']} tur, "
+                       f"hata: {meta['errors']}, rota uyuşmazlığı: {report['route_mismatches']})")
+            m1, m2, m3 = st.columns(3)
+            m1.metric("p50", f"{overall['p50']:.0f}ms")
+            m2.metric("p95", f"{overall['p95']:.0f}ms")
+            m3.metric("p99", f"{overall['p99']:.0f}ms")
+            st.metric("Toplam Süre", f"{meta['wall_seconds']:.2f}s")
             
             # Grafik göster
             import pandas as pd
             import plotly.express as px
             
-            df = pd.DataFrame({
-                'Mesaj': [f"Test {i+1}" for i in range(len(times))],
-                'Süre (ms)': times
-            })
+            df = pd.DataFrame([
+                {"Rota": route, "Aşama": stage_name, "n": s["count"],
+                 "p50 (ms)": s["p50"], "p95 (ms)": s["p95"], "p99 (ms)": s["p99"]}
+                for route, stages in report["summary"].items()
+                for stage_name, s in stages.items()
+            ])
+            st.dataframe(df.round(1), use_container_width=True, hide_index=True)
             
-            fig = px.bar(df, x='Mesaj', y='Süre (ms)')
+            fig = px.bar(df, x='Aşama', y='p95 (ms)', color='Rota', barmode='group')
             st.plotly_chart(fig, use_container_width=True)
+            
+            st.download_button(
+                "📥 JSON Raporu İndir",
+                json.dumps(report, ensure_ascii=False, indent=2),
+                file_name=f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json"
+            )
 
 # Main content based on selection
 if admin_section == "📊 Sistem Durumu":
@@ -0,0 +1,334 @@
+"""
+Chat Pipeline
+=============
+classify → route → chain akışı tek yerde. Terminal router'ı (router_qdrant)
+ve diğer sunucular aynı yönlendirme mantığını kullanır.
+
+- process_message  : Senkron sürüm
+- aprocess_message : asyncio sürümü (AsyncOpenAI + AsyncQdrantClient). Tek bir
+  worker süreci, I/O beklerken bloklanmadan çok sayıda konuşmayı yürütebilir.
+- stream_message   : Yanıt parçalarını üretildikçe yield eden senkron sürüm
+
+Spekülatif arama: Sözcüksel kısayol eşleşmezse mesaj bir kez embed edilir ve
+knowledge_collection_2 araması intent sınıflandırmasıyla aynı anda başlatılır.
+Intent RAG gerektirmiyorsa arama sonucu atılır. SPECULATIVE_RETRIEVAL=0 ile
+kapatılabilir.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generator, Optional
+import contextvars
+import asyncio
+import logging
+import os
+import time
+
+from chains.embedding_service import embed_single, aembed_single
+from chains.intent_classifier_qdrant import UNKNOWN
+from chains.rag_hotel_qdrant import (
+    answer_hotel_qdrant, aanswer_hotel_qdrant, stream_answer_hotel_qdrant,
+    retrieve, aretrieve, cached_answer
+)
+from chains.booking_dialog import (
+    BookingState, handle_booking, ahandle_booking, handle_booking_stream
+)
+from chains.small_talk import respond_small_talk, arespond_small_talk, stream_small_talk
+from chains.link_redirect import redirect
+
+logger = logging.getLogger("hotel_chatbot.pipeline")
+
+# Niyet kümeleri
+SMALL_TALK   = {"selamla", "veda", "teşekkür", "yardım"}
+BOOKING_FLOW = {"fiyat_sorgulama", "rezervasyon_oluşturma"}
+LINK_INTENTS = {"rezervasyon_değiştirme", "rezervasyon_iptali", "rezervasyon_durumu"}
+
+
+@dataclass
+class TurnResult:
+    """Tek bir konuşma turunun sonucu; timings milisaniye cinsindendir"""
+    reply: str
+    route: str
+    intent: Optional[str] = None
+    confidence: float = 0.0
+    booking_done: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "1") != "0"
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative")
+    return _executor
+
+
+def new_session() -> Dict[str, Any]:
+    """Boş oturum durumu"""
+    return {"booking_state": BookingState(), "in_booking": False}
+
+
+def route_for(intent: str) -> str:
+    """Intent → zincir adı"""
+    if intent in SMALL_TALK:
+        return "small_talk"
+    if intent in BOOKING_FLOW:
+        return "booking"
+    if intent in LINK_INTENTS:
+        return "redirect"
+    return "rag"
+
+
+def _ms(t0: float) -> float:
+    return (time.perf_counter() - t0) * 1000
+
+
+def _booking_turn(session: Dict[str, Any], result: TurnResult, booking_output) -> TurnResult:
+    state, reply, done = booking_output
+    session["booking_state"] = state
+    session["in_booking"] = not done
+    result.reply = reply
+    result.booking_done = done
+    return result
+
+
+def process_message(
+    session: Dict[str, Any],
+    user: str,
+    classifier,
+    qdrant_client=None
+) -> TurnResult:
+    """
+    Bir kullanıcı mesajını işler. session yerinde güncellenir
+    (bkz. new_session).
+    """
+    t_total = time.perf_counter()
+
+    # 1) Devam eden rezervasyon akışı
+    if session.get("in_booking"):
+        t0 = time.perf_counter()
+        result = _booking_turn(session, TurnResult("", "booking"),
+                               handle_booking(session["booking_state"], user))
+        result.timings["booking"] = _ms(t0)
+        result.timings["total"] = _ms(t_total)
+        return result
+
+    # 2) Intent sınıflandırması (+ spekülatif arama)
+    result, rag_inputs, pending = _classify_turn(user, classifier, qdrant_client)
+    route, intent = result.route, result.intent
+
+    # 3) Yanıt üretimi
+    t0 = time.perf_counter()
+    if route == "small_talk":
+        result.reply = respond_small_talk(user)
+    elif route == "booking":
+        session["in_booking"] = True
+        _booking_turn(session, result, handle_booking(session["booking_state"], user))
+    elif route == "redirect":
+        result.reply = redirect(intent)
+    else:  # RAG
+        if pending is not None:
+            try:
+                rag_inputs["points"] = pending.result()
+            except Exception as e:
+                logger.warning(f"Spekülatif arama başarısız, yeniden denenecek: {e}")
+        result.reply = answer_hotel_qdrant(user, qdrant_client, **rag_inputs)
+    result.timings[route] = _ms(t0)
+    result.timings["total"] = _ms(t_total)
+    return result
+
+
+def stream_message(
+    session: Dict[str, Any],
+    user: str,
+    classifier,
+    qdrant_client=None
+) -> Generator[str, None, TurnResult]:
+    """
+    process_message'ın akış sürümü: yanıt parçalarını yield eder, dönüş değeri
+    TurnResult'tır. Rezervasyon akışında nihai yanıt (özet / bağlantı) akan
+    metinden farklı olabilir; istemci sonunda result.reply'ı göstermelidir.
+    """
+    t_total = time.perf_counter()
+
+    if session.get("in_booking"):
+        t0 = time.perf_counter()
+        output = yield from handle_booking_stream(session["booking_state"], user)
+        result = _booking_turn(session, TurnResult("", "booking"), output)
+        result.timings["booking"] = _ms(t0)
+        result.timings["total"] = _ms(t_total)
+        return result
+
+    result, rag_inputs, pending = _classify_turn(user, classifier, qdrant_client)
+    route, intent = result.route, result.intent
+
+    t0 = time.perf_counter()
+    if route == "small_talk":
+        result.reply = yield from stream_small_talk(user)
+    elif route == "booking":
+        session["in_booking"] = True
+        output = yield from handle_booking_stream(session["booking_state"], user)
+        _booking_turn(session, result, output)
+    elif route == "redirect":
+        result.reply = redirect(intent)
+        yield result.reply
+    else:  # RAG
+        if pending is not None:
+            try:
+                rag_inputs["points"] = pending.result()
+            except Exception as e:
+                logger.warning(f"Spekülatif arama başarısız, yeniden denenecek: {e}")
+        result.reply = yield from stream_answer_hotel_qdrant(user, qdrant_client, **rag_inputs)
+    result.timings[route] = _ms(t0)
+    result.timings["total"] = _ms(t_total)
+    return result
+
+
+def _discard(pending) -> None:
+    """
+    Spekülatif aramayı iptal eder. Thread'de başlamış bir arama iptal
+    edilemez; sonucunu kimse beklemeyeceği için hatası burada tüketilir.
+    """
+    pending.cancel()
+    pending.add_done_callback(_consume_exception)
+
+
+def _consume_exception(pending) -> None:
+    if pending.cancelled():
+        return
+    error = pending.exception()
+    if error is not None:
+        logger.debug(f"Atılan spekülatif arama başarısız olmuştu: {error}")
+
+
+def _classify_turn(user: str, classifier, qdrant_client):
+    """
+    Intent sınıflandırması (+ spekülatif arama).
+    Returns: (TurnResult, answer_hotel_qdrant girdileri, bekleyen arama veya None)
+    """
+    t0 = time.perf_counter()
+    rag_inputs = {}
+    prediction = None
+    if SPECULATIVE_RETRIEVAL:
+        prediction = classifier.fast_path(user)
+        if prediction is None:
+            prediction, rag_inputs = _classify_speculative(user, classifier, qdrant_client)
+    if prediction is None:
+        intent, confidence = classifier.classify(user)
+    else:
+        intent, confidence = prediction.intent, prediction.confidence
+    route = route_for(intent)
+    result = TurnResult("", route, intent, confidence)
+    result.timings["classify"] = _ms(t0)
+    pending = rag_inputs.pop("future", None)
+    if route != "rag" and pending is not None:
+        _discard(pending)  # Intent RAG değil: arama sonucu atılır
+        pending = None
+    return result, rag_inputs, pending
+
+
+def _classify_speculative(user: str, classifier, qdrant_client):
+    """
+    Mesajı bir kez embed eder; arama ile sınıflandırmayı paralel yürütür.
+    Returns: (tahmin veya None, answer_hotel_qdrant'a geçilecek girdiler)
+    """
+    try:
+        q_emb = embed_single(user)
+    except Exception as e:
+        logger.warning(f"Embedding başarısız, normal akışa dönülüyor: {e}")
+        return None, {}
+
+    rag_inputs = {"q_emb": q_emb}
+    # Semantik cache'te yanıt varsa arama boşuna olur
+    if cached_answer(q_emb) is None:
+        # Bağlam kopyalanır: benchmark'taki aşama kaydı arama thread'inde de tutulur
+        rag_inputs["future"] = _get_executor().submit(
+            contextvars.copy_context().run, retrieve, q_emb, qdrant_client
+        )
+    try:
+        prediction = classifier.predict_embedding(q_emb)
+    except Exception as e:
+        logger.error(f"Intent classification hatası: {e}")
+        prediction = UNKNOWN
+    return prediction, rag_inputs
+
+
+async def aprocess_message(
+    session: Dict[str, Any],
+    user: str,
+    classifier,
+    qdrant_client=None
+) -> TurnResult:
+    """
+    process_message'ın async sürümü. qdrant_client verilirse
+    AsyncQdrantClient olmalıdır.
+    """
+    t_total = time.perf_counter()
+
+    if session.get("in_booking"):
+        t0 = time.perf_counter()
+        result = _booking_turn(session, TurnResult("", "booking"),
+                               await ahandle_booking(session["booking_state"], user))
+        result.timings["booking"] = _ms(t0)
+        result.timings["total"] = _ms(t_total)
+        return result
+
+    t0 = time.perf_counter()
+    rag_inputs = {}
+    prediction = None
+    if SPECULATIVE_RETRIEVAL:
+        prediction = classifier.fast_path(user)
+        if prediction is None:
+            prediction, rag_inputs = await _aclassify_speculative(user, classifier, qdrant_client)
+    if prediction is None:
+        intent, confidence = await classifier.aclassify(user)
+    else:
+        intent, confidence = prediction.intent, prediction.confidence
+    route = route_for(intent)
+    result = TurnResult("", route, intent, confidence)
+    result.timings["classify"] = _ms(t0)
+    pending = rag_inputs.pop("task", None)
+    if route != "rag" and pending is not None:
+        _discard(pending)  # Intent RAG değil: arama sonucu atılır
+        pending = None
+
+    t0 = time.perf_counter()
+    if route == "small_talk":
+        result.reply = await arespond_small_talk(user)
+    elif route == "booking":
+        session["in_booking"] = True
+        _booking_turn(session, result, await ahandle_booking(session["booking_state"], user))
+    elif route == "redirect":
+        result.reply = redirect(intent)
+    else:  # RAG
+        if pending is not None:
+            try:
+                rag_inputs["points"] = await pending
+            except Exception as e:
+                logger.warning(f"Spekülatif arama başarısız, yeniden denenecek: {e}")
+        result.reply = await aanswer_hotel_qdrant(user, qdrant_client, **rag_inputs)
+    result.timings[route] = _ms(t0)
+    result.timings["total"] = _ms(t_total)
+    return result
+
+
+async def _aclassify_speculative(user: str, classifier, qdrant_client):
+    """_classify_speculative'in async sürümü; arama ayrı bir task olarak yürür"""
+    try:
+        q_emb = await aembed_single(user)
+    except Exception as e:
+        logger.warning(f"Embedding başarısız, normal akışa dönülüyor: {e}")
+        return None, {}
+
+    rag_inputs = {"q_emb": q_emb}
+    if cached_answer(q_emb) is None:
+        rag_inputs["task"] = asyncio.create_task(aretrieve(q_emb, qdrant_client))
+    try:
+        prediction = await classifier.apredict_embedding(q_emb)
+    except Exception as e:
+        logger.error(f"Intent classification hatası: {e}")
+        prediction = UNKNOWN
+    return prediction, rag_inputs
@@ -3,6 +3,7 @@ Qdrant Cloud Konfigürasyonu - Basit Sürüm
 =========================================
 """
 import os
+import uuid
 import logging
 from dotenv import load_dotenv
 
@@ -44,6 +45,14 @@ def get_collection_name(collection_type: str) -> str:
     }
     return collections.get(collection_type, f"{collection_type}_collection")
 
+# Nokta kimlikleri için sabit ad alanı: aynı kaynak kimliği her süreçte ve
+# her çalıştırmada aynı UUID'ye dönüşür, upsert'ler üzerine yazar
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "cullinanhotels.com")
+
+def point_id(original_id: str) -> str:
+    """Kaynak döküman kimliğinden deterministik Qdrant nokta kimliği (UUIDv5)"""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, str(original_id)))
+
 # Basit config sınıfı
 class QdrantConfig:
     def __init__(self):
@@ -58,5 +67,10 @@ class QdrantConfig:
         }
         return sizes.get(self.embed_model, 1536)
 
+    def get_vector_params(self):
+        """Koleksiyon oluşturmak için vektör ayarları (cosine benzerliği)"""
+        from qdrant_client.http.models import VectorParams, Distance
+        return VectorParams(size=self.get_vector_size(), distance=Distance.COSINE)
+
 # Global config instance
 qdrant_config = QdrantConfig()
@@ -3,17 +3,32 @@ Qdrant Tabanlı Chat Router
 ========================
 Bu modül Qdrant Cloud vektör veritabanını kullanarak chat sistemini yönetir.
 """
+import os
+import sys
+
+if "--offline" in sys.argv:
+    # Zincirler yüklenirken OpenAI() kurulur; çevrimdışı modda anahtar gerekmez
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+
 from chains.intent_classifier_qdrant import IntentClassifier
-from chains.rag_hotel_qdrant import answer_hotel_qdrant
-from chains.booking_dialog import handle_booking
-from chains.small_talk import respond_small_talk
-from chains.link_redirect import redirect
-from config import load_api_key
-from qdrant_config import get_qdrant_client, get_collection_name
+from pipeline import (  # noqa: F401  (niyet kümeleri geriye dönük uyumluluk için)
+    SMALL_TALK, BOOKING_FLOW, LINK_INTENTS, new_session, process_message
+)
+from chains.prompt_cache_stats import prompt_cache_stats
+from chains.booking_dialog import extraction_stats
+from session_store import get_session_store
+from qdrant_config import get_collection_name  # noqa: F401
+import qdrant_config
 from logging_config import ChatbotLogger
+from latency_stats import summarize, summarize_timings, format_table
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict
+from pathlib import Path
+import argparse
+import threading
+import json
 import time
 import logging
-import sys
 
 import openai, readline  # noqa: F401
 
@@ -27,7 +42,7 @@ qdrant_client = None
 classifier = None
 chatbot_logger = None
 
-def initialize_system():
+def initialize_system(offline=False, offline_path=None):
     """Sistemi bir kez başlat"""
     global qdrant_client, classifier, chatbot_logger
     
@@ -37,12 +52,19 @@ def initialize_system():
     print("🚀 Qdrant Chat Router başlatılıyor...")
     
     try:
-        # API key
-        openai.api_key = load_api_key()
-        print("✅ OpenAI API key yüklendi")
+        if offline:
+            # Sahte OpenAI + fixture'dan doldurulmuş yerel Qdrant
+            from offline_backends import install
+            install(path=offline_path)
+            print("✅ Çevrimdışı arka uçlar kuruldu")
+        else:
+            # API key
+            from config import load_api_key
+            openai.api_key = load_api_key()
+            print("✅ OpenAI API key yüklendi")
         
         # Qdrant client
-        qdrant_client = get_qdrant_client()
+        qdrant_client = qdrant_config.get_qdrant_client()
         print("✅ Qdrant bağlantısı kuruldu")
         
         # Intent classifier
@@ -59,19 +81,132 @@ def initialize_system():
         print(f"❌ Sistem başlatma hatası: {e}")
         sys.exit(1)
 
-# Niyet kümeleri
-SMALL_TALK   = {"selamla", "veda", "teşekkür", "yardım"}
-BOOKING_FLOW = {"fiyat_sorgulama", "rezervasyon_oluşturma"}
-LINK_INTENTS = {"rezervasyon_değiştirme", "rezervasyon_iptali", "rezervasyon_durumu"}
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cullinan Hotel terminal asistanı")
+    parser.add_argument("--session", default="terminal",
+                        help="Oturum kimliği; aynı kimlikle konuşma kaldığı yerden sürer")
+    parser.add_argument("--replay", metavar="FILE.jsonl",
+                        help="Etkileşimsiz mod: JSONL dosyasındaki konuşmaları işle")
+    parser.add_argument("--output", metavar="FILE.jsonl",
+                        help="Replay çıktısı (varsayılan: <girdi>.results.jsonl)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Replay'de eşzamanlı işlenen konuşma sayısı")
+    parser.add_argument("--offline", action="store_true",
+                        help="OpenAI/Qdrant yerine yerel yedekleri kullan (offline_backends)")
+    parser.add_argument("--offline-qdrant-path", metavar="DIR",
+                        help="Çevrimdışı modda yerel Qdrant'ı bu dizinde diskte tut")
+    return parser.parse_args(argv)
+
+# ---------------------------------------------------------------------
+# Replay modu
+# ---------------------------------------------------------------------
+# Mesaj metni için sırayla denenen alanlar
+_TEXT_KEYS = ("message", "text", "user", "question", "content", "body")
+# Konuşma kimliği için sırayla denenen alanlar
+_ID_KEYS = ("conversation_id", "session_id", "request_id", "id")
+
+def load_conversations(path):
+    """
+    JSONL dosyasını {konuşma_id: [mesajlar]} sözlüğüne çevirir.
+    Satır biçimleri:
+      {"conversation_id": "c1", "message": "..."}   → aynı id'li satırlar sırayla
+      {"conversation_id": "c1", "messages": ["...", "..."]}
+      {"request_id": "...", "body": "..."}           → her satır tek turluk konuşma
+    Rolü "user" dışında olan mesajlar (asistan yanıtları, sistem) atlanır;
+    rol verilmemişse mesaj kullanıcınındır.
+    """
+    conversations = {}
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            conv_id = next((str(row[k]) for k in _ID_KEYS if row.get(k) is not None),
+                           f"line-{lineno}")
+            if isinstance(row.get("messages"), list):
+                texts = [
+                    m.get("content") if isinstance(m, dict) else m
+                    for m in row["messages"]
+                    if not isinstance(m, dict) or m.get("role", "user") == "user"
+                ]
+            elif row.get("role", "user") == "user":
+                texts = [next((row[k] for k in _TEXT_KEYS if isinstance(row.get(k), str)), None)]
+            else:
+                texts = []
+            conversations.setdefault(conv_id, []).extend(t for t in texts if t)
+    return conversations
+
+def replay_conversation(conv_id, messages, classifier, qdrant_client, write):
+    """Bir konuşmanın mesajlarını sırayla işler; her tur için write(kayıt) çağrılır"""
+    session = new_session()
+    records = []
+    for turn, message in enumerate(messages):
+        record = {"conversation_id": conv_id, "turn": turn, "message": message}
+        try:
+            result = process_message(session, message, classifier, qdrant_client)
+            record.update(asdict(result))
+        except Exception as e:
+            record["error"] = str(e)
+        write(record)
+        records.append(record)
+    return records
+
+def run_replay(args, classifier, qdrant_client):
+    conversations = load_conversations(args.replay)
+    output = Path(args.output or Path(args.replay).with_suffix(".results.jsonl"))
+    total_turns = sum(len(m) for m in conversations.values())
+    print(f"🔁 {len(conversations)} konuşma / {total_turns} mesaj, {args.workers} worker")
+
+    lock = threading.Lock()
+    records = []
+    with open(output, "w", encoding="utf-8") as out:
+        def write(record):
+            with lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = [
+                pool.submit(replay_conversation, conv_id, messages, classifier, qdrant_client, write)
+                for conv_id, messages in conversations.items()
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                records.extend(future.result())
+                if done % 10 == 0 or done == len(futures):
+                    print(f"   {done}/{len(futures)} konuşma tamamlandı", end="\r")
+        wall = time.perf_counter() - t0
+
+    ok = [r for r in records if "error" not in r]
+    totals = summarize(r["timings"]["total"] for r in ok)
+    print()
+    print(f"✅ Çıktı: {output}")
+    print(f"   Mesaj: {len(records)}, hata: {len(records) - len(ok)}, süre: {wall:.2f} sn, "
+          f"verim: {len(records) / wall if wall else 0:.2f} mesaj/sn")
+    print(f"   Toplam gecikme (ms): p50={totals['p50']:.1f} p95={totals['p95']:.1f} "
+          f"p99={totals['p99']:.1f}")
+    print(format_table(summarize_timings(ok, group_by="route")))
+    return records
 
 def main():
     """Ana chat döngüsü"""
+    args = parse_args()
+
     # Sistem başlat
-    qdrant_client, classifier, chatbot_logger = initialize_system()
+    qdrant_client, classifier, chatbot_logger = initialize_system(
+        args.offline, args.offline_qdrant_path
+    )
+
+    if args.replay:
+        run_replay(args, classifier, qdrant_client)
+        return
     
-    # Oturum değişkenleri
-    booking_state = {}
-    in_booking = False
+    # Oturum değişkenleri (depoda varsa geri yüklenir)
+    store = get_session_store()
+    session = store.load(args.session) or new_session()
+    if session.get("in_booking"):
+        print("📅 Yarım kalan rezervasyonunuza devam ediyoruz.")
     
     print("\n👋 Cullinan Hotel Asistanına hoş geldiniz!")
     print("💡 Qdrant Cloud ile güçlendirilmiş AI asistan")
@@ -88,39 +223,22 @@ def main():
             # Çıkış komutları
             if user.lower() in ['quit', 'exit', 'çıkış', 'bye']:
                 print("👋 Görüşmek üzere!")
+                logger.info(f"Intent kısayolu istatistikleri: {classifier.fast_path_stats()}")
+                logger.info(f"Prompt cache istatistikleri: {prompt_cache_stats()}")
+                logger.info(f"Rezervasyon çıkarım istatistikleri: {extraction_stats()}")
                 break
             
             try:
-                # 1) Devam eden rezervasyon akışı
-                if in_booking:
-                    booking_state, reply, done = handle_booking(booking_state, user)
-                    if done:
-                        in_booking = False
-                        print("✅ Rezervasyon işlemi tamamlandı!")
-                    print(f"🤖> {reply}")
-                    continue
-
-                # 2) Intent sınıflandırması
-                intent, confidence = classifier.classify(user)
-                print(f"🎯 Intent: {intent} (%.2f)" % confidence)
+                continuing_booking = session["in_booking"]
+                result = process_message(session, user, classifier, qdrant_client)
                 
-                # 3) Yanıt üretimi
-                if intent in SMALL_TALK:
-                    reply = respond_small_talk(user)
-                    
-                elif intent in BOOKING_FLOW:
-                    in_booking = True
-                    booking_state, reply, done = handle_booking(booking_state, user)
-                    if done:
-                        in_booking = False
-                        
-                elif intent in LINK_INTENTS:
-                    reply = redirect(intent)
-                    
-                else:  # RAG
-                    reply = answer_hotel_qdrant(user, qdrant_client)
-
-                print(f"🤖> {reply}")
+                if result.intent is not None:
+                    print(f"🎯 Intent: {result.intent} (%.2f)" % result.confidence)
+                if continuing_booking and result.booking_done:
+                    print("✅ Rezervasyon işlemi tamamlandı!")
+
+                print(f"🤖> {result.reply}")
+                store.save(args.session, session)
 
             except Exception as e:
                 print(f"❌ Hata: {str(e)}")
@@ -0,0 +1,226 @@
+"""
+Oturum Deposu
+=============
+Konuşma durumu (mesajlar, booking_state, in_booking ...) tek bir sürecin
+belleği yerine takılabilir bir depoda tutulur; böylece yeniden başlatmada
+yarım kalan rezervasyonlar kaybolmaz ve birden çok worker aynı oturumu
+sürdürebilir.
+
+- InMemorySessionStore : Tek süreç, test ve geliştirme için
+- SQLiteSessionStore   : Dosya tabanlı, aynı makinedeki worker'lar paylaşır
+- RedisSessionStore    : get/set/delete destekleyen Redis uyumlu her istemci
+
+SESSION_STORE=memory|sqlite|redis ile seçilir (bkz. get_session_store).
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+from pathlib import Path
+import threading
+import logging
+import sqlite3
+import struct
+import json
+import time
+import os
+
+from chains.booking_dialog import BookingState
+
+logger = logging.getLogger("hotel_chatbot.session_store")
+
+DEFAULT_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))
+# Göreli SQLite yolları proje köküne göre çözülür; worker'lar hangi dizinden
+# başlatılırsa başlatılsın aynı dosyayı paylaşır
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_SQLITE_PATH = "cache/sessions.sqlite3"
+_LENGTH = struct.Struct("<I")
+
+
+# ----------------------------------------------------------------------
+# Serileştirme
+# ----------------------------------------------------------------------
+def encode_session(session: Dict[str, Any]) -> bytes:
+    """Oturum → bytes: JSON uzunluğu + JSON (booking_state hariç) + BookingState"""
+    booking = BookingState.coerce(session.get("booking_state"))
+    rest = {k: v for k, v in session.items() if k != "booking_state"}
+    head = json.dumps(rest, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    return _LENGTH.pack(len(head)) + head + booking.to_bytes()
+
+
+def decode_session(data: bytes) -> Dict[str, Any]:
+    """encode_session'ın tersi"""
+    (length,) = _LENGTH.unpack_from(data, 0)
+    start = _LENGTH.size
+    session = json.loads(data[start:start + length].decode("utf-8"))
+    session["booking_state"] = BookingState.from_bytes(data[start + length:])
+    return session
+
+
+# ----------------------------------------------------------------------
+# Depolar
+# ----------------------------------------------------------------------
+class SessionStore(ABC):
+    """Oturum deposu arayüzü"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Oturumu döndürür; yoksa veya süresi dolduysa None"""
+
+    @abstractmethod
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        """Oturumu yazar ve süresini yeniler"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Oturumu siler (yoksa bir şey yapmaz)"""
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Süreç içi depo. Oturumlar serileştirilmiş tutulur; böylece çağıranın
+    nesneleri depodaki kopyayı değiştiremez ve bellek kullanımı küçük kalır.
+    Süresi dolan oturumlar, kayıt sırasında en fazla purge_interval saniyede
+    bir temizlenir; hiç yeniden açılmayan oturumlar birikmez.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, purge_interval: float = 60.0):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._data: Dict[str, tuple] = {}
+        self._last_purge = time.time()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            blob, updated = entry
+            if time.time() - updated > self.ttl:
+                del self._data[session_id]
+                return None
+        return decode_session(blob)
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        blob = encode_session(session)
+        with self._lock:
+            now = time.time()
+            self._data[session_id] = (blob, now)
+            if now - self._last_purge >= self.purge_interval:
+                self._purge(now)
+
+    def _purge(self, now: float) -> None:
+        """Süresi dolan oturumları siler (kilit altında çağrılır)"""
+        expired = [sid for sid, (_, updated) in self._data.items() if now - updated > self.ttl]
+        for sid in expired:
+            del self._data[sid]
+        self._last_purge = now
+        if expired:
+            logger.debug(f"{len(expired)} süresi dolmuş oturum silindi")
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite dosyasında tutulan oturumlar (göreli yol proje köküne göre)"""
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, ttl: float = DEFAULT_TTL):
+        if path != ":memory:":
+            path = str(PROJECT_ROOT / path)
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Çok süreçli okuma/yazma
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                   id      TEXT PRIMARY KEY,
+                   data    BLOB NOT NULL,
+                   updated REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - ttl,))
+        self._conn.commit()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND updated >= ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+        return decode_session(row[0]) if row else None
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        blob = encode_session(session)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (id, data, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated = excluded.updated",
+                (session_id, blob, time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Redis uyumlu istemci üzerinden oturumlar (redis-py, fakeredis veya
+    get/set(ex=)/delete sunan herhangi bir nesne). TTL Redis'e bırakılır.
+    """
+
+    def __init__(self, client, prefix: str = "hotel:session:", ttl: float = DEFAULT_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        blob = self.client.get(self._key(session_id))
+        return decode_session(blob) if blob else None
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        self.client.set(self._key(session_id), encode_session(session), ex=int(self.ttl))
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self._key(session_id))
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Ortam değişkenlerine göre paylaşılan oturum deposunu döndürür"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                kind = os.getenv("SESSION_STORE", "sqlite")
+                if kind == "redis":
+                    import redis  # pip install redis
+                    _store = RedisSessionStore(redis.Redis.from_url(
+                        os.getenv("REDIS_URL", "redis://localhost:6379/0")
+                    ))
+                elif kind == "memory":
+                    _store = InMemorySessionStore()
+                else:
+                    _store = SQLiteSessionStore(
+                        os.getenv("SESSION_STORE_PATH", DEFAULT_SQLITE_PATH)
+                    )
+                logger.info(f"Oturum deposu: {type(_store).__name__}")
+    return _store
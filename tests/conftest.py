@@ -0,0 +1,12 @@
+"""
+Testler proje kökündeki modülleri (chains, session_store ...) doğrudan içe
+aktarır; zincirler modül yüklenirken OpenAI() kurduğu için ağa çıkmayan
+sahte bir anahtar verilir.
+"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,43 @@
+import numpy as np
+
+from chains.answer_cache import SemanticAnswerCache
+
+
+def _cache(tmp_path):
+    return SemanticAnswerCache(version_path=str(tmp_path / "knowledge_version"))
+
+
+def test_lookup_counts_hits_and_misses(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.lookup([1.0, 0.0]) is None
+    cache.store("check-in saat kaçta?", [1.0, 0.0], "14:00")
+    assert cache.lookup([1.0, 0.01]) == "14:00"
+    assert cache.lookup([0.0, 1.0]) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_uncounted_lookup_leaves_stats(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.lookup(np.array([1.0, 0.0]), count=False) is None
+    cache.store("havuz var mı?", [1.0, 0.0], "Evet")
+    assert cache.lookup([1.0, 0.0], count=False) == "Evet"
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
+
+
+def test_knowledge_version_path_is_anchored_to_project_root():
+    from pathlib import Path
+    from chains import answer_cache
+
+    assert Path(answer_cache.KNOWLEDGE_VERSION_PATH).is_absolute()
+    assert Path(answer_cache.KNOWLEDGE_VERSION_PATH).parent.parent == \
+        Path(answer_cache.__file__).resolve().parent.parent
+
+
+def test_version_bump_clears_cache(tmp_path):
+    from chains.answer_cache import bump_knowledge_version
+
+    version_path = str(tmp_path / "knowledge_version")
+    cache = SemanticAnswerCache(version_path=version_path, version_check_interval=0)
+    cache.store("havuz var mı?", [1.0, 0.0], "Evet")
+    bump_knowledge_version(version_path)
+    assert cache.lookup([1.0, 0.0]) is None
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import threading
+import time
+
+import api_server
+from pipeline import TurnResult
+
+
+class MemoryStore:
+    def __init__(self, fail_save=False):
+        self.sessions = {}
+        self.fail_save = fail_save
+
+    def load(self, session_id):
+        return self.sessions.get(session_id)
+
+    def save(self, session_id, session):
+        if self.fail_save:
+            raise ConnectionError("redis down")
+        self.sessions[session_id] = session
+
+
+def _post_stream(app, body):
+    """/chat/stream isteğini çalıştırır; gönderilen ASGI mesajlarını döndürür"""
+    sent = []
+    payload = json.dumps(body).encode("utf-8")
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/chat/stream"}
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def _events(sent):
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return [block.split("\n")[0][len("event: "):]
+            for block in body.decode("utf-8").split("\n\n") if block]
+
+
+def _starts(sent):
+    return [m for m in sent if m["type"] == "http.response.start"]
+
+
+def test_stream_done(monkeypatch):
+    def fake_stream(session, message, classifier):
+        yield "Merhaba"
+        return TurnResult("Merhaba", "small_talk")
+
+    monkeypatch.setattr(api_server, "stream_message", fake_stream)
+    store = MemoryStore()
+    sent = _post_stream(api_server.ChatAPI(classifier=object(), store=store),
+                        {"session_id": "s1", "message": "Merhaba"})
+    assert len(_starts(sent)) == 1
+    assert _events(sent) == ["meta", "delta", "done"]
+    assert "s1" in store.sessions
+
+
+def test_save_failure_is_reported_as_event(monkeypatch):
+    def fake_stream(session, message, classifier):
+        yield "Merhaba"
+        return TurnResult("Merhaba", "small_talk")
+
+    monkeypatch.setattr(api_server, "stream_message", fake_stream)
+    sent = _post_stream(api_server.ChatAPI(classifier=object(), store=MemoryStore(fail_save=True)),
+                        {"session_id": "s1", "message": "Merhaba"})
+    assert len(_starts(sent)) == 1
+    assert _events(sent) == ["meta", "delta", "error"]
+    assert sent[-1]["more_body"] is False
+
+
+def test_timeout_closes_generator_after_running_step(monkeypatch):
+    closed = threading.Event()
+
+    def slow_stream(session, message, classifier):
+        try:
+            time.sleep(0.3)
+            yield "geç"
+            return TurnResult("geç", "rag")
+        finally:
+            closed.set()
+
+    monkeypatch.setattr(api_server, "stream_message", slow_stream)
+    monkeypatch.setattr(api_server, "REQUEST_TIMEOUT", 0.05)
+    store = MemoryStore()
+
+    async def run():
+        app = api_server.ChatAPI(classifier=object(), store=store)
+        sent = []
+        payload = json.dumps({"session_id": "s1", "message": "Havuz var mı?"}).encode("utf-8")
+
+        async def receive():
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await app({"type": "http", "method": "POST", "path": "/chat/stream"}, receive, send)
+        assert not closed.is_set()  # Adım hâlâ thread'de sürüyor
+        await asyncio.sleep(0.5)
+        return sent
+
+    sent = asyncio.run(run())
+    assert _events(sent) == ["meta", "error"]
+    assert closed.is_set()
+    assert store.sessions == {}
+
+
+def _request(app, method, path, body=b""):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({"type": "http", "method": method, "path": path}, receive, send))
+    return sent
+
+
+def test_wrong_method_on_known_path_is_405():
+    sent = _request(api_server.ChatAPI(classifier=object(), store=MemoryStore()), "GET", "/chat")
+    start = _starts(sent)[0]
+    assert start["status"] == 405
+    assert (b"allow", b"POST") in start["headers"]
+    assert _starts(_request(api_server.ChatAPI(), "GET", "/yok"))[0]["status"] == 404
+
+
+def test_lazy_setup_runs_off_the_event_loop(monkeypatch):
+    setup_threads = []
+
+    class SlowClassifier:
+        def __init__(self):
+            setup_threads.append(threading.current_thread())
+            time.sleep(0.05)
+
+    import chains.intent_classifier_qdrant
+    monkeypatch.setattr(chains.intent_classifier_qdrant, "IntentClassifier", SlowClassifier)
+
+    async def fake_process(session, message, classifier, qdrant_client):
+        return TurnResult("Merhaba", "small_talk")
+
+    monkeypatch.setattr(api_server, "aprocess_message", fake_process)
+    app = api_server.ChatAPI(store=MemoryStore())
+    body = json.dumps({"session_id": "s1", "message": "Merhaba"}).encode("utf-8")
+
+    async def run():
+        async def one():
+            sent = []
+
+            async def receive():
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            async def send(message):
+                sent.append(message)
+
+            await app({"type": "http", "method": "POST", "path": "/chat"}, receive, send)
+            return sent
+        return await asyncio.gather(one(), one())
+
+    results = asyncio.run(run())
+    assert [_starts(sent)[0]["status"] for sent in results] == [200, 200]
+    assert len(setup_threads) == 1                       # eşzamanlı istekler tek kurulum bekler
+    assert setup_threads[0] is not threading.main_thread()
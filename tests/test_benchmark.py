@@ -0,0 +1,40 @@
+import benchmark
+import offline_backends
+from chains import answer_cache as answer_cache_module
+from chains.answer_cache import SemanticAnswerCache
+
+
+def test_reset_keeps_persistent_answer_cache(tmp_path, monkeypatch):
+    shared = SemanticAnswerCache(path=str(tmp_path / "answers.sqlite3"),
+                                 version_path=str(tmp_path / "knowledge_version"))
+    shared.store("check-in saat kaçta?", [1.0, 0.0], "14:00")
+    monkeypatch.setattr(answer_cache_module, "_cache", shared)
+    benchmark._reset_caches()
+    assert shared.lookup([1.0, 0.0]) == "14:00"
+
+
+def test_reset_clears_in_memory_answer_cache(tmp_path, monkeypatch):
+    local = SemanticAnswerCache(version_path=str(tmp_path / "knowledge_version"))
+    local.store("check-in saat kaçta?", [1.0, 0.0], "14:00")
+    monkeypatch.setattr(answer_cache_module, "_cache", local)
+    benchmark._reset_caches()
+    assert local.lookup([1.0, 0.0]) is None
+
+
+def test_setup_disables_answer_cache_persistence(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_PATH", str(tmp_path / "answers.sqlite3"))
+    monkeypatch.setattr(answer_cache_module, "_cache", None)
+    installed = []
+
+    def install(**kwargs):
+        installed.append(real_install(**kwargs))
+        return installed[-1]
+
+    real_install = offline_backends.install
+    monkeypatch.setattr(offline_backends, "install", install)
+    try:
+        benchmark.setup(offline=True)
+        assert answer_cache_module.get_answer_cache().path is None
+    finally:
+        for backends in installed:
+            backends.uninstall()
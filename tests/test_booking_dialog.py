@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+import pytest
+
+from chains import booking_dialog
+from chains.booking_dialog import BookingState, handle_booking, merge
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """llm_step yerine geçer; çağrıldığı mesajları kaydeder"""
+    calls = []
+
+    def fake_llm_step(state):
+        calls.append(state.messages()[-1]["content"])
+        return "Kahvaltı oda fiyatına dahildir.", {}
+
+    monkeypatch.setattr(booking_dialog, "llm_step", fake_llm_step)
+    return calls
+
+
+def _complete_state():
+    state = BookingState()
+    checkin = date.today() + timedelta(days=30)
+    merge(state, {
+        "giris_tarihi": checkin.isoformat(),
+        "cikis_tarihi": (checkin + timedelta(days=3)).isoformat(),
+        "yetiskin_sayisi": "2", "cocuk_sayisi": "0", "oda_sayisi": "1",
+    })
+    return state
+
+
+@pytest.mark.parametrize("text", ["Evet", "Evet, onaylıyorum", "tamam", "Onay lütfen."])
+def test_bare_confirmation_finishes_without_llm(llm_calls, text):
+    state, reply, done = handle_booking(_complete_state(), text)
+    assert done
+    assert booking_dialog.DOMAIN in reply
+    assert llm_calls == []
+
+
+@pytest.mark.parametrize("text", [
+    "peki ya kahvaltı dahil mi?",
+    "kahvaltı dahil olur mu?",
+    "evet ama bir oda daha ekleyelim",
+    "tamam, otopark var mı",
+])
+def test_questions_and_changes_go_to_llm(llm_calls, text):
+    state, reply, done = handle_booking(_complete_state(), text)
+    assert llm_calls == [text]
+    assert state["oda_sayisi"] == 1
+
+
+def test_filled_slots_show_summary_without_llm(llm_calls):
+    state = BookingState()
+    checkin = date.today() + timedelta(days=30)
+    merge(state, {"giris_tarihi": checkin.isoformat(),
+                  "cikis_tarihi": (checkin + timedelta(days=3)).isoformat()})
+    state, reply, done = handle_booking(state, "2 yetişkin, çocuk yok, 1 oda")
+    assert not done
+    assert "Onaylıyor musunuz?" in reply
+    assert llm_calls == []
@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import pytest
+
+from chains.booking_dialog import BookingState, merge
+
+
+def _future(days):
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+def test_history_is_read_only():
+    state = BookingState()
+    state.add_message("user", "merhaba")
+    with pytest.raises(AttributeError):
+        state["history"].append({"role": "user", "content": "kaybolmamalı"})
+    assert len(state.history) == 1
+
+
+def test_coerce_drops_invalid_legacy_values():
+    legacy = {
+        "giris_tarihi": "12 Ağustos",
+        "cikis_tarihi": _future(10),
+        "yetiskin_sayisi": "2",
+        "oda_sayisi": 99,
+        "history": [{"role": "user", "content": "rezervasyon"}],
+    }
+    state = BookingState.coerce(legacy)
+    assert "giris_tarihi" not in state
+    assert "oda_sayisi" not in state
+    assert state["yetiskin_sayisi"] == 2
+    assert state["cikis_tarihi"] == _future(10)
+    # Doğrulanmış durum her zaman kaydedilebilir
+    restored = BookingState.from_bytes(state.to_bytes())
+    assert restored.to_dict(with_history=True) == state.to_dict(with_history=True)
+
+
+def test_bytes_round_trip():
+    state = BookingState()
+    state.update({"giris_tarihi": _future(3), "cikis_tarihi": _future(5),
+                  "yetiskin_sayisi": 2, "cocuk_sayisi": 1, "cocuk_yaslari": [5]})
+    state.add_message("user", "2 yetişkin 1 çocuk")
+    state.add_message("assistant", "Tamam")
+    restored = BookingState.from_bytes(state.to_bytes())
+    assert restored.to_dict(with_history=True) == state.to_dict(with_history=True)
+
+
+def _booked(checkin, checkout):
+    state = BookingState()
+    assert merge(state, {"giris_tarihi": _future(checkin), "cikis_tarihi": _future(checkout)}) == []
+    return state
+
+
+def test_merge_rejects_inconsistent_pair():
+    state = _booked(3, 5)
+    assert merge(state, {"giris_tarihi": _future(9), "cikis_tarihi": _future(8)}) == \
+        ["giris_tarihi", "cikis_tarihi"]
+    assert (state["giris_tarihi"], state["cikis_tarihi"]) == (_future(3), _future(5))
+
+
+def test_moving_checkin_past_old_checkout_clears_checkout():
+    state = _booked(3, 5)
+    assert merge(state, {"giris_tarihi": _future(7)}) == []
+    assert state["giris_tarihi"] == _future(7)
+    assert "cikis_tarihi" not in state
+
+
+def test_moving_checkin_within_stay_keeps_checkout():
+    state = _booked(3, 8)
+    assert merge(state, {"giris_tarihi": _future(5)}) == []
+    assert (state["giris_tarihi"], state["cikis_tarihi"]) == (_future(5), _future(8))
+
+
+def test_checkout_before_checkin_is_rejected():
+    state = _booked(5, 8)
+    assert merge(state, {"cikis_tarihi": _future(4)}) == ["cikis_tarihi"]
+    assert state["cikis_tarihi"] == _future(8)
+
+
+def test_merge_caps_child_ages():
+    state = BookingState()
+    assert merge(state, {"cocuk_sayisi": 2, "cocuk_yaslari": [3, 5, 7]}) == ["cocuk_yaslari"]
+    assert "cocuk_yaslari" not in state
+    assert merge(state, {"cocuk_yaslari": [3, 5]}) == []
+    # Sayı bilinmese de tek baytlık sayaç aşılamaz
+    assert merge(BookingState(), {"cocuk_yaslari": list(range(11)) * 30}) == ["cocuk_yaslari"]
+
+
+def test_lowering_child_count_drops_stale_ages():
+    state = BookingState()
+    merge(state, {"cocuk_sayisi": 3, "cocuk_yaslari": "3, 5, 7"})
+    assert merge(state, {"cocuk_sayisi": 1}) == []
+    assert "cocuk_yaslari" not in state
+    restored = BookingState.from_bytes(state.to_bytes())
+    assert restored.to_dict() == state.to_dict()
@@ -0,0 +1,31 @@
+from chains.context_builder import build_context, count_tokens
+
+
+def test_orders_by_score_and_drops_duplicates():
+    chunks = [
+        ("Kahvaltı 07:00 ile 10:30 arasında servis edilir.", 0.7),
+        ("Check-in saati 14:00, check-out saati 12:00'dir.", 0.9),
+        ("Check-in saati 14:00, check-out saati 12:00'dir!", 0.8),
+    ]
+    context, selected, _ = build_context(chunks, token_budget=500)
+    assert selected == [
+        "Check-in saati 14:00, check-out saati 12:00'dir.",
+        "Kahvaltı 07:00 ile 10:30 arasında servis edilir.",
+    ]
+    assert context == "\n\n".join(selected)
+
+
+def test_oversized_top_chunk_is_truncated_not_skipped():
+    top = " ".join(f"Havuz bilgisi {i}." for i in range(200))
+    chunks = [(top, 0.9), ("Otopark ücretsizdir.", 0.5)]
+    context, selected, used = build_context(chunks, token_budget=50)
+    assert len(selected) == 1
+    assert top.startswith(selected[0])
+    assert used == count_tokens(selected[0]) <= 50
+
+
+def test_smaller_chunks_fill_remaining_budget():
+    chunks = [("a " * 30, 0.9), ("b " * 500, 0.8), ("c " * 5, 0.7)]
+    _, selected, used = build_context(chunks, token_budget=60)
+    assert [s[0] for s in selected] == ["a", "c"]
+    assert used <= 60
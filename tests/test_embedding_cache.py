@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+
+from chains import embedding_cache
+from chains.embedding_cache import EmbeddingDiskCache
+
+
+def test_default_path_is_resolved_against_project_root():
+    root = Path(embedding_cache.__file__).resolve().parent.parent
+    expected = root / os.getenv("EMBED_CACHE_PATH", "cache/embeddings.sqlite3")
+    assert embedding_cache.DEFAULT_PATH == str(expected)
+    assert Path(embedding_cache.DEFAULT_PATH).is_absolute()
+
+
+def test_round_trip_is_keyed_by_model(tmp_path):
+    cache = EmbeddingDiskCache(str(tmp_path / "e.sqlite3"))
+    cache.put("model-a", "merhaba", [0.5, 0.25])
+    assert cache.get("model-a", "merhaba") == [0.5, 0.25]
+    assert cache.get("model-b", "merhaba") is None
+
+
+def _last_access(cache, model, text):
+    key = embedding_cache._cache_key(model, text)
+    return cache._conn.execute("SELECT last_access FROM embeddings WHERE key = ?",
+                               (key,)).fetchone()[0]
+
+
+def _fake_clock(monkeypatch):
+    clock = iter(range(100, 1000))
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: next(clock))
+
+
+def test_hits_do_not_write_until_flushed(tmp_path, monkeypatch):
+    _fake_clock(monkeypatch)
+    path = str(tmp_path / "e.sqlite3")
+    cache = EmbeddingDiskCache(path)
+    cache.put("m", "a", [1.0])
+    written = _last_access(cache, "m", "a")
+    assert cache.get("m", "a") == [1.0]
+    assert _last_access(cache, "m", "a") == written     # isabet hemen yazılmaz
+    cache.close()
+    assert _last_access(EmbeddingDiskCache(path), "m", "a") > written
+
+
+def test_eviction_sees_pending_hits(tmp_path, monkeypatch):
+    _fake_clock(monkeypatch)
+    cache = EmbeddingDiskCache(str(tmp_path / "e.sqlite3"), max_entries=3)
+    for text in ("a", "b", "c"):
+        cache.put("m", text, [1.0])
+    cache.get("m", "a")         # en eski kayıt yeniden kullanıldı
+    cache.put("m", "d", [1.0])  # tahliye: "a" değil "b" silinmeli
+    assert cache.get("m", "a") == [1.0]
+    assert cache.get("m", "b") is None
+    assert len(cache) == 2
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from chains import embedding_service
+from chains.embedding_cache import EmbeddingDiskCache
+from chains.embedding_service import EmbeddingService
+
+
+class CountingClient:
+    """Sahte OpenAI istemcisi; embed edilen metinleri kaydeder"""
+
+    def __init__(self, delay=0.0):
+        self.inputs = []
+        self.delay = delay
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, model, input):
+        self.inputs.extend(input)
+        time.sleep(self.delay)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t)), 1.0])
+                                     for t in input])
+
+
+class CountingAsyncClient(CountingClient):
+    def __init__(self, delay=0.0):
+        super().__init__(delay)
+        self.embeddings = SimpleNamespace(create=self._acreate)
+
+    async def _acreate(self, model, input):
+        self.inputs.extend(input)
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t)), 1.0])
+                                     for t in input])
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(embedding_service, "_service", EmbeddingService(client=client))
+    return client
+
+
+def test_classifier_and_rag_share_one_embedding(shared):
+    from chains import intent_classifier_qdrant, rag_hotel_qdrant
+    assert intent_classifier_qdrant.embed_single("Havuz kaçta açılıyor?") == \
+        rag_hotel_qdrant.embed_single("Havuz  kaçta açılıyor? ")
+    assert shared.inputs == ["Havuz kaçta açılıyor?"]
+    assert embedding_service.get_embedding_service().stats()["hits"] == 1
+
+
+def test_concurrent_threads_are_coalesced():
+    client = CountingClient(delay=0.05)
+    service = EmbeddingService(client=client)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.embed("check-in saati")))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert client.inputs == ["check-in saati"]
+    assert len(results) == 8 and all(r == results[0] for r in results)
+
+
+def test_concurrent_coroutines_are_coalesced():
+    client = CountingAsyncClient(delay=0.01)
+    service = EmbeddingService(async_client=client)
+
+    async def run():
+        return await asyncio.gather(*(service.aembed("spa fiyatları") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert client.inputs == ["spa fiyatları"]
+    assert all(r == results[0] for r in results)
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    first = EmbeddingService(client=CountingClient(), disk_cache=EmbeddingDiskCache(path))
+    vector = first.embed("otopark var mı")
+    first.disk_cache.close()
+
+    client = CountingClient()
+    second = EmbeddingService(client=client, disk_cache=EmbeddingDiskCache(path))
+    assert second.embed("otopark var mı") == vector
+    assert client.inputs == [] and second.disk_hits == 1
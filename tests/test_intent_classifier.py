@@ -0,0 +1,26 @@
+import pytest
+
+from chains.intent_classifier_qdrant import IntentClassifierQdrant
+
+
+def test_top1_uses_nearest_neighbor():
+    prediction = IntentClassifierQdrant._top1([("selamla", 0.91), ("selamla", 0.88), ("veda", 0.7)])
+    assert (prediction.intent, prediction.confidence) == ("selamla", 0.91)
+    assert (prediction.runner_up, prediction.runner_up_confidence) == ("veda", 0.7)
+    assert prediction.vote_share is None
+
+
+def test_vote_confidence_is_similarity_and_share_is_separate():
+    neighbors = [("veda", 0.82), ("selamla", 0.80), ("selamla", 0.78)]
+    prediction = IntentClassifierQdrant._vote(neighbors)
+    assert prediction.intent == "selamla"
+    assert prediction.confidence == pytest.approx(0.80)
+    assert prediction.runner_up == "veda"
+    assert prediction.runner_up_confidence == pytest.approx(0.82)
+    assert prediction.vote_share == pytest.approx(1.58 / 2.40)
+
+
+def test_unanimous_vote_keeps_similarity_scale():
+    prediction = IntentClassifierQdrant._vote([("teşekkür", 0.42), ("teşekkür", 0.40)])
+    assert prediction.confidence == pytest.approx(0.42)
+    assert prediction.vote_share == pytest.approx(1.0)
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from chains.intent_index import LocalIntentIndex
+
+
+class FakeIntentClient:
+    """scroll/get_collection'ı taklit eder; get_collection çağrıları sayılır"""
+
+    def __init__(self, records):
+        self.records = records
+        self.scrolls = 0
+
+    def get_collection(self, name):
+        return SimpleNamespace(points_count=len(self.records))
+
+    def scroll(self, collection_name, limit, offset, with_payload, with_vectors):
+        self.scrolls += 1
+        return self.records, None
+
+
+def _record(intent, vector):
+    return SimpleNamespace(payload={"intent": intent}, vector=vector)
+
+
+def test_search_and_centroids():
+    client = FakeIntentClient([
+        _record("selamla", [1.0, 0.0]),
+        _record("selamla", [0.9, 0.1]),
+        _record("veda", [0.0, 1.0]),
+    ])
+    index = LocalIntentIndex("intents", client)
+    index.load()
+    assert index.ready
+    assert index.search([1.0, 0.0], k=1)[0][0] == "selamla"
+    assert [label for label, _ in index.search_centroids([0.1, 1.0])] == ["veda", "selamla"]
+
+
+def test_points_without_vectors_do_not_trigger_reload():
+    client = FakeIntentClient([
+        _record("selamla", [1.0, 0.0]),
+        _record("veda", None),
+    ])
+    index = LocalIntentIndex("intents", client)
+    index.load()
+    assert len(index.labels) == 1
+    index._refresh_if_changed()
+    assert client.scrolls == 1
+
+    client.records.append(_record("veda", [0.0, 1.0]))
+    index._refresh_if_changed()
+    assert client.scrolls == 2
+    assert len(index.labels) == 2
@@ -0,0 +1,50 @@
+import pytest
+
+from chains.lexical_intents import LexicalIntentMatcher
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return LexicalIntentMatcher()
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("Merhaba", "selamla"),
+    ("Çok teşekkür ederim", "teşekkür"),
+    ("Rezervasyonumu iptal etmek istiyorum", "rezervasyon_iptali"),
+    ("Odamı iptal ettirmek istiyorum", "rezervasyon_iptali"),
+    ("Rezervasyonumu değiştirmek istiyorum", "rezervasyon_değiştirme"),
+    ("Rezervasyonumun durumu nedir?", "rezervasyon_durumu"),
+    ("Rezervasyon tarihlerimi değiştirebilir miyim?", "rezervasyon_değiştirme"),
+])
+def test_matches(matcher, text, intent):
+    assert matcher.match(text) == intent
+
+
+@pytest.mark.parametrize("text", [
+    "Merhaba, havuz var mı?",
+    "Rezervasyonumu iptal etmek istemiyorum",
+    "Rezervasyonumu iptal etmek istemem, tarihleri kaydırabilir miyiz?",
+    "Rezervasyonumu değiştirmiyorum",
+    "Rezervasyonumu değiştirmeyeceğim, sadece soru soracağım",
+    "Rezervasyonumu iptal etmedim ama iptal edilmiş görünüyor",
+    "Rezervasyonumu iptal etmeyin lütfen",
+    "Rezervasyonumu iptal etmek değil, ertelemek istiyorum",
+])
+def test_negated_or_mixed_messages_fall_through(matcher, text):
+    assert matcher.match(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "İptal etmem gerek",
+    "Aboneliği iptal etmek istiyorum",
+    "Spa randevumu iptal etmek istiyorum",
+    "Değişiklik yapmak istiyorum",
+    "Menüde değişiklik yapmak istiyorum",
+    "Hey",
+    "Hi",
+    "Hikaye gibi bir otel",
+    "Heyecanla bekliyoruz",
+])
+def test_ambiguous_messages_fall_through(matcher, text):
+    assert matcher.match(text) is None
@@ -0,0 +1,39 @@
+import sys
+import types
+
+import pytest
+
+import migrate_to_qdrant
+
+
+@pytest.fixture
+def migration_env(tmp_path, monkeypatch):
+    """İki kaynak klasörü olan boş çalışma dizini; istemciler ve doğrulama sahte"""
+    monkeypatch.chdir(tmp_path)
+    # main() yalnızca chromadb'nin kurulu olduğunu denetler; kaynak okunmaz
+    monkeypatch.setitem(sys.modules, "chromadb", sys.modules.get("chromadb")
+                        or types.ModuleType("chromadb"))
+    (tmp_path / "db" / "intent_db").mkdir(parents=True)
+    (tmp_path / "db" / "hotel_db").mkdir(parents=True)
+    monkeypatch.setattr(migrate_to_qdrant, "initialize_clients", lambda: (object(), object()))
+    monkeypatch.setattr(migrate_to_qdrant, "verify_migration", lambda *a, **k: True)
+    bumps = []
+    import chains.answer_cache
+    monkeypatch.setattr(chains.answer_cache, "bump_knowledge_version",
+                        lambda *a, **k: bumps.append(1))
+    return bumps
+
+
+def test_failed_collection_exits_nonzero_without_bumping(migration_env, monkeypatch):
+    monkeypatch.setattr(migrate_to_qdrant, "migrate_collection",
+                        lambda chroma_path, name, *a, **k: name != "hotel_facts")
+    with pytest.raises(SystemExit) as exc:
+        migrate_to_qdrant.main([])
+    assert exc.value.code == 1
+    assert migration_env == []
+
+
+def test_successful_migration_bumps_knowledge_version(migration_env, monkeypatch):
+    monkeypatch.setattr(migrate_to_qdrant, "migrate_collection", lambda *a, **k: True)
+    migrate_to_qdrant.main([])
+    assert migration_env == [1]
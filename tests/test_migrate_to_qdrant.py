@@ -0,0 +1,228 @@
+import hashlib
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PointStruct
+
+import migrate_to_qdrant
+from migrate_to_qdrant import (MigrationCheckpoint, compact_collection, content_hash,
+                               detect_reusable_embeddings, iter_source_pages,
+                               migrate_collection, sync_collection)
+from qdrant_config import point_id, qdrant_config
+
+DIM = qdrant_config.get_vector_size()
+TARGET = "test_collection"
+
+
+def fake_vector(text):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    return np.random.default_rng(seed).random(DIM).astype(np.float32)
+
+
+class FakeCollection:
+    """Chroma koleksiyonunun aktarımda kullanılan kısmı: count() ve get(include, limit, offset)"""
+
+    def __init__(self, rows, metadata=None, missing_after=None):
+        self.rows = list(rows)          # (kimlik, metin, metadata)
+        self.metadata = metadata
+        self.missing_after = missing_after  # count()'tan az satır döndüren kaynak
+        self.offsets = []
+
+    def count(self):
+        return len(self.rows)
+
+    def get(self, include, limit, offset=0):
+        self.offsets.append(offset)
+        rows = self.rows[:self.missing_after] if self.missing_after is not None else self.rows
+        page = rows[offset:offset + limit]
+        data = {"ids": [r[0] for r in page]}
+        if "documents" in include:
+            data["documents"] = [r[1] for r in page]
+        if "metadatas" in include:
+            data["metadatas"] = [r[2] for r in page]
+        if "embeddings" in include:
+            data["embeddings"] = np.array([fake_vector(r[1]) for r in page])
+        return data
+
+
+class FakeOpenAI:
+    """Embed edilen metinleri kaydeder; fail içindeki metinlerde hata verir"""
+
+    def __init__(self, fail=()):
+        self.embedded = []
+        self.fail = set(fail)
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, model, input):
+        if self.fail & set(input):
+            raise ValueError("embedding hatası")
+        self.embedded.extend(input)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=fake_vector(t).tolist())
+                                     for t in input])
+
+
+def rows(n, intent="rezervasyon"):
+    return [(f"doc-{i}", f"metin {i}", {"intent": intent}) for i in range(n)]
+
+
+@pytest.fixture
+def source(monkeypatch):
+    """_open_source_collection'ı sahte koleksiyona bağlar"""
+    holder = {}
+    monkeypatch.setattr(migrate_to_qdrant, "_open_source_collection",
+                        lambda path, name: holder["collection"])
+
+    def set_collection(collection):
+        holder["collection"] = collection
+        return collection
+    return set_collection
+
+
+@pytest.fixture
+def qdrant():
+    return QdrantClient(":memory:")
+
+
+def migrate(qdrant, openai, tmp_path, **kwargs):
+    kwargs.setdefault("reuse_embeddings", "never")
+    return migrate_collection("db", "src", qdrant, TARGET, openai, batch_size=2, workers=1,
+                              checkpoint_dir=str(tmp_path), **kwargs)
+
+
+def sync(qdrant, openai, **kwargs):
+    kwargs.setdefault("reuse_embeddings", "never")
+    return sync_collection("db", "src", qdrant, TARGET, openai, batch_size=2, workers=1, **kwargs)
+
+
+def stored(qdrant):
+    records, _ = qdrant.scroll(TARGET, limit=100, with_payload=True)
+    return {str(r.id): r.payload for r in records}
+
+
+def test_reupload_is_idempotent_with_uuid5_ids(source, qdrant, tmp_path):
+    source(FakeCollection(rows(5)))
+    assert migrate(qdrant, FakeOpenAI(), tmp_path)
+    assert migrate(qdrant, FakeOpenAI(), tmp_path)
+    points = stored(qdrant)
+    assert set(points) == {point_id(f"doc-{i}") for i in range(5)}
+    assert points[point_id("doc-3")]["original_id"] == "doc-3"
+
+
+def test_failed_batch_resumes_from_checkpoint(source, qdrant, tmp_path):
+    source(FakeCollection(rows(5)))
+    assert not migrate(qdrant, FakeOpenAI(fail={"metin 2"}), tmp_path)
+    assert list(tmp_path.glob("*.json"))
+
+    retry = FakeOpenAI()
+    assert migrate(qdrant, retry, tmp_path)
+    assert retry.embedded == ["metin 2", "metin 3"]     # yalnızca başarısız batch
+    assert len(stored(qdrant)) == 5
+    assert not list(tmp_path.glob("*.json"))            # tamamlanınca silinir
+
+
+def test_checkpoint_with_other_fingerprint_is_ignored(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    old = MigrationCheckpoint(path, {"total": 5, "batch_size": 2})
+    old.mark(0)
+    same = MigrationCheckpoint(path, {"total": 5, "batch_size": 2})
+    same.load()
+    assert same.completed == {0}
+    changed = MigrationCheckpoint(path, {"total": 6, "batch_size": 2})
+    changed.load()
+    assert changed.completed == set()
+
+
+def test_iter_source_pages_reads_in_pages_and_skips_done():
+    collection = FakeCollection(rows(5))
+    pages = list(iter_source_pages(collection, 2, ["documents"], skip={1}))
+    assert [p[0] for p in pages] == [0, 2]
+    assert [p[3] for p in pages] == [["doc-0", "doc-1"], ["doc-4"]]
+    assert collection.offsets == [0, 4]
+
+
+def test_sync_uploads_only_changes_and_removes_deleted(source, qdrant, tmp_path):
+    collection = source(FakeCollection(rows(4)))
+    migrate(qdrant, FakeOpenAI(), tmp_path)
+    # Eski hash tabanlı kimlikle kalmış kopya
+    legacy = str(uuid.uuid4())
+    qdrant.upsert(TARGET, [PointStruct(id=legacy, vector=fake_vector("metin 0").tolist(),
+                                       payload={"original_id": "doc-0", "text": "metin 0"})])
+
+    collection.rows[1] = ("doc-1", "metin 1 (güncel)", {"intent": "rezervasyon"})
+    del collection.rows[2]
+    collection.rows.append(("doc-9", "metin 9", {"intent": "rezervasyon"}))
+    openai = FakeOpenAI()
+    stats = sync(qdrant, openai)
+
+    assert (stats["source"], stats["unchanged"], stats["upserted"], stats["deleted"]) == (4, 2, 2, 2)
+    assert sorted(openai.embedded) == ["metin 1 (güncel)", "metin 9"]
+    points = stored(qdrant)
+    assert set(points) == {point_id(i) for i in ("doc-0", "doc-1", "doc-3", "doc-9")}
+    assert points[point_id("doc-1")]["content_hash"] == content_hash(
+        "metin 1 (güncel)", {"intent": "rezervasyon"})
+
+
+def test_sync_keeps_points_when_source_scan_is_short(source, qdrant, tmp_path):
+    collection = source(FakeCollection(rows(4)))
+    migrate(qdrant, FakeOpenAI(), tmp_path)
+    collection.missing_after = 2
+    stats = sync(qdrant, FakeOpenAI())
+    assert stats["deleted"] == 0 and stats["skipped_deletes"] == 2
+    assert len(stored(qdrant)) == 4
+
+
+def test_sync_keeps_points_when_a_batch_fails(source, qdrant, tmp_path):
+    collection = source(FakeCollection(rows(4)))
+    migrate(qdrant, FakeOpenAI(), tmp_path)
+    collection.rows[0] = ("doc-0", "metin 0 (güncel)", {})
+    del collection.rows[3]
+    stats = sync(qdrant, FakeOpenAI(fail={"metin 0 (güncel)"}))
+    assert stats["failed_batches"] == 1
+    assert stats["deleted"] == 0 and stats["skipped_deletes"] == 1
+    assert point_id("doc-3") in stored(qdrant)
+
+
+def test_compact_keeps_one_canonical_point_per_original_id(qdrant):
+    migrate_to_qdrant.ensure_collection(qdrant, TARGET)
+    vector = fake_vector("x").tolist()
+    legacy_only, duplicate = str(uuid.uuid4()), str(uuid.uuid4())
+    no_id = [str(uuid.uuid4()) for _ in range(3)]
+    qdrant.upsert(TARGET, [
+        PointStruct(id=point_id("a"), vector=vector, payload={"original_id": "a", "text": "A"}),
+        PointStruct(id=duplicate, vector=vector, payload={"original_id": "a", "text": "A"}),
+        PointStruct(id=legacy_only, vector=vector, payload={"original_id": "b", "text": "B"}),
+        # original_id'siz noktalar: aynı metin farklı intent'lerde, metinsiz olanlar
+        PointStruct(id=no_id[0], vector=vector, payload={"text": "evet", "intent": "onay"}),
+        PointStruct(id=no_id[1], vector=vector, payload={"text": "evet", "intent": "small_talk"}),
+        PointStruct(id=no_id[2], vector=vector, payload={}),
+    ])
+
+    stats = compact_collection(qdrant, TARGET)
+
+    assert (stats["rewritten"], stats["deleted"]) == (1, 2)
+    points = stored(qdrant)
+    assert set(points) == {point_id("a"), point_id("b"), *no_id}
+    assert points[point_id("b")]["text"] == "B"
+
+
+def test_detect_reusable_embeddings():
+    documents = ["metin 0"]
+    embeddings = np.array([fake_vector("metin 0")])
+    model = qdrant_config.embed_model
+
+    def detect(metadata=None, vectors=embeddings, openai=None, mode="auto"):
+        return detect_reusable_embeddings(FakeCollection([], metadata), documents, vectors,
+                                          openai or FakeOpenAI(), mode)
+
+    assert detect({"embed_model": model})
+    assert not detect({"embed_model": "baska-model"})
+    assert not detect(vectors=np.zeros((1, 8)), mode="always")    # boyut uymuyor
+    assert not detect(mode="never")
+    # Model adı yok: örnek döküman yeniden embed edilip karşılaştırılır
+    probe = FakeOpenAI()
+    assert detect(openai=probe) and probe.embedded == ["metin 0"]
+    other = np.array([fake_vector("bambaşka")])
+    assert not detect(vectors=other)
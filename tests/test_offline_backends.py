@@ -0,0 +1,72 @@
+import asyncio
+import os
+
+from offline_backends import FakeAsyncOpenAI, install
+
+
+def test_async_stream_matches_sync_reply():
+    client = FakeAsyncOpenAI()
+    messages = [{"role": "system", "content": "<KONTEKS>\nHavuz 08:00-20:00 açıktır.\n</KONTEKS>"},
+                {"role": "user", "content": "Havuz kaçta açık?"}]
+
+    async def run():
+        stream = await client.chat.completions.create(
+            model="m", messages=messages, stream=True, stream_options={"include_usage": True}
+        )
+        parts, usage = [], None
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices:
+                parts.append(chunk.choices[0].delta.content)
+        return "".join(parts), usage
+
+    text, usage = asyncio.run(run())
+    assert text == client.sync.reply_for(messages)
+    assert usage is not None and usage.completion_tokens > 0
+
+
+def test_install_keeps_shared_state_untouched(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_PATH", str(tmp_path / "answers.sqlite3"))
+    from chains import answer_cache, context_builder
+
+    with install() as backends:
+        cache = answer_cache.get_answer_cache()
+        assert cache.path is None
+        assert cache.version_path.startswith(backends.state_dir)
+        answer_cache.bump_knowledge_version()
+        assert os.path.exists(os.path.join(backends.state_dir, "knowledge_version"))
+        assert not (tmp_path / "answers.sqlite3").exists()
+        # Tahmini sayım: tiktoken yüklenmez
+        assert context_builder._get_encoder() is None
+        assert context_builder.count_tokens("Merhaba dünya") == len("Merhaba dünya") // 3
+
+
+def test_uninstall_restores_globals_and_removes_state_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_PATH", str(tmp_path / "answers.sqlite3"))
+    import qdrant_config
+    from chains import answer_cache, booking_dialog, embedding_service, small_talk
+    before = (booking_dialog.client, small_talk.client, embedding_service._service,
+              qdrant_config.get_qdrant_client, answer_cache.KNOWLEDGE_VERSION_PATH,
+              answer_cache._cache)
+
+    backends = install()
+    assert booking_dialog.client is backends.openai
+    backends.uninstall()
+    backends.uninstall()    # ikinci çağrı etkisiz
+
+    after = (booking_dialog.client, small_talk.client, embedding_service._service,
+             qdrant_config.get_qdrant_client, answer_cache.KNOWLEDGE_VERSION_PATH,
+             answer_cache._cache)
+    assert all(a is b for a, b in zip(before, after))
+    assert os.environ["ANSWER_CACHE_PATH"] == str(tmp_path / "answers.sqlite3")
+    assert not os.path.exists(backends.state_dir)
+
+
+def test_streamed_completions_are_timed():
+    from latency_stats import record_stages
+    from chains.small_talk import stream_small_talk
+
+    with install(), record_stages() as stages:
+        assert "".join(stream_small_talk("Merhaba"))
+    assert stages.get("completion", 0) > 0
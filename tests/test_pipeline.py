@@ -0,0 +1,35 @@
+from concurrent.futures import Future
+import asyncio
+import logging
+
+import pipeline
+
+
+def test_discarded_future_exception_is_consumed(caplog):
+    future = Future()
+    future.set_running_or_notify_cancel()  # Arama başlamış: cancel() etkisiz
+    with caplog.at_level(logging.DEBUG, logger="hotel_chatbot.pipeline"):
+        pipeline._discard(future)
+        future.set_exception(RuntimeError("qdrant down"))
+    assert "qdrant down" in caplog.text
+
+
+def test_discarded_running_task_is_cancelled_quietly():
+    async def search():
+        await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.create_task(search())
+        await asyncio.sleep(0)
+        pipeline._discard(task)
+        await asyncio.sleep(0)
+        return task.cancelled()
+
+    loop = asyncio.new_event_loop()
+    errors = []
+    loop.set_exception_handler(lambda _, context: errors.append(context))
+    try:
+        assert loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert errors == []
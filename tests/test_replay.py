@@ -0,0 +1,29 @@
+import json
+
+from router_qdrant import load_conversations
+
+
+def _write(tmp_path, rows):
+    path = tmp_path / "conversations.jsonl"
+    path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in rows), encoding="utf-8")
+    return path
+
+
+def test_only_user_messages_are_replayed(tmp_path):
+    path = _write(tmp_path, [
+        {"conversation_id": "c1", "messages": [
+            {"role": "system", "content": "Sen bir otel asistanısın"},
+            {"role": "user", "content": "Merhaba"},
+            {"role": "assistant", "content": "Merhaba, nasıl yardımcı olabilirim?"},
+            {"content": "Havuz var mı?"},
+            "Kahvaltı kaçta?",
+        ]},
+        {"conversation_id": "c2", "role": "user", "message": "Otopark ücretli mi?"},
+        {"conversation_id": "c2", "role": "assistant", "message": "Hayır, ücretsiz."},
+        {"request_id": "r1", "body": "Check-in saat kaçta?"},
+    ])
+    assert load_conversations(path) == {
+        "c1": ["Merhaba", "Havuz var mı?", "Kahvaltı kaçta?"],
+        "c2": ["Otopark ücretli mi?"],
+        "r1": ["Check-in saat kaçta?"],
+    }
@@ -0,0 +1,134 @@
+from datetime import date, timedelta
+
+import pytest
+
+import session_store
+from chains.booking_dialog import BookingState, merge
+from session_store import (
+    InMemorySessionStore, RedisSessionStore, SessionStore, SQLiteSessionStore
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """RedisSessionStore'un kullandığı get/set(ex=)/delete alt kümesi"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and self.clock() >= expires:
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        assert isinstance(value, bytes)
+        self.data[key] = (value, None if ex is None else self.clock() + ex)
+        return True
+
+    def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(session_store.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return InMemorySessionStore(ttl=60)
+    if request.param == "sqlite":
+        store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), ttl=60)
+        request.addfinalizer(store.close)
+        return store
+    return RedisSessionStore(FakeRedis(clock), ttl=60)
+
+
+def _session():
+    state = BookingState()
+    checkin = date.today() + timedelta(days=30)
+    merge(state, {
+        "giris_tarihi": checkin.isoformat(),
+        "cikis_tarihi": (checkin + timedelta(days=3)).isoformat(),
+        "yetiskin_sayisi": "2",
+    })
+    state.add_message("user", "12-15 Ağustos, 2 yetişkin")
+    return {"booking_state": state, "in_booking": True, "messages": ["Merhaba"]}
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_round_trip(store):
+    session = _session()
+    store.save("s1", session)
+    loaded = store.load("s1")
+    assert loaded["in_booking"] is True
+    assert loaded["messages"] == ["Merhaba"]
+    loaded_state, state = loaded["booking_state"], session["booking_state"]
+    assert [loaded_state.get(k) for k in BookingState.FIELDS] == \
+        [state.get(k) for k in BookingState.FIELDS]
+    assert loaded_state.messages() == state.messages()
+    assert store.load("yok") is None
+
+
+def test_saved_copy_is_isolated(store):
+    session = _session()
+    store.save("s1", session)
+    session["messages"].append("kaydedilmedi")
+    assert store.load("s1")["messages"] == ["Merhaba"]
+
+
+def test_ttl_expires_sessions(store, clock):
+    store.save("s1", _session())
+    clock.now += 59
+    assert store.load("s1") is not None
+    clock.now += 2
+    assert store.load("s1") is None
+
+
+def test_delete(store):
+    store.save("s1", _session())
+    store.delete("s1")
+    store.delete("s1")
+    assert store.load("s1") is None
+
+
+def test_memory_store_purges_abandoned_sessions(clock):
+    store = InMemorySessionStore(ttl=60, purge_interval=30)
+    for i in range(5):
+        store.save(f"terk-{i}", {"messages": []})
+    clock.now += 61
+    store.save("aktif", {"messages": []})
+    assert len(store) == 1
+    assert store.load("aktif") is not None
+
+
+def test_sqlite_relative_path_is_under_project_root(monkeypatch, tmp_path):
+    monkeypatch.setattr(session_store, "PROJECT_ROOT", tmp_path)
+    monkeypatch.chdir(tmp_path.parent)
+    store = SQLiteSessionStore("cache/sessions.sqlite3")
+    try:
+        assert store.path == str(tmp_path / "cache" / "sessions.sqlite3")
+        assert (tmp_path / "cache" / "sessions.sqlite3").exists()
+    finally:
+        store.close()
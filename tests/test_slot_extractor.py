@@ -0,0 +1,64 @@
+from datetime import date
+
+import pytest
+
+from chains.slot_extractor import extract_slots
+
+TODAY = date(2026, 10, 17)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12-15 Ağustos", {"giris_tarihi": "2027-08-12", "cikis_tarihi": "2027-08-15"}),
+    # Ay dönümü: başlangıç önceki ayda
+    ("28-2 Ağustos", {"giris_tarihi": "2027-07-28", "cikis_tarihi": "2027-08-02"}),
+    # Ocak → önceki yılın Aralık'ı
+    ("28-2 Ocak", {"giris_tarihi": "2026-12-28", "cikis_tarihi": "2027-01-02"}),
+    ("28 - 2 ocak 2027", {"giris_tarihi": "2026-12-28", "cikis_tarihi": "2027-01-02"}),
+    ("31-2 Kasım", {"giris_tarihi": "2026-10-31", "cikis_tarihi": "2026-11-02"}),
+])
+def test_date_ranges(text, expected):
+    assert extract_slots(text, today=TODAY) == expected
+
+
+def test_invalid_range_is_left_to_llm():
+    assert extract_slots("29-1 Mart 2027", today=TODAY) == {}
+
+
+def test_relative_dates():
+    assert extract_slots("öbür gün", today=TODAY) == {"giris_tarihi": "2026-10-19"}
+    assert extract_slots("yarın", today=TODAY) == {"giris_tarihi": "2026-10-18"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("on iki yetişkin", {"yetiskin_sayisi": "12"}),
+    ("yirmi bir kişi", {"yetiskin_sayisi": "21"}),
+    ("on kişi", {"yetiskin_sayisi": "10"}),
+    ("2 yetişkin bir çocuk", {"yetiskin_sayisi": "2", "cocuk_sayisi": "1"}),
+    ("iki oda, çocuk yok", {"oda_sayisi": "2", "cocuk_sayisi": "0"}),
+])
+def test_counts(text, expected):
+    assert extract_slots(text, today=TODAY) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "2 büyük oda",
+    "1 büyük yatak istiyorum",
+    "bir oda daha ekleyelim",
+    "iki kişi daha geleceğiz",
+])
+def test_non_guest_counts_are_ignored(text):
+    assert extract_slots(text, today=TODAY) == {}
+
+
+def test_buyuk_with_person_noun_counts_as_adults():
+    assert extract_slots("2 büyük kişi", today=TODAY) == {"yetiskin_sayisi": "2"}
+
+
+def test_single_date_fills_missing_checkout():
+    state = {"giris_tarihi": "2027-08-12"}
+    assert extract_slots("15 Ağustos", state, today=TODAY) == {"cikis_tarihi": "2027-08-15"}
+
+
+def test_nights_from_checkin():
+    slots = extract_slots("12 Ağustos 3 gece", today=TODAY)
+    assert slots == {"giris_tarihi": "2027-08-12", "cikis_tarihi": "2027-08-15"}